@@ -57,7 +57,10 @@ const emailService = new EmailService({
 })
 
 const notificacionesService = new NotificacionesService({ emailService })
-const tarifasService = new TarifasService({ prisma: getPrisma() })
+const tarifasService = new TarifasService({
+  prisma: getPrisma(),
+  servidorTarifas: process.env.TARIFAS_SERVIDOR,
+})
 const analisisService = new AnalisisService({ prisma: getPrisma(), tarifasService })
 const dashboardService = new DashboardService({ prisma: getPrisma() })
 
@@ -0,0 +1,70 @@
+const http = require("http")
+
+// Cliente de scripts/servidor_tarifas.py: consulta el índice en memoria de los
+// últimos resultados de los scrapers. El destino es una URL http://host:puerto
+// o la ruta de un socket Unix (--socket del servidor).
+const TIMEOUT_POR_DEFECTO = 1000
+
+class ClienteTarifas {
+  /**
+   * @param {string} destino - URL del servidor o ruta de su socket Unix
+   * @param {Object} options - timeout en milisegundos por consulta
+   */
+  constructor(destino, options = {}) {
+    this.timeout = options.timeout || TIMEOUT_POR_DEFECTO
+    if (/^https?:\/\//.test(destino)) {
+      const url = new URL(destino)
+      this.conexion = { hostname: url.hostname, port: url.port || 80 }
+    } else {
+      this.conexion = { socketPath: destino }
+    }
+  }
+
+  /**
+   * Hace un GET al servidor y retorna el JSON de la respuesta
+   * @param {string} ruta - Ruta con su query string
+   * @returns {Promise<Object|null>} Respuesta, o null si el servidor responde 404
+   */
+  consultar(ruta) {
+    return new Promise((resolve, reject) => {
+      const peticion = http.get({ ...this.conexion, path: ruta, timeout: this.timeout }, (respuesta) => {
+        const partes = []
+        respuesta.on("data", (parte) => partes.push(parte))
+        respuesta.on("end", () => {
+          if (respuesta.statusCode === 404) {
+            resolve(null)
+            return
+          }
+          try {
+            const cuerpo = JSON.parse(Buffer.concat(partes).toString("utf8"))
+            if (respuesta.statusCode !== 200) {
+              reject(new Error(cuerpo.error || `Servidor de tarifas respondió ${respuesta.statusCode}`))
+              return
+            }
+            resolve(cuerpo)
+          } catch (error) {
+            reject(error)
+          }
+        })
+        respuesta.on("error", reject)
+      })
+      peticion.on("timeout", () => peticion.destroy(new Error(`Servidor de tarifas sin respuesta en ${this.timeout} ms`)))
+      peticion.on("error", reject)
+    })
+  }
+
+  /**
+   * Tarifa de un proveedor y estrato, con el mismo formato que
+   * TarifasService.obtenerTarifaReferencia(); el servidor deduce el servicio
+   * del proveedor
+   * @param {string} proveedor - afinia, veolia o surtigas
+   * @param {string} estrato - Estrato del usuario
+   * @returns {Promise<Object|null>} Tarifa, o null si el índice no la tiene
+   */
+  tarifa(proveedor, estrato) {
+    const query = new URLSearchParams({ proveedor, estrato: String(estrato) })
+    return this.consultar(`/tarifa?${query}`)
+  }
+}
+
+module.exports = { ClienteTarifas }
@@ -0,0 +1,69 @@
+const fs = require("fs")
+const path = require("path")
+
+// Lector de los resúmenes precalculados por scripts/resumenes_dashboard.py
+// (datos_tarifas/resumenes/). Los agregados cubren las facturas creadas hasta
+// el corte; las posteriores las suma el dashboard en vivo.
+
+// Archivos leídos, por ruta: { mtimeMs, contenido }. Se releen solo si cambió
+// el mtime (los escribe resumenes_dashboard.py con reemplazo atómico)
+const cache = new Map()
+const MAXIMO_CACHE = 1000
+
+/**
+ * Lee un archivo JSON o retorna null si no existe o está corrupto
+ * @param {string} ruta - Ruta del archivo
+ * @returns {Promise<Object|null>} Contenido
+ */
+async function leerJSON(ruta) {
+  try {
+    const { mtimeMs } = await fs.promises.stat(ruta)
+    const guardado = cache.get(ruta)
+    if (guardado && guardado.mtimeMs === mtimeMs) return guardado.contenido
+
+    const contenido = JSON.parse(await fs.promises.readFile(ruta, "utf8"))
+    cache.delete(ruta)
+    if (cache.size >= MAXIMO_CACHE) cache.delete(cache.keys().next().value)
+    cache.set(ruta, { mtimeMs, contenido })
+    return contenido
+  } catch (error) {
+    cache.delete(ruta)
+    return null
+  }
+}
+
+/**
+ * Carga el resumen de un usuario junto con el corte de los resúmenes
+ * @param {string} userId - ID del usuario
+ * @param {string} dirTarifas - Directorio de datos de tarifas
+ * @returns {Promise<Object|null>} { corte: Date, meses, totales } o null si no hay resúmenes
+ */
+async function cargarResumenUsuario(userId, dirTarifas = "./datos_tarifas") {
+  const base = path.join(dirTarifas, "resumenes")
+  const estado = await leerJSON(path.join(base, "estado.json"))
+  if (!estado || !estado.corte) return null
+
+  const nombre = `${String(userId).replace(/[^\w-]/g, "_")}.json`
+  // Un usuario sin archivo no tenía facturas al corte: todo lo suyo es posterior
+  const resumen = (await leerJSON(path.join(base, "usuarios", nombre))) || { meses: {}, totales: {} }
+
+  return {
+    corte: new Date(estado.corte),
+    meses: resumen.meses || {},
+    totales: resumen.totales || {},
+  }
+}
+
+/**
+ * Carga la tendencia mensual de tarifas por proveedor y estrato
+ * @param {string} dirTarifas - Directorio de datos de tarifas
+ * @returns {Promise<Object|null>} { proveedor: { estrato: [{ mes, tarifa, variacion }] } }
+ */
+async function cargarTendenciaTarifas(dirTarifas = "./datos_tarifas") {
+  return leerJSON(path.join(dirTarifas, "resumenes", "tendencia_tarifas.json"))
+}
+
+module.exports = {
+  cargarResumenUsuario,
+  cargarTendenciaTarifas,
+}
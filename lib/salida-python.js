@@ -0,0 +1,253 @@
+// Lector de la salida de los scrapers de Python (scripts/salida_tarifas.py).
+// --format json: el resultado como JSON; jsonl: un registro por línea y el
+// resumen al final; msgpack: encabezado 'OFMP' + versión del esquema (u16 BE)
+// y tramas u32 BE de largo + registro en MessagePack, el resumen en la última.
+// El decodificador cubre todo lo que produce msgpack.packb de Python (sin ext),
+// así no hace falta una dependencia de npm.
+
+const MAGIC_MSGPACK = "OFMP"
+const VERSION_ESQUEMA = 1
+const TAMANO_ENCABEZADO = 6
+
+// Estado del decodificador: evita pasar y actualizar un objeto de posición en cada valor
+let datos = null
+let offset = 0
+
+// Las claves de los registros se repiten en cada fila: se decodifican una sola vez
+const clavesCortas = new Map()
+const LARGO_MAXIMO_CLAVE = 24
+
+/**
+ * Decodifica el valor MessagePack en la posición actual
+ * @returns {*} Valor decodificado
+ */
+function decodificarValor() {
+  const tipo = datos[offset++]
+
+  if (tipo <= 0x7f) return tipo
+  if (tipo >= 0xe0) return tipo - 0x100
+  if ((tipo & 0xe0) === 0xa0) return leerTexto(tipo & 0x1f)
+  if ((tipo & 0xf0) === 0x80) return decodificarMapa(tipo & 0x0f)
+  if ((tipo & 0xf0) === 0x90) return decodificarArreglo(tipo & 0x0f)
+
+  let valor
+  switch (tipo) {
+    case 0xc0:
+      return null
+    case 0xc2:
+      return false
+    case 0xc3:
+      return true
+    case 0xc4:
+      return leerBytes(leerEntero(1))
+    case 0xc5:
+      return leerBytes(leerEntero(2))
+    case 0xc6:
+      return leerBytes(leerEntero(4))
+    case 0xca:
+      valor = datos.readFloatBE(offset)
+      offset += 4
+      return valor
+    case 0xcb:
+      valor = datos.readDoubleBE(offset)
+      offset += 8
+      return valor
+    case 0xcc:
+      return leerEntero(1)
+    case 0xcd:
+      return leerEntero(2)
+    case 0xce:
+      return leerEntero(4)
+    case 0xcf:
+      valor = datos.readBigUInt64BE(offset)
+      offset += 8
+      return Number(valor)
+    case 0xd0:
+      valor = datos.readInt8(offset)
+      offset += 1
+      return valor
+    case 0xd1:
+      valor = datos.readInt16BE(offset)
+      offset += 2
+      return valor
+    case 0xd2:
+      valor = datos.readInt32BE(offset)
+      offset += 4
+      return valor
+    case 0xd3:
+      valor = datos.readBigInt64BE(offset)
+      offset += 8
+      return Number(valor)
+    case 0xd9:
+      return leerTexto(leerEntero(1))
+    case 0xda:
+      return leerTexto(leerEntero(2))
+    case 0xdb:
+      return leerTexto(leerEntero(4))
+    case 0xdc:
+      return decodificarArreglo(leerEntero(2))
+    case 0xdd:
+      return decodificarArreglo(leerEntero(4))
+    case 0xde:
+      return decodificarMapa(leerEntero(2))
+    case 0xdf:
+      return decodificarMapa(leerEntero(4))
+    default:
+      throw new Error(`Tipo MessagePack no soportado: 0x${tipo.toString(16)}`)
+  }
+}
+
+function leerEntero(bytes) {
+  const valor = datos.readUIntBE(offset, bytes)
+  offset += bytes
+  return valor
+}
+
+function leerTexto(largo) {
+  const inicio = offset
+  offset += largo
+  // Textos cortos en ASCII: más rápido que toString("utf8"), que tiene un costo fijo alto
+  if (largo <= LARGO_MAXIMO_CLAVE) {
+    let texto = ""
+    for (let i = inicio; i < offset; i++) {
+      const byte = datos[i]
+      if (byte > 0x7f) return datos.toString("utf8", inicio, offset)
+      texto += String.fromCharCode(byte)
+    }
+    return texto
+  }
+  return datos.toString("utf8", inicio, offset)
+}
+
+// Buffer.compare() tiene un costo fijo alto para claves de pocos bytes
+function iguales(bytes, inicio, largo) {
+  if (bytes.length !== largo) return false
+  for (let i = 0; i < largo; i++) {
+    if (bytes[i] !== datos[inicio + i]) return false
+  }
+  return true
+}
+
+function leerClave() {
+  const tipo = datos[offset]
+  if ((tipo & 0xe0) !== 0xa0) return decodificarValor()
+
+  const largo = tipo & 0x1f
+  // Hash de los bytes de la clave; las colisiones se resuelven comparando los bytes
+  let hash = largo
+  for (let i = offset + 1; i <= offset + largo; i++) hash = (Math.imul(hash, 31) + datos[i]) | 0
+  let candidatas = clavesCortas.get(hash)
+  if (candidatas) {
+    for (let c = 0; c < candidatas.length; c++) {
+      const [bytes, clave] = candidatas[c]
+      if (iguales(bytes, offset + 1, largo)) {
+        offset += 1 + largo
+        return clave
+      }
+    }
+  } else {
+    candidatas = []
+    clavesCortas.set(hash, candidatas)
+  }
+  const bytes = Buffer.from(datos.subarray(offset + 1, offset + 1 + largo))
+  offset += 1
+  const clave = leerTexto(largo)
+  candidatas.push([bytes, clave])
+  return clave
+}
+
+function leerBytes(largo) {
+  const bytes = datos.subarray(offset, offset + largo)
+  offset += largo
+  return bytes
+}
+
+function decodificarArreglo(largo) {
+  const arreglo = new Array(largo)
+  for (let i = 0; i < largo; i++) arreglo[i] = decodificarValor()
+  return arreglo
+}
+
+function decodificarMapa(largo) {
+  const mapa = {}
+  for (let i = 0; i < largo; i++) {
+    const clave = leerClave()
+    mapa[clave] = decodificarValor()
+  }
+  return mapa
+}
+
+/**
+ * Decodifica una trama completa
+ * @param {Buffer} buffer - Datos
+ * @param {number} inicio - Primer byte del registro
+ * @param {number} fin - Byte siguiente al último
+ * @returns {*} Registro
+ */
+function decodificarTrama(buffer, inicio, fin) {
+  datos = buffer
+  offset = inicio
+  try {
+    const registro = decodificarValor()
+    if (offset !== fin) throw new Error("Trama msgpack con largo inconsistente")
+    return registro
+  } finally {
+    datos = null
+  }
+}
+
+/**
+ * Registros de una salida --format msgpack
+ * @param {Buffer} buffer - stdout completo del scraper
+ * @returns {Array} Registros en orden (el último es el resumen)
+ */
+function leerTramas(buffer) {
+  if (buffer.length < TAMANO_ENCABEZADO || buffer.toString("latin1", 0, 4) !== MAGIC_MSGPACK) {
+    throw new Error("La salida no es un flujo msgpack de los scrapers")
+  }
+  const version = buffer.readUInt16BE(4)
+  if (version > VERSION_ESQUEMA) {
+    throw new Error(`Versión de esquema ${version} no soportada (máxima ${VERSION_ESQUEMA})`)
+  }
+
+  const registros = []
+  let inicio = TAMANO_ENCABEZADO
+  while (inicio < buffer.length) {
+    if (inicio + 4 > buffer.length) throw new Error("Trama msgpack truncada")
+    const fin = inicio + 4 + buffer.readUInt32BE(inicio)
+    if (fin > buffer.length) throw new Error("Trama msgpack truncada")
+    registros.push(decodificarTrama(buffer, inicio + 4, fin))
+    inicio = fin
+  }
+  return registros
+}
+
+/**
+ * Resultado final de un scraper según el formato de su salida
+ * @param {Buffer} buffer - stdout completo del scraper
+ * @param {string} formato - json, jsonl o msgpack
+ * @returns {Object} Resultado (la misma forma en los tres formatos)
+ */
+function parsearSalida(buffer, formato = "json") {
+  let resumen
+  if (formato === "msgpack") {
+    resumen = leerTramas(buffer).pop()
+  } else if (formato === "jsonl") {
+    const lineas = buffer.toString("utf8").trim().split("\n")
+    resumen = JSON.parse(lineas[lineas.length - 1])
+  } else {
+    return JSON.parse(buffer.toString("utf8"))
+  }
+
+  if (!resumen || resumen.tipo !== "resumen") {
+    throw new Error("La salida del scraper no termina con el resumen")
+  }
+  const { tipo, ...resultado } = resumen
+  return resultado
+}
+
+module.exports = {
+  FORMATOS: ["json", "jsonl", "msgpack"],
+  leerTramas,
+  parsearSalida,
+}
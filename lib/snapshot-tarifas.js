@@ -0,0 +1,110 @@
+const fs = require("fs")
+const path = require("path")
+
+// Cargador de referencia para las instantáneas binarias de tarifas
+// generadas por scripts/snapshot_tarifas.py (formato OFTS v1, little-endian)
+const MAGIC = "OFTS"
+const VERSION_FORMATO = 1
+const TAMANO_ENCABEZADO = 64
+const SIN_CADENA = 0xffffffff
+
+/**
+ * Lee la tabla de cadenas de la instantánea
+ * @param {Buffer} buffer - Contenido del archivo
+ * @param {number} offset - Inicio de la sección de cadenas
+ * @param {number} cantidad - Número de cadenas
+ * @returns {Function} Función que resuelve un índice a su cadena
+ */
+function crearLectorCadenas(buffer, offset, cantidad) {
+  const inicioDatos = offset + 4 * (cantidad + 1)
+  const cache = new Map()
+
+  return (indice) => {
+    if (indice === SIN_CADENA) return null
+    if (!cache.has(indice)) {
+      const inicio = inicioDatos + buffer.readUInt32LE(offset + 4 * indice)
+      const fin = inicioDatos + buffer.readUInt32LE(offset + 4 * (indice + 1))
+      cache.set(indice, buffer.toString("utf8", inicio, fin))
+    }
+    return cache.get(indice)
+  }
+}
+
+/**
+ * Decodifica una instantánea binaria al mismo formato que el JSON del scraper
+ * @param {Buffer} buffer - Contenido del archivo .bin
+ * @returns {Object} Resultado con tarifas, subsidios y componentes
+ */
+function decodificarSnapshot(buffer) {
+  if (buffer.length < TAMANO_ENCABEZADO || buffer.toString("latin1", 0, 4) !== MAGIC) {
+    throw new Error("Instantánea de tarifas inválida")
+  }
+
+  const campos = []
+  for (let i = 0; i < 9; i++) {
+    campos.push(buffer.readUInt32LE(12 + 4 * i))
+  }
+  const version = buffer.readUInt16LE(4)
+  const total = buffer.readUInt32LE(8)
+  const [nCadenas, offCadenas, idxMeta, nTarifas, offTarifas, nSubsidios, offSubsidios, nComponentes, offComponentes] =
+    campos
+
+  if (version !== VERSION_FORMATO || total !== buffer.length) {
+    throw new Error(`Instantánea de tarifas con versión o tamaño inesperado (v${version})`)
+  }
+
+  const cadena = crearLectorCadenas(buffer, offCadenas, nCadenas)
+  const f64 = (offset, i) => buffer.readDoubleLE(offset + 8 * i)
+  const u32 = (offset, i) => buffer.readUInt32LE(offset + 4 * i)
+
+  const resultado = JSON.parse(cadena(idxMeta))
+
+  resultado.tarifas = []
+  for (let i = 0; i < nTarifas; i++) {
+    const tarifa = {
+      estrato: cadena(u32(offTarifas + 24 * nTarifas, i)),
+      tarifa: f64(offTarifas, i),
+      cargoFijo: f64(offTarifas + 8 * nTarifas, i),
+    }
+    const subsidio = f64(offTarifas + 16 * nTarifas, i)
+    if (!Number.isNaN(subsidio)) tarifa.subsidio = subsidio
+    const fuente = cadena(u32(offTarifas + 28 * nTarifas, i))
+    if (fuente !== null) tarifa.fuente_subsidio = fuente
+    resultado.tarifas.push(tarifa)
+  }
+
+  resultado.subsidios = []
+  for (let i = 0; i < nSubsidios; i++) {
+    const subsidio = {
+      estrato: cadena(u32(offSubsidios + 8 * nSubsidios, i)),
+      porcentaje: f64(offSubsidios, i),
+    }
+    const fuente = cadena(u32(offSubsidios + 12 * nSubsidios, i))
+    if (fuente !== null) subsidio.fuente = fuente
+    resultado.subsidios.push(subsidio)
+  }
+
+  resultado.componentes = {}
+  for (let i = 0; i < nComponentes; i++) {
+    resultado.componentes[cadena(u32(offComponentes + 8 * nComponentes, i))] = f64(offComponentes, i)
+  }
+
+  return resultado
+}
+
+/**
+ * Carga la instantánea binaria vigente de un proveedor
+ * @param {string} proveedor - afinia, veolia o surtigas
+ * @param {string} dirTarifas - Directorio de datos de tarifas
+ * @returns {Object|null} Resultado decodificado o null si no existe
+ */
+function cargarSnapshotTarifas(proveedor, dirTarifas = "./datos_tarifas") {
+  const ruta = path.join(dirTarifas, `${proveedor.toLowerCase()}_tarifas.bin`)
+  if (!fs.existsSync(ruta)) return null
+  return decodificarSnapshot(fs.readFileSync(ruta))
+}
+
+module.exports = {
+  decodificarSnapshot,
+  cargarSnapshotTarifas,
+}
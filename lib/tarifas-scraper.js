@@ -1,6 +1,10 @@
 const puppeteer = require("puppeteer")
 const fs = require("fs").promises
 const path = require("path")
+const { parsearSalida } = require("./salida-python")
+
+// Distingue los temporales de escrituras simultáneas del mismo proceso
+let secuenciaTemporal = 0
 
 class TarifasScraper {
   constructor(options = {}) {
@@ -9,6 +13,12 @@ class TarifasScraper {
       outputDir: options.outputDir || "./datos_tarifas",
       timeout: options.timeout || 30000,
       logLevel: options.logLevel || "info",
+      // json, jsonl o msgpack (más compacto y rápido de leer en corridas grandes)
+      formatoSalida: options.formatoSalida || "json",
+      // Responder con el último resultado bueno y revalidarlo en segundo plano
+      // (scripts/resultado_vigente.py); vigenciaHoras y antiguedadMaximaHoras
+      // sin definir usan los límites por defecto del script
+      servirVigente: options.servirVigente || false,
       ...options,
     }
 
@@ -50,6 +60,41 @@ class TarifasScraper {
     }
   }
 
+  /**
+   * Argumentos comunes de los scrapers de Python
+   * @returns {string[]} Argumentos después de la ruta del script
+   */
+  argumentosPython() {
+    const argumentos = ["--format", this.options.formatoSalida]
+    if (this.options.servirVigente) {
+      argumentos.push("--servir-vigente")
+      if (this.options.vigenciaHoras != null) argumentos.push("--vigencia-horas", String(this.options.vigenciaHoras))
+      if (this.options.antiguedadMaximaHoras != null) {
+        argumentos.push("--antiguedad-maxima-horas", String(this.options.antiguedadMaximaHoras))
+      }
+    }
+    return argumentos
+  }
+
+  /**
+   * Guarda un resultado de forma atómica: se escribe en un temporal y se
+   * renombra, así scripts/servidor_tarifas.py (que recarga al cambiar el
+   * archivo) nunca lee un JSON a medio escribir
+   * @param {string} nombre - Archivo dentro de outputDir
+   * @param {Object} resultado - Resultado del scraper
+   */
+  async guardarResultado(nombre, resultado) {
+    const ruta = path.join(this.options.outputDir, nombre)
+    const temporal = `${ruta}.${process.pid}-${++secuenciaTemporal}.tmp`
+    try {
+      await fs.writeFile(temporal, JSON.stringify(resultado, null, 2))
+      await fs.rename(temporal, ruta)
+    } catch (error) {
+      await fs.unlink(temporal).catch(() => {})
+      throw error
+    }
+  }
+
   /**
    * Extrae tarifas de Afinia usando script de Python
    * @returns {Promise<Object>} Tarifas extraídas
@@ -62,12 +107,13 @@ class TarifasScraper {
       const scriptPath = path.join(__dirname, "..", "scripts", "scrape_afinia.py")
 
       return new Promise((resolve, reject) => {
-        const python = spawn("python", [scriptPath])
-        let stdout = ""
+        const python = spawn("python", [scriptPath, ...this.argumentosPython()])
+        // Buffers sin decodificar: un carácter UTF-8 o una trama msgpack puede quedar partido entre dos chunks
+        const stdout = []
         let stderr = ""
 
         python.stdout.on("data", (data) => {
-          stdout += data.toString()
+          stdout.push(data)
         })
 
         python.stderr.on("data", (data) => {
@@ -83,13 +129,10 @@ class TarifasScraper {
           }
 
           try {
-            const resultado = JSON.parse(stdout)
+            const resultado = parsearSalida(Buffer.concat(stdout), this.options.formatoSalida)
 
             // Guardar resultado
-            await fs.writeFile(
-              path.join(this.options.outputDir, "afinia_tarifas_actual.json"),
-              JSON.stringify(resultado, null, 2),
-            )
+            await this.guardarResultado("afinia_tarifas_actual.json", resultado)
 
             console.log(`Tarifas de Afinia extraídas correctamente: ${resultado.tarifas.length} tarifas`)
             resolve(resultado)
@@ -117,12 +160,13 @@ class TarifasScraper {
       const scriptPath = path.join(__dirname, "..", "scripts", "scrape_veolia.py")
 
       return new Promise((resolve, reject) => {
-        const python = spawn("python", [scriptPath])
-        let stdout = ""
+        const python = spawn("python", [scriptPath, ...this.argumentosPython()])
+        // Buffers sin decodificar: un carácter UTF-8 o una trama msgpack puede quedar partido entre dos chunks
+        const stdout = []
         let stderr = ""
 
         python.stdout.on("data", (data) => {
-          stdout += data.toString()
+          stdout.push(data)
         })
 
         python.stderr.on("data", (data) => {
@@ -138,13 +182,10 @@ class TarifasScraper {
           }
 
           try {
-            const resultado = JSON.parse(stdout)
+            const resultado = parsearSalida(Buffer.concat(stdout), this.options.formatoSalida)
 
             // Guardar resultado
-            await fs.writeFile(
-              path.join(this.options.outputDir, "veolia_tarifas_actual.json"),
-              JSON.stringify(resultado, null, 2),
-            )
+            await this.guardarResultado("veolia_tarifas_actual.json", resultado)
 
             console.log(`Tarifas de Veolia extraídas correctamente: ${resultado.tarifas.length} tarifas`)
             resolve(resultado)
@@ -172,12 +213,13 @@ class TarifasScraper {
       const scriptPath = path.join(__dirname, "..", "scripts", "scrape_surtigas.py")
 
       return new Promise((resolve, reject) => {
-        const python = spawn("python", [scriptPath])
-        let stdout = ""
+        const python = spawn("python", [scriptPath, ...this.argumentosPython()])
+        // Buffers sin decodificar: un carácter UTF-8 o una trama msgpack puede quedar partido entre dos chunks
+        const stdout = []
         let stderr = ""
 
         python.stdout.on("data", (data) => {
-          stdout += data.toString()
+          stdout.push(data)
         })
 
         python.stderr.on("data", (data) => {
@@ -193,13 +235,10 @@ class TarifasScraper {
           }
 
           try {
-            const resultado = JSON.parse(stdout)
+            const resultado = parsearSalida(Buffer.concat(stdout), this.options.formatoSalida)
 
             // Guardar resultado
-            await fs.writeFile(
-              path.join(this.options.outputDir, "surtigas_tarifas_actual.json"),
-              JSON.stringify(resultado, null, 2),
-            )
+            await this.guardarResultado("surtigas_tarifas_actual.json", resultado)
 
             console.log(`Tarifas de Surtigas extraídas correctamente: ${resultado.tarifas.length} tarifas`)
             resolve(resultado)
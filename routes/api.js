@@ -461,6 +461,24 @@ router.get("/dashboard/comparacion-tarifas", autenticarUsuario, async (req, res)
   }
 })
 
+router.get("/dashboard/tendencia-tarifas", autenticarUsuario, async (req, res) => {
+  try {
+    const tendencia = await req.services.dashboard.obtenerTendenciaTarifas(req.query.proveedor)
+
+    res.json({
+      success: true,
+      data: tendencia,
+    })
+  } catch (error) {
+    console.error(`Error al obtener tendencia de tarifas: ${error.message}`)
+    res.status(500).json({
+      success: false,
+      message: "Error al obtener tendencia de tarifas",
+      error: error.message,
+    })
+  }
+})
+
 router.get("/dashboard/recomendaciones", autenticarUsuario, async (req, res) => {
   try {
     const recomendaciones = await req.services.dashboard.obtenerRecomendaciones(req.userId)
@@ -482,15 +500,23 @@ router.get("/dashboard/recomendaciones", autenticarUsuario, async (req, res) =>
 // Ruta para obtener datos completos del dashboard
 router.get("/dashboard", autenticarUsuario, async (req, res) => {
   try {
-    const [estadisticas, consumoMensual, distribucionGastos, ultimasAnomalias, comparacionTarifas, recomendaciones] =
-      await Promise.all([
-        req.services.dashboard.obtenerEstadisticasGenerales(req.userId),
-        req.services.dashboard.obtenerConsumoMensual(req.userId, 6),
-        req.services.dashboard.obtenerDistribucionGastos(req.userId, 12),
-        req.services.dashboard.obtenerUltimasAnomalias(req.userId, 5),
-        req.services.dashboard.obtenerComparacionTarifas(req.userId),
-        req.services.dashboard.obtenerRecomendaciones(req.userId),
-      ])
+    const [
+      estadisticas,
+      consumoMensual,
+      distribucionGastos,
+      ultimasAnomalias,
+      comparacionTarifas,
+      tendenciaTarifas,
+      recomendaciones,
+    ] = await Promise.all([
+      req.services.dashboard.obtenerEstadisticasGenerales(req.userId),
+      req.services.dashboard.obtenerConsumoMensual(req.userId, 6),
+      req.services.dashboard.obtenerDistribucionGastos(req.userId, 12),
+      req.services.dashboard.obtenerUltimasAnomalias(req.userId, 5),
+      req.services.dashboard.obtenerComparacionTarifas(req.userId),
+      req.services.dashboard.obtenerTendenciaTarifas(),
+      req.services.dashboard.obtenerRecomendaciones(req.userId),
+    ])
 
     res.json({
       success: true,
@@ -500,6 +526,7 @@ router.get("/dashboard", autenticarUsuario, async (req, res) => {
         distribucionGastos,
         ultimasAnomalias,
         comparacionTarifas,
+        tendenciaTarifas,
         recomendaciones,
       },
     })
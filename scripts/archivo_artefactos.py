@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archivo de artefactos crudos de los scrapers de tarifas.
+Con --archivar, cada página y PDF descargados (todo pasa por
+plazos_scrape.descargar) se guardan comprimidos con zstd y direccionados
+por su SHA-256, así un mismo
+boletín descargado en cien ejecuciones ocupa lugar una sola vez. Cada
+ejecución deja un manifiesto con la URL, la etapa y el hash de lo que
+descargó, y un resumen de lo extraído.
+
+Con el archivo, corregir un error de extracción no requiere volver a
+recorrer los sitios (que además retiran los boletines viejos): el modo
+reprocesar vuelve a ejecutar los scrapers actuales sobre las ejecuciones
+archivadas, en paralelo, sirviendo cada descarga desde el archivo.
+
+Estructura:
+    datos_tarifas/archivo/
+        objetos/<ab>/<sha256>.zst                  contenido comprimido
+        corridas/<proveedor>/<AAAAMMDDTHHMMSS>.json  manifiesto de la ejecución
+        reprocesos/<AAAAMMDDTHHMMSS>/<proveedor>/    resultados y logs de un reproceso
+
+Retención: al cerrar cada ejecución se borran las ejecuciones de más de
+--archivo-dias días (por defecto RETENCION_DIAS; siempre queda la última de
+cada proveedor) y los objetos que ya no referencia ningún manifiesto.
+
+Las etapas cargadas de un checkpoint al reanudar no se descargan y quedan en
+el manifiesto de la ejecución interrumpida. Surtigas solo se reprocesa por la
+ruta del PDF: lo que extrae el navegador no pasa por descargar().
+listar muestra todas las ejecuciones con su estado; reprocesar solo toma las
+completas ("completo": true).
+
+Uso:
+    python scripts/archivo_artefactos.py listar --proveedor afinia
+    python scripts/archivo_artefactos.py reprocesar --desde 2026-01-01
+    python scripts/archivo_artefactos.py reprocesar --corrida afinia/20260915T060000 --procesos 4
+    python scripts/archivo_artefactos.py limpiar --dias 90
+"""
+
+import sys
+import json
+import hashlib
+import importlib
+import os
+import io
+import time
+import contextlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from tarifas_comun import PROVEEDORES, ruta_datos, escribir_atomico
+from plazos_scrape import Descargas
+
+
+NIVEL_ZSTD = 10  # los PDF ya vienen comprimidos; más nivel casi no reduce y tarda más
+FORMATO_CORRIDA = '%Y%m%dT%H%M%S'
+RETENCION_DIAS = 180      # días que se conservan las ejecuciones archivadas
+MARGEN_OBJETOS = 86400    # segundos: un objeto recién escrito o reutilizado no se borra aunque aún no
+                          # figure en un manifiesto (otra ejecución lo está archivando)
+
+
+class ArtefactoNoArchivado(LookupError):
+    pass
+
+
+def dir_archivo(directorio: Optional[str] = None) -> str:
+    return ruta_datos('archivo', directorio=directorio)
+
+
+def ruta_objeto(sha256: str, directorio: Optional[str] = None) -> str:
+    return os.path.join(dir_archivo(directorio), 'objetos', sha256[:2], sha256 + '.zst')
+
+
+def _tipo_contenido(contenido: bytes) -> str:
+    if contenido.startswith(b'%PDF'):
+        return 'pdf'
+    return 'html' if b'<' in contenido[:1024] else 'otro'
+
+
+def guardar_objeto(contenido: bytes, directorio: Optional[str] = None) -> Dict[str, Any]:
+    """Guarda un contenido si aún no está archivado y retorna su hash y tamaños."""
+    sha256 = hashlib.sha256(contenido).hexdigest()
+    ruta = ruta_objeto(sha256, directorio)
+    if os.path.exists(ruta):
+        os.utime(ruta)  # reutilizado: la limpieza no lo borra antes de que quede en el manifiesto
+    else:
+        escribir_atomico(ruta, zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(contenido))
+    return {"sha256": sha256, "bytes": len(contenido), "comprimido": os.path.getsize(ruta)}
+
+
+def leer_objeto(sha256: str, directorio: Optional[str] = None) -> bytes:
+    """Contenido original de un objeto; verifica que el hash coincida."""
+    with open(ruta_objeto(sha256, directorio), 'rb') as f:
+        contenido = zstandard.ZstdDecompressor().decompress(f.read())
+    if hashlib.sha256(contenido).hexdigest() != sha256:
+        raise ValueError(f"Objeto archivado corrupto: {sha256}")
+    return contenido
+
+
+def limpiar_archivo(dias: float = RETENCION_DIAS, directorio: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Borra las ejecuciones de más de 'dias' días (salvo la última de cada
+    proveedor) y los objetos que ya no referencia ningún manifiesto.
+    """
+    base = os.path.join(dir_archivo(directorio), 'corridas')
+    limite = (datetime.now() - timedelta(days=dias)).strftime(FORMATO_CORRIDA)
+    corridas = 0
+    referenciados = set()
+    for proveedor in sorted(os.listdir(base)) if os.path.isdir(base) else []:
+        nombres = sorted(n for n in os.listdir(os.path.join(base, proveedor)) if n.endswith('.json'))
+        for i, nombre in enumerate(nombres):
+            ruta = os.path.join(base, proveedor, nombre)
+            if nombre[:-5] < limite and i < len(nombres) - 1:
+                os.unlink(ruta)
+                corridas += 1
+                continue
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    referenciados.update(a["sha256"] for a in json.load(f).get("artefactos", []))
+            except (OSError, ValueError):
+                continue
+
+    objetos = liberados = 0
+    ahora = time.time()
+    for raiz, _, archivos in os.walk(os.path.join(dir_archivo(directorio), 'objetos')):
+        for nombre in archivos:
+            if not nombre.endswith('.zst') or nombre[:-4] in referenciados:
+                continue
+            ruta = os.path.join(raiz, nombre)
+            try:
+                info = os.stat(ruta)
+                if ahora - info.st_mtime < MARGEN_OBJETOS:
+                    continue
+                os.unlink(ruta)
+            except OSError:
+                continue
+            objetos += 1
+            liberados += info.st_size
+    return {"corridas_borradas": corridas, "objetos_borrados": objetos, "bytes_liberados": liberados}
+
+
+class ArchivoArtefactos:
+    """
+    Archivo de una ejecución. Sin directorio no guarda nada. El manifiesto se
+    reescribe con cada artefacto, así una ejecución que muere a mitad de
+    camino deja registrado lo que alcanzó a descargar ("completo": false).
+    """
+
+    def __init__(self, proveedor: str, directorio: Optional[str] = None, dias: float = RETENCION_DIAS):
+        self.directorio = directorio
+        self.dias = dias
+        self.manifiesto: Dict[str, Any] = {
+            "id": datetime.now().strftime(FORMATO_CORRIDA),
+            "proveedor": proveedor.lower(),
+            "fecha": datetime.now().isoformat(),
+            "artefactos": [],
+            "completo": False,
+        }
+
+    @property
+    def activo(self) -> bool:
+        return self.directorio is not None
+
+    @property
+    def ruta_manifiesto(self) -> str:
+        return os.path.join(dir_archivo(self.directorio), 'corridas', self.manifiesto["proveedor"],
+                            self.manifiesto["id"] + '.json')
+
+    def _guardar_manifiesto(self):
+        escribir_atomico(self.ruta_manifiesto,
+                         json.dumps(self.manifiesto, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def obtener(self, url: str) -> Optional[bytes]:
+        """Una ejecución normal siempre descarga."""
+        return None
+
+    def guardar(self, url: str, contenido: bytes, etapa: str):
+        if not self.activo:
+            return
+        try:
+            objeto = guardar_objeto(contenido, self.directorio)
+        except OSError as e:
+            # Archivar nunca debe hacer fallar el scrape
+            print(f"  No se pudo archivar {url}: {str(e)}", file=sys.stderr)
+            return
+        self.manifiesto["artefactos"].append({
+            "url": url,
+            "etapa": etapa,
+            "tipo": _tipo_contenido(contenido),
+            "fecha": datetime.now().isoformat(),
+            **objeto,
+        })
+        self._guardar_manifiesto()
+
+    def finalizar(self, resultado: Dict[str, Any]):
+        """Cierra el manifiesto con lo extraído, para comparar al reprocesar."""
+        if not self.activo:
+            return
+        self.manifiesto.update({
+            "completo": True,
+            "fechaExtraccion": resultado.get("fechaExtraccion"),
+            "resultado": {
+                "tarifas": resultado.get("tarifas", []),
+                "error": resultado.get("error"),
+                "parcial": bool(resultado.get("plazos_excedidos")),
+            },
+        })
+        self._guardar_manifiesto()
+        print(f"Artefactos archivados: {len(self.manifiesto['artefactos'])} ({self.ruta_manifiesto})",
+              file=sys.stderr)
+        if not self.dias:
+            return
+        try:
+            limpieza = limpiar_archivo(self.dias, self.directorio)
+        except OSError as e:
+            print(f"  No se pudo limpiar el archivo: {str(e)}", file=sys.stderr)
+            return
+        if limpieza["corridas_borradas"] or limpieza["objetos_borrados"]:
+            print(f"  Archivo limpiado: {limpieza['corridas_borradas']} ejecuciones y "
+                  f"{limpieza['objetos_borrados']} objetos de más de {self.dias:g} días "
+                  f"({limpieza['bytes_liberados'] / 1048576:.1f} MB)", file=sys.stderr)
+
+
+class ReproduccionArchivo(ArchivoArtefactos):
+    """Fuente de un reproceso: cada descarga se sirve desde la ejecución archivada."""
+
+    def __init__(self, manifiesto: Dict[str, Any], directorio: Optional[str] = None):
+        super().__init__(manifiesto["proveedor"])
+        self.origen = directorio
+        # Si una URL se descargó dos veces vale la última
+        self.por_url = {a["url"]: a["sha256"] for a in manifiesto.get("artefactos", [])}
+
+    def obtener(self, url: str) -> Optional[bytes]:
+        if url not in self.por_url:
+            raise ArtefactoNoArchivado(f"{url} no está en la ejecución archivada")
+        return leer_objeto(self.por_url[url], self.origen)
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--archivar", action="store_true",
+                        help="Archiva las páginas y PDF descargados para poder reprocesarlos "
+                             "(ver archivo_artefactos.py)")
+    parser.add_argument("--archivo-dias", type=float, default=RETENCION_DIAS, metavar="DIAS",
+                        help=f"Días que se conservan las ejecuciones archivadas; 0 = sin límite "
+                             f"(por defecto {RETENCION_DIAS})")
+
+
+def archivo_desde_argumentos(args: argparse.Namespace, proveedor: str) -> ArchivoArtefactos:
+    if not args.archivar:
+        return ArchivoArtefactos(proveedor)
+    if zstandard is None:
+        print("  Archivo de artefactos desactivado: falta zstandard (pip install zstandard)", file=sys.stderr)
+        return ArchivoArtefactos(proveedor)
+    return ArchivoArtefactos(proveedor, ruta_datos(), args.archivo_dias)
+
+
+def _completa(ruta: str) -> bool:
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return bool(json.load(f).get("completo"))
+    except (OSError, ValueError):
+        return False
+
+
+def listar_corridas(proveedores: Optional[List[str]] = None, desde: Optional[str] = None,
+                    hasta: Optional[str] = None, directorio: Optional[str] = None,
+                    solo_completas: bool = False) -> List[str]:
+    """
+    Manifiestos en orden cronológico; desde/hasta en AAAA-MM-DD (inclusive).
+    Con solo_completas se omiten las ejecuciones interrumpidas, que no
+    tienen todas sus descargas ni un resultado con qué comparar.
+    """
+    base = os.path.join(dir_archivo(directorio), 'corridas')
+    desde = desde.replace('-', '') if desde else None
+    hasta = hasta.replace('-', '') if hasta else None
+    rutas = []
+    for proveedor in proveedores or sorted(PROVEEDORES):
+        try:
+            nombres = sorted(n for n in os.listdir(os.path.join(base, proveedor)) if n.endswith('.json'))
+        except OSError:
+            continue
+        for nombre in nombres:
+            if (desde and nombre[:8] < desde) or (hasta and nombre[:8] > hasta):
+                continue
+            ruta = os.path.join(base, proveedor, nombre)
+            if solo_completas and not _completa(ruta):
+                continue
+            rutas.append(ruta)
+    return sorted(rutas, key=os.path.basename)
+
+
+def _reprocesar_corrida(ruta: str, salida: str, directorio: Optional[str]) -> Dict[str, Any]:
+    """Ejecuta el scraper actual sobre una ejecución archivada (en un proceso del pool)."""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        manifiesto = json.load(f)
+    proveedor = manifiesto["proveedor"]
+    destino = os.path.join(salida, proveedor)
+    os.makedirs(destino, exist_ok=True)
+
+    # La salida de diagnóstico de cada ejecución va a su propio log y no se mezcla entre procesos
+    log = io.StringIO()
+    with contextlib.redirect_stderr(log):
+        modulo = importlib.import_module(f"scrape_{proveedor}")
+        if proveedor == 'surtigas':
+            modulo.USAR_NAVEGADOR = False
+        descargas = Descargas(archivo=ReproduccionArchivo(manifiesto, directorio))
+        resultado = getattr(modulo, f"scrape_{proveedor}")(descargas=descargas)
+
+    resultado["reprocesado"] = resultado["fechaExtraccion"]
+    resultado["fechaExtraccion"] = manifiesto.get("fechaExtraccion") or manifiesto["fecha"]
+    resultado["corrida"] = manifiesto["id"]
+    escribir_atomico(os.path.join(destino, manifiesto["id"] + '.json'),
+                     json.dumps(resultado, ensure_ascii=False, indent=2).encode('utf-8'))
+    escribir_atomico(os.path.join(destino, manifiesto["id"] + '.log'), log.getvalue().encode('utf-8'))
+
+    anterior = (manifiesto.get("resultado") or {}).get("tarifas")
+    return {
+        "corrida": f"{proveedor}/{manifiesto['id']}",
+        "tarifas": len(resultado.get("tarifas", [])),
+        "tarifas_original": None if anterior is None else len(anterior),
+        "cambio": anterior is not None and anterior != resultado.get("tarifas", []),
+        "error": resultado.get("error"),
+    }
+
+
+def reprocesar(rutas: List[str], salida: str, procesos: Optional[int] = None,
+               directorio: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Reprocesa las ejecuciones indicadas en un pool de procesos; resultados en el orden de rutas."""
+    procesos = max(1, min(procesos or os.cpu_count() or 1, len(rutas)))
+    if procesos == 1:
+        return [_reprocesar_corrida(ruta, salida, directorio) for ruta in rutas]
+    with ProcessPoolExecutor(procesos) as pool:
+        return list(pool.map(_reprocesar_corrida, rutas, [salida] * len(rutas), [directorio] * len(rutas)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivo de páginas y PDF descargados por los scrapers")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    for nombre, ayuda in (("listar", "Lista las ejecuciones archivadas"),
+                          ("reprocesar", "Vuelve a extraer las ejecuciones archivadas con los scrapers actuales")):
+        sub = subcomandos.add_parser(nombre, help=ayuda)
+        sub.add_argument("--proveedor", action="append", choices=sorted(PROVEEDORES),
+                         help="Solo este proveedor (se puede repetir)")
+        sub.add_argument("--desde", metavar="AAAA-MM-DD", help="Ejecuciones desde esta fecha")
+        sub.add_argument("--hasta", metavar="AAAA-MM-DD", help="Ejecuciones hasta esta fecha")
+        sub.add_argument("--corrida", action="append", metavar="PROVEEDOR/ID",
+                         help="Solo esta ejecución (se puede repetir)")
+    limpieza = subcomandos.add_parser("limpiar", help="Borra las ejecuciones viejas y los objetos sin referencias")
+    limpieza.add_argument("--dias", type=float, default=RETENCION_DIAS,
+                          help=f"Días que se conservan las ejecuciones (por defecto {RETENCION_DIAS})")
+    reproceso = subcomandos.choices["reprocesar"]
+    reproceso.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, uno por CPU)")
+    reproceso.add_argument("--salida", default=None,
+                           help="Directorio de resultados (por defecto, archivo/reprocesos/<fecha>)")
+    args = parser.parse_args()
+
+    if args.comando == "limpiar":
+        print(json.dumps(limpiar_archivo(args.dias), ensure_ascii=False, indent=2))
+        return
+
+    if zstandard is None:
+        print(json.dumps({
+            "error": "Dependencias faltantes: zstandard. Ejecuta: pip install zstandard"
+        }), file=sys.stderr)
+        sys.exit(1)
+
+    rutas = listar_corridas(args.proveedor, args.desde, args.hasta,
+                            solo_completas=args.comando == "reprocesar")
+    if args.corrida:
+        elegidas = {c.strip('/') for c in args.corrida}
+        rutas = [r for r in rutas
+                 if f"{os.path.basename(os.path.dirname(r))}/{os.path.basename(r)[:-5]}" in elegidas]
+
+    if args.comando == "listar":
+        corridas = []
+        for ruta in rutas:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                manifiesto = json.load(f)
+            corridas.append({
+                "corrida": f"{manifiesto['proveedor']}/{manifiesto['id']}",
+                "completo": manifiesto.get("completo", False),
+                "artefactos": [f"{a['etapa']}:{a['tipo']}:{a['sha256'][:12]}" for a in manifiesto["artefactos"]],
+                "tarifas": len((manifiesto.get("resultado") or {}).get("tarifas", [])),
+            })
+        print(json.dumps(corridas, ensure_ascii=False, indent=2))
+        return
+
+    if not rutas:
+        print(json.dumps({"error": "No hay ejecuciones archivadas que coincidan"}, ensure_ascii=False),
+              file=sys.stderr)
+        sys.exit(1)
+
+    salida = args.salida or os.path.join(dir_archivo(), 'reprocesos', datetime.now().strftime(FORMATO_CORRIDA))
+    resultados = reprocesar(rutas, salida, args.procesos)
+    print(json.dumps({
+        "salida": salida,
+        "corridas": len(resultados),
+        "con_cambios": sum(1 for r in resultados if r["cambio"]),
+        "con_error": sum(1 for r in resultados if r["error"]),
+        "resultados": resultados,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Checkpoints por etapa para los scrapers de tarifas.
+Con --checkpoint (o --reanudar), cada ejecución guarda la salida de sus
+etapas costosas (HTML de la página, información del PDF, bytes del PDF,
+extracción de tablas) en un directorio de ejecución. En modo reanudar, las etapas ya completadas se cargan del disco
+y el scraper continúa desde la primera etapa pendiente.
+
+Estructura:
+    datos_tarifas/ejecuciones/<proveedor>/<AAAAMMDD-HHMMSS-ffffff>/
+        estado.json          etapas completadas y si la ejecución terminó
+        pagina.html          HTML de la página de tarifas
+        pdf_info.json        PDF seleccionado
+        documento.pdf        PDF descargado
+        extraccion_pdf.json  resultado de extraer_tarifas_de_pdf()
+        resultado.json       resultado final
+"""
+
+import sys
+import json
+import os
+import shutil
+import argparse
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from tarifas_comun import ruta_datos, escribir_atomico
+
+
+EJECUCIONES_A_CONSERVAR = 5  # ejecuciones completas que se guardan por proveedor
+
+EXTENSIONES = {
+    'html': '.html',
+    'json': '.json',
+    'archivo': '.pdf',
+}
+
+
+def dir_ejecuciones(proveedor: str) -> str:
+    return ruta_datos('ejecuciones', proveedor.lower())
+
+
+class CheckpointScrape:
+    """
+    Registro de etapas de una ejecución. Sin directorio no persiste nada y
+    cada etapa simplemente se ejecuta.
+    """
+
+    def __init__(self, directorio: Optional[str] = None):
+        self.directorio = directorio
+        self.estado: Dict[str, Any] = {"etapas": {}, "completo": False}
+
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+            ruta_estado = os.path.join(directorio, 'estado.json')
+            if os.path.exists(ruta_estado):
+                with open(ruta_estado, 'r', encoding='utf-8') as f:
+                    self.estado = json.load(f)
+
+    @property
+    def activo(self) -> bool:
+        return self.directorio is not None
+
+    def _ruta(self, nombre: str, formato: str) -> str:
+        if formato == 'archivo':
+            return os.path.join(self.directorio, 'documento.pdf' if nombre == 'pdf' else nombre + '.pdf')
+        return os.path.join(self.directorio, nombre + EXTENSIONES[formato])
+
+    def _guardar_estado(self):
+        escribir_atomico(os.path.join(self.directorio, 'estado.json'),
+                         json.dumps(self.estado, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def completada(self, nombre: str) -> bool:
+        return self.activo and nombre in self.estado["etapas"]
+
+    def cargar(self, nombre: str) -> Any:
+        formato = self.estado["etapas"][nombre]["formato"]
+        ruta = self._ruta(nombre, formato)
+        if formato == 'archivo':
+            return ruta
+        if formato == 'html':
+            with open(ruta, 'rb') as f:
+                return f.read()
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def guardar(self, nombre: str, valor: Any, formato: str = 'json') -> Any:
+        """
+        Persiste la salida de una etapa. Formatos: 'json', 'html' (bytes tal como
+        llegaron) y 'archivo' (ruta de un temporal que se mueve a la ejecución).
+        Un resultado parcial (plazo vencido) tampoco se guarda.
+        """
+        if not self.activo or valor is None:
+            return valor
+        if isinstance(valor, dict) and valor.get("parcial"):
+            return valor
+
+        ruta = self._ruta(nombre, formato)
+        if formato == 'archivo':
+            shutil.move(valor, ruta)
+            valor = ruta
+        elif formato == 'json':
+            escribir_atomico(ruta, json.dumps(valor, ensure_ascii=False, indent=2).encode('utf-8'))
+        else:
+            escribir_atomico(ruta, valor)
+
+        self.estado["etapas"][nombre] = {
+            "formato": formato,
+            "fecha": datetime.now().isoformat(),
+        }
+        self._guardar_estado()
+        return valor
+
+    def etapa(self, nombre: str, formato: str, funcion: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta una etapa o, si ya está completada, carga su salida guardada.
+        Un resultado None (fallo) o parcial no se guarda, así la etapa se reintenta al reanudar.
+        """
+        if self.completada(nombre):
+            print(f"  Reanudando: etapa '{nombre}' cargada de {self.directorio}", file=sys.stderr)
+            return self.cargar(nombre)
+        return self.guardar(nombre, funcion(*args, **kwargs), formato)
+
+    def finalizar(self, resultado: Dict[str, Any]):
+        """Guarda el resultado final; la ejecución queda completa si no hubo error."""
+        if not self.activo:
+            return
+        escribir_atomico(os.path.join(self.directorio, 'resultado.json'),
+                         json.dumps(resultado, ensure_ascii=False, indent=2).encode('utf-8'))
+        self.estado["completo"] = not resultado.get("error")
+        self._guardar_estado()
+        if self.estado["completo"]:
+            limpiar_ejecuciones(os.path.dirname(self.directorio), conservar=self.directorio)
+
+
+def _leer_estado(directorio: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directorio, 'estado.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ultima_ejecucion_incompleta(proveedor: str) -> Optional[str]:
+    """Directorio de la ejecución incompleta más reciente de un proveedor."""
+    base = dir_ejecuciones(proveedor)
+    if not os.path.isdir(base):
+        return None
+    for nombre in sorted(os.listdir(base), reverse=True):
+        directorio = os.path.join(base, nombre)
+        estado = _leer_estado(directorio)
+        if estado is not None and not estado.get("completo"):
+            return directorio
+    return None
+
+
+def limpiar_ejecuciones(base: str, conservar: str, maximo: int = EJECUCIONES_A_CONSERVAR):
+    """Borra ejecuciones incompletas anteriores y las completas más antiguas."""
+    completas = 0
+    for nombre in sorted(os.listdir(base), reverse=True):
+        directorio = os.path.join(base, nombre)
+        if directorio == conservar:
+            completas += 1
+            continue
+        estado = _leer_estado(directorio)
+        if estado is not None and estado.get("completo"):
+            if completas < maximo:
+                completas += 1
+                continue
+        elif nombre > os.path.basename(conservar):
+            # Ejecución posterior que sigue en curso
+            continue
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    grupo = parser.add_argument_group("checkpoints")
+    grupo.add_argument("--checkpoint", action="store_true",
+                       help="Guarda la salida de las etapas en disco para poder reanudar la ejecución")
+    grupo.add_argument("--reanudar", nargs="?", const="", metavar="DIR",
+                       help="Reanuda la última ejecución incompleta (o la indicada) desde la primera etapa "
+                            "pendiente; implica --checkpoint")
+
+
+def checkpoint_desde_argumentos(args: argparse.Namespace, proveedor: str) -> CheckpointScrape:
+    if args.reanudar is not None:
+        directorio = args.reanudar or ultima_ejecucion_incompleta(proveedor)
+        if directorio:
+            print(f"Reanudando ejecución: {directorio}", file=sys.stderr)
+            return CheckpointScrape(directorio)
+        print("No hay ejecuciones incompletas, se inicia una nueva", file=sys.stderr)
+    elif not args.checkpoint:
+        return CheckpointScrape()
+
+    nombre = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    return CheckpointScrape(os.path.join(dir_ejecuciones(proveedor), nombre))
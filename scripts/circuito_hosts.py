@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cortacircuitos por host de los sitios de los proveedores.
+Cuando afinia.com.co o surtigas.com.co están caídos, cada ejecución
+programada consume sus timeouts completos (30 s la página, 60 s el PDF,
+y en Surtigas además el arranque de Chrome y los WebDriverWait) antes de
+fallar, y los demás proveedores esperan detrás.
+
+Cada host tiene un circuito con tres estados, guardado entre ejecuciones
+(y compartido entre procesos, que lo actualizan con candado) en
+datos_tarifas/circuitos_hosts.json:
+
+- cerrado: las peticiones pasan. Los errores de conexión, timeouts y
+  respuestas 5xx cuentan como fallos; con UMBRAL_FALLOS seguidos se abre.
+- abierto: las descargas a ese host fallan al instante con
+  CircuitoAbierto (y Surtigas no abre Chrome) hasta que pasa la espera.
+- semiabierto: pasada la espera, la siguiente ejecución hace una prueba
+  barata (HEAD a la raíz del host con timeout corto). Si responde, el
+  circuito se cierra y la descarga sigue; si no, se vuelve a abrir con el
+  doble de espera (hasta ESPERA_MAXIMA). Mientras una ejecución prueba,
+  las demás siguen viendo el circuito abierto.
+
+Los 4xx (p. ej. el 403 de una página de bloqueo) no cuentan: el sitio
+responde. Con --sin-circuito las peticiones pasan siempre.
+"""
+
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from tarifas_comun import ruta_datos, escribir_atomico, candado_archivo
+
+
+UMBRAL_FALLOS = 3        # fallos seguidos que abren el circuito
+ESPERA_INICIAL = 300     # segundos abierto la primera vez
+ESPERA_MAXIMA = 6 * 3600
+FACTOR_ESPERA = 2        # cada prueba fallida duplica la espera
+TIMEOUT_PRUEBA = 5       # segundos de la prueba del estado semiabierto
+PRUEBA_MAXIMA = 30       # segundos tras los que una prueba sin terminar se da por abandonada
+
+
+class CircuitoAbierto(requests.ConnectionError):
+    pass
+
+
+def ruta_circuitos(directorio: Optional[str] = None) -> str:
+    return ruta_datos('circuitos_hosts.json', directorio=directorio)
+
+
+def host_de(url: str) -> str:
+    return urlsplit(url).hostname or ''
+
+
+class CircuitoHosts:
+    """Circuitos de los hosts; el estado se relee del disco en cada consulta."""
+
+    def __init__(self, directorio: Optional[str] = None, umbral: int = UMBRAL_FALLOS):
+        self.directorio = directorio
+        self.umbral = umbral
+
+    def _cargar(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(ruta_circuitos(self.directorio), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _candado(self):
+        """Candado del archivo: los proveedores corren a la vez y lo comparten."""
+        return candado_archivo(ruta_circuitos(self.directorio))
+
+    def _guardar(self, host: str, entrada: Dict[str, Any]):
+        """Escribe el circuito de un host (con el candado tomado); los demás hosts se conservan."""
+        circuitos = self._cargar()
+        entrada["cambiado"] = datetime.now().isoformat()
+        circuitos[host] = entrada
+        escribir_atomico(ruta_circuitos(self.directorio),
+                         json.dumps(circuitos, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def _abrir(self, host: str, entrada: Dict[str, Any], espera: float):
+        entrada["estado"] = "abierto"
+        entrada["espera"] = espera
+        entrada["abierto_hasta"] = (datetime.now() + timedelta(seconds=espera)).isoformat()
+        entrada.pop("prueba_desde", None)
+        self._guardar(host, entrada)
+        print(f"  Circuito de {host} abierto por {espera / 60:.0f} min "
+              f"({entrada.get('fallos', 0)} fallos; último: {entrada.get('ultimo_error')})", file=sys.stderr)
+
+    @staticmethod
+    def _probar(url: str) -> Optional[str]:
+        """None si el host responde, o el error."""
+        partes = urlsplit(url)
+        try:
+            response = requests.head(f"{partes.scheme}://{partes.netloc}/", timeout=TIMEOUT_PRUEBA,
+                                     allow_redirects=False)
+            response.close()
+        except requests.RequestException as e:
+            return str(e)
+        if response.status_code >= 500:
+            return f"HTTP {response.status_code}"
+        return None
+
+    def comprobar(self, url: str):
+        """Deja pasar la petición o lanza CircuitoAbierto; en semiabierto hace la prueba."""
+        host = host_de(url)
+        entrada = self._cargar().get(host)
+        if not entrada or entrada.get("estado") == "cerrado":
+            return
+
+        # Se relee con el candado: solo una ejecución pasa a semiabierto y prueba
+        with self._candado():
+            entrada = self._cargar().get(host)
+            if not entrada or entrada.get("estado") == "cerrado":
+                return
+            ahora = datetime.now()
+            prueba_desde = entrada.get("prueba_desde")
+            if prueba_desde and ahora - datetime.fromisoformat(prueba_desde) < timedelta(seconds=PRUEBA_MAXIMA):
+                raise CircuitoAbierto(f"Circuito de {host} semiabierto: otra ejecución está probando el sitio")
+            abierto_hasta = datetime.fromisoformat(entrada.get("abierto_hasta") or ahora.isoformat())
+            if ahora < abierto_hasta:
+                raise CircuitoAbierto(f"Circuito de {host} abierto hasta "
+                                      f"{abierto_hasta.isoformat(timespec='seconds')} "
+                                      f"(último error: {entrada.get('ultimo_error')})")
+
+            entrada["estado"] = "semiabierto"
+            entrada["prueba_desde"] = ahora.isoformat()
+            self._guardar(host, entrada)
+        print(f"  Circuito de {host} semiabierto: se prueba el sitio", file=sys.stderr)
+        error = self._probar(url)
+        if error is None:
+            self.exito(url)
+            return
+        entrada["ultimo_error"] = error
+        with self._candado():
+            self._abrir(host, entrada, min(entrada.get("espera", ESPERA_INICIAL) * FACTOR_ESPERA, ESPERA_MAXIMA))
+        raise CircuitoAbierto(f"Circuito de {host} abierto: la prueba falló ({error})")
+
+    def exito(self, url: str):
+        host = host_de(url)
+        entrada = self._cargar().get(host)
+        if not entrada or (entrada.get("estado") == "cerrado" and not entrada.get("fallos")):
+            return
+        with self._candado():
+            self._guardar(host, {"estado": "cerrado", "fallos": 0})
+        if entrada.get("estado") != "cerrado":
+            print(f"  Circuito de {host} cerrado: el sitio responde", file=sys.stderr)
+
+    def fallo(self, url: str, error: Exception):
+        host = host_de(url)
+        with self._candado():
+            entrada = self._cargar().get(host) or {"estado": "cerrado", "fallos": 0}
+            entrada["fallos"] = entrada.get("fallos", 0) + 1
+            entrada["ultimo_error"] = str(error)[:300]
+            if entrada.get("estado") == "cerrado" and entrada["fallos"] >= self.umbral:
+                self._abrir(host, entrada, ESPERA_INICIAL)
+            else:
+                self._guardar(host, entrada)
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--sin-circuito", action="store_true",
+                        help="Hace las peticiones aunque el circuito del host esté abierto "
+                             "(ver circuito_hosts.py)")
+
+
+def circuito_desde_argumentos(args: argparse.Namespace) -> Optional[CircuitoHosts]:
+    if args.sin_circuito:
+        return None
+    return CircuitoHosts(ruta_datos())
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conciliación masiva de facturas contra las tarifas de referencia - OptiFactura Montería
+Recalcula tarifaReferencia, diferenciaTarifa y porcentajeDiferencia (los mismos
+campos de AnalisisFactura) para exportaciones completas de facturas, p. ej. para
+revisar meses enteros después de una corrección de tarifas.
+
+- Lee el CSV o Parquet por bloques y escribe cada bloque al terminarlo, así la
+  memoria no depende del tamaño del archivo (millones de filas).
+- Cada factura se cruza por proveedor, estrato y fechaFactura con la instantánea
+  de tarifas vigente en esa fecha (datos_tarifas/historial/, ver snapshot_tarifas.py).
+- Los bloques se reparten en un pool de procesos; solo viajan las columnas de
+  cruce y el orden de salida es el de entrada.
+
+Columnas de entrada (se pueden renombrar con --columnas):
+    proveedor, estrato, fechaFactura, valorUnitario
+Columnas agregadas a la salida:
+    tarifaReferencia, diferenciaTarifa, porcentajeDiferencia, fechaTarifa, tarifaAproximada
+
+tarifaAproximada marca los mismos casos que "aproximado" en tarifas-service.js
+(estrato sin tarifa, se usa la primera) y además las facturas anteriores a la
+primera instantánea del historial.
+
+Con --resumenes, las filas conciliadas alimentan además los resúmenes del
+dashboard (ver resumenes_dashboard.py) sin volver a leer el archivo. Los
+resúmenes se reemplazan con lo que trae la entrada, así que se exige
+--exportacion-completa: con un archivo mensual quedarían solo ese mes.
+
+Uso:
+    python scripts/conciliar_facturas.py facturas_2026-09.csv conciliadas.csv
+    python scripts/conciliar_facturas.py facturas.parquet conciliadas.parquet --procesos 8
+    python scripts/conciliar_facturas.py facturas.csv salida.csv --columnas estrato=estratoUsuario
+    python scripts/conciliar_facturas.py analisis_factura.csv salida.csv --resumenes --exportacion-completa
+"""
+
+import sys
+import csv
+import json
+import math
+import os
+import time
+import argparse
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from tarifas_comun import DIR_DATOS, PROVEEDORES, normalizar_clave
+from snapshot_tarifas import SnapshotTarifas, historial_snapshots, ruta_snapshot
+from paginas_pdf import rss_pico_mb
+from resumenes_dashboard import COLUMNAS_FACTURA, AcumuladorResumenes
+
+
+TAMANO_BLOQUE = 50_000
+BLOQUES_EN_VUELO = 2  # por proceso: acota la memoria mientras se espera el bloque más antiguo
+
+COLUMNAS_CRUCE = ("proveedor", "estrato", "fechaFactura", "valorUnitario")
+COLUMNAS_RESULTADO = ("tarifaReferencia", "diferenciaTarifa", "porcentajeDiferencia",
+                      "fechaTarifa", "tarifaAproximada")
+FORMATOS_FECHA = ('%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+
+
+# ---------------------------------------------------------------------------
+# Índice de tarifas por proveedor y fecha (uno por proceso)
+# ---------------------------------------------------------------------------
+
+def _clave_estrato(valor: Any) -> str:
+    clave = normalizar_clave(valor)
+    if clave.startswith('estrato'):
+        clave = clave[len('estrato'):].strip()
+    if clave.endswith('.0'):  # estratos numéricos leídos como float
+        clave = clave[:-2]
+    return clave
+
+
+def _tabla_snapshot(ruta: str) -> Optional[Tuple[float, str, Dict[str, float], float]]:
+    """(inicio de vigencia, fechaExtraccion, tarifa por estrato, primera tarifa) de una instantánea."""
+    try:
+        with SnapshotTarifas(ruta) as snapshot:
+            fecha = snapshot.metadatos.get("fechaExtraccion")
+            tarifas = {_clave_estrato(snapshot.estrato(i)): snapshot.tarifa[i]
+                       for i in range(snapshot.n_tarifas) if not math.isnan(snapshot.tarifa[i])}
+            primera = next(iter(tarifas.values()), None)
+    except (OSError, ValueError) as e:
+        print(f"  Instantánea ignorada {ruta}: {str(e)}", file=sys.stderr)
+        return None
+    if not fecha or primera is None:
+        return None
+    return datetime.fromisoformat(fecha).timestamp(), fecha, tarifas, primera
+
+
+def cargar_indice(directorio: str) -> Dict[str, Dict[str, list]]:
+    """
+    Por proveedor: inicios de vigencia ordenados y la tabla de cada instantánea.
+    Se usan las archivadas en el historial más la vigente (la única que existe
+    si el historial es anterior a este script).
+    """
+    indice = {}
+    for proveedor in PROVEEDORES:
+        rutas = historial_snapshots(proveedor, directorio) + [ruta_snapshot(proveedor, directorio)]
+        tablas = {}
+        for ruta in rutas:
+            if os.path.exists(ruta):
+                tabla = _tabla_snapshot(ruta)
+                if tabla:
+                    tablas[tabla[1]] = tabla  # la vigente repite la última del historial
+        if tablas:
+            ordenadas = sorted(tablas.values(), key=lambda t: t[0])
+            indice[proveedor] = {
+                "inicios": [t[0] for t in ordenadas],
+                "tablas": [(t[1], t[2], t[3]) for t in ordenadas],
+            }
+    return indice
+
+
+_INDICE: Dict[str, Dict[str, list]] = {}
+
+
+def _iniciar_trabajador(directorio: str):
+    global _INDICE
+    _INDICE = cargar_indice(directorio)
+
+
+def _a_fecha(valor: Any) -> Optional[float]:
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, datetime):
+        return valor.timestamp()
+    if hasattr(valor, 'year'):  # date de Parquet
+        return datetime(valor.year, valor.month, valor.day).timestamp()
+    texto = str(valor).strip()
+    try:
+        return datetime.fromisoformat(texto).timestamp()
+    except ValueError:
+        pass
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def _a_numero(valor: Any) -> Optional[float]:
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor).strip().replace('$', '').replace(' ', '')
+    try:
+        return float(texto)
+    except ValueError:
+        pass
+    try:
+        # Formato colombiano: 1.234,56
+        return float(texto.replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def conciliar_bloque(proveedores: List[Any], estratos: List[Any], fechas: List[Any],
+                     valores: List[Any]) -> Dict[str, list]:
+    """
+    Calcula las columnas de resultado de un bloque. Igual que lib/analysis/engine.js,
+    la diferencia es valorUnitario - tarifa y vale 0 si falta alguno de los dos.
+    """
+    columnas = {nombre: [] for nombre in COLUMNAS_RESULTADO}
+    # Las exportaciones repiten mucho proveedor, (proveedor, fecha) y (tabla, estrato)
+    claves_proveedor: Dict[Any, str] = {}
+    tabla_por_fecha: Dict[Tuple[str, Any], Optional[Tuple[int, bool]]] = {}
+    estrato_por_tabla: Dict[Tuple[str, int, Any], Tuple[float, bool]] = {}
+
+    for proveedor, estrato, fecha, valor in zip(proveedores, estratos, fechas, valores):
+        clave_proveedor = claves_proveedor.get(proveedor)
+        if clave_proveedor is None:
+            clave_proveedor = claves_proveedor[proveedor] = normalizar_clave(proveedor)
+        datos = _INDICE.get(clave_proveedor)
+
+        ubicacion = None
+        if datos:
+            clave = (clave_proveedor, fecha)
+            if clave not in tabla_por_fecha:
+                momento = _a_fecha(fecha)
+                if momento is None:
+                    tabla_por_fecha[clave] = None
+                else:
+                    i = bisect_right(datos["inicios"], momento) - 1
+                    # Anterior al historial: la instantánea más antigua, marcada como aproximada
+                    tabla_por_fecha[clave] = (max(i, 0), i < 0)
+            ubicacion = tabla_por_fecha[clave]
+
+        if ubicacion is None:
+            for nombre in COLUMNAS_RESULTADO:
+                columnas[nombre].append(None)
+            continue
+
+        i, anterior = ubicacion
+        fecha_tarifa, tarifas, primera = datos["tablas"][i]
+        clave = (clave_proveedor, i, estrato)
+        if clave not in estrato_por_tabla:
+            tarifa = tarifas.get(_clave_estrato(estrato))
+            estrato_por_tabla[clave] = (primera, True) if tarifa is None else (tarifa, False)
+        tarifa, sin_estrato = estrato_por_tabla[clave]
+
+        valor_unitario = _a_numero(valor)
+        diferencia = porcentaje = 0.0
+        if valor_unitario and tarifa:
+            diferencia = valor_unitario - tarifa
+            porcentaje = diferencia / tarifa * 100
+
+        columnas["tarifaReferencia"].append(tarifa)
+        columnas["diferenciaTarifa"].append(diferencia)
+        columnas["porcentajeDiferencia"].append(porcentaje)
+        columnas["fechaTarifa"].append(fecha_tarifa)
+        columnas["tarifaAproximada"].append(anterior or sin_estrato)
+
+    return columnas
+
+
+# ---------------------------------------------------------------------------
+# Lectura y escritura por bloques
+# ---------------------------------------------------------------------------
+
+def _importar_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError as e:
+        print(json.dumps({
+            "error": f"Dependencias faltantes: {str(e)}. Ejecuta: pip install pyarrow (necesario para Parquet)"
+        }), file=sys.stderr)
+        sys.exit(1)
+
+
+def _es_parquet(ruta: str) -> bool:
+    return ruta.lower().endswith(('.parquet', '.pq'))
+
+
+class LectorCSV:
+    """Bloques de filas (listas) de un CSV; el encabezado define las columnas."""
+
+    def __init__(self, ruta: str, tamano_bloque: int):
+        self._archivo = open(ruta, 'r', encoding='utf-8-sig', newline='')
+        self._filas = csv.reader(self._archivo)
+        self.columnas = next(self._filas, [])
+        self.tamano_bloque = tamano_bloque
+
+    def bloques(self) -> Iterator[Any]:
+        bloque = []
+        for fila in self._filas:
+            bloque.append(fila)
+            if len(bloque) >= self.tamano_bloque:
+                yield bloque
+                bloque = []
+        if bloque:
+            yield bloque
+
+    def columna(self, bloque: List[List[str]], nombre: str) -> List[Any]:
+        if nombre not in self.columnas:
+            return [None] * len(bloque)
+        i = self.columnas.index(nombre)
+        return [fila[i] if i < len(fila) else None for fila in bloque]
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+class LectorParquet:
+    """Bloques (RecordBatch) de un Parquet leídos por grupos, sin cargar el archivo."""
+
+    def __init__(self, ruta: str, tamano_bloque: int):
+        pa = _importar_pyarrow()
+        self._archivo = pa.parquet.ParquetFile(ruta)
+        self.esquema = self._archivo.schema_arrow
+        self.columnas = list(self.esquema.names)
+        self.tamano_bloque = tamano_bloque
+
+    def bloques(self) -> Iterator[Any]:
+        return self._archivo.iter_batches(batch_size=self.tamano_bloque)
+
+    def columna(self, bloque, nombre: str) -> List[Any]:
+        if nombre not in self.columnas:
+            return [None] * bloque.num_rows
+        return bloque.column(self.columnas.index(nombre)).to_pylist()
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+def abrir_lector(ruta: str, tamano_bloque: int = TAMANO_BLOQUE):
+    """LectorParquet o LectorCSV según la extensión."""
+    return (LectorParquet if _es_parquet(ruta) else LectorCSV)(ruta, tamano_bloque)
+
+
+class EscritorCSV:
+    def __init__(self, ruta: str, columnas: List[str]):
+        self._archivo = open(ruta, 'w', encoding='utf-8', newline='')
+        self._escritor = csv.writer(self._archivo)
+        self._escritor.writerow(list(columnas) + list(COLUMNAS_RESULTADO))
+
+    def escribir(self, lector, bloque, resultado: Dict[str, list]):
+        if isinstance(lector, LectorParquet):
+            bloque = [list(fila) for fila in zip(*(columna.to_pylist() for columna in bloque.columns))]
+        extras = zip(*(resultado[nombre] for nombre in COLUMNAS_RESULTADO))
+        self._escritor.writerows(fila + ['' if v is None else v for v in extra]
+                                 for fila, extra in zip(bloque, extras))
+        self._archivo.flush()
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+class EscritorParquet:
+    def __init__(self, ruta: str, lector):
+        pa = self._pa = _importar_pyarrow()
+        if isinstance(lector, LectorParquet):
+            campos = list(lector.esquema)
+        else:
+            campos = [pa.field(nombre, pa.string()) for nombre in lector.columnas]
+        campos += [
+            pa.field("tarifaReferencia", pa.float64()),
+            pa.field("diferenciaTarifa", pa.float64()),
+            pa.field("porcentajeDiferencia", pa.float64()),
+            pa.field("fechaTarifa", pa.string()),
+            pa.field("tarifaAproximada", pa.bool_()),
+        ]
+        self.esquema = pa.schema(campos)
+        self._escritor = pa.parquet.ParquetWriter(ruta, self.esquema)
+
+    def escribir(self, lector, bloque, resultado: Dict[str, list]):
+        pa = self._pa
+        if isinstance(lector, LectorParquet):
+            columnas = list(bloque.columns)
+        else:
+            columnas = [pa.array(lector.columna(bloque, nombre), pa.string()) for nombre in lector.columnas]
+        n = len(lector.columnas)
+        columnas += [pa.array(resultado[nombre], self.esquema.field(n + i).type)
+                     for i, nombre in enumerate(COLUMNAS_RESULTADO)]
+        self._escritor.write_batch(pa.RecordBatch.from_arrays(columnas, schema=self.esquema))
+
+    def cerrar(self):
+        self._escritor.close()
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+def conciliar_archivo(entrada: str, salida: str, directorio: str = DIR_DATOS,
+                      tamano_bloque: int = TAMANO_BLOQUE, procesos: Optional[int] = None,
+                      columnas: Optional[Dict[str, str]] = None,
+                      resumen: Optional[AcumuladorResumenes] = None) -> Dict[str, Any]:
+    """
+    Concilia un archivo completo y retorna estadísticas. Con procesos=1 todo
+    corre en este proceso (útil para depurar y para archivos pequeños).
+    Con un acumulador de resúmenes, cada bloque escrito se agrega también ahí.
+    """
+    columnas = {**{c: c for c in COLUMNAS_CRUCE}, **(columnas or {})}
+    procesos = procesos or os.cpu_count() or 1
+    inicio = time.perf_counter()
+
+    lector = abrir_lector(entrada, tamano_bloque)
+    faltantes = [c for c in ("proveedor", "fechaFactura") if columnas[c] not in lector.columnas]
+    if faltantes:
+        lector.cerrar()
+        raise ValueError(f"Faltan columnas en {entrada}: {', '.join(columnas[c] for c in faltantes)}")
+
+    escritor = EscritorParquet(salida, lector) if _es_parquet(salida) else EscritorCSV(salida, lector.columnas)
+    estadisticas = {"filas": 0, "bloques": 0, "sin_tarifa": 0, "aproximadas": 0}
+
+    def argumentos(bloque):
+        return [lector.columna(bloque, columnas[c]) for c in COLUMNAS_CRUCE]
+
+    def escribir(bloque, resultado):
+        escritor.escribir(lector, bloque, resultado)
+        if resumen is not None:
+            # Los resúmenes usan la diferencia recién conciliada, no la de la exportación
+            resumen.agregar_bloque({
+                **{c: lector.columna(bloque, columnas.get(c, c)) for c in COLUMNAS_FACTURA},
+                "diferenciaTarifa": resultado["diferenciaTarifa"],
+                "porcentajeDiferencia": resultado["porcentajeDiferencia"],
+            })
+        estadisticas["filas"] += len(resultado["tarifaReferencia"])
+        estadisticas["bloques"] += 1
+        estadisticas["sin_tarifa"] += sum(1 for t in resultado["tarifaReferencia"] if t is None)
+        estadisticas["aproximadas"] += sum(1 for a in resultado["tarifaAproximada"] if a)
+        print(f"  Bloque {estadisticas['bloques']}: {estadisticas['filas']} filas conciliadas", file=sys.stderr)
+
+    try:
+        if procesos == 1:
+            _iniciar_trabajador(directorio)
+            for bloque in lector.bloques():
+                escribir(bloque, conciliar_bloque(*argumentos(bloque)))
+        else:
+            with ProcessPoolExecutor(procesos, initializer=_iniciar_trabajador, initargs=(directorio,)) as pool:
+                pendientes = deque()
+                for bloque in lector.bloques():
+                    pendientes.append((bloque, pool.submit(conciliar_bloque, *argumentos(bloque))))
+                    # Se escribe en orden y sin acumular más de unos pocos bloques por proceso
+                    while len(pendientes) >= procesos * BLOQUES_EN_VUELO:
+                        anterior, futuro = pendientes.popleft()
+                        escribir(anterior, futuro.result())
+                while pendientes:
+                    anterior, futuro = pendientes.popleft()
+                    escribir(anterior, futuro.result())
+    finally:
+        lector.cerrar()
+        escritor.cerrar()
+
+    estadisticas["segundos"] = round(time.perf_counter() - inicio, 2)
+    estadisticas["filas_por_segundo"] = round(estadisticas["filas"] / max(estadisticas["segundos"], 1e-9))
+    pico = rss_pico_mb()
+    estadisticas["rss_pico_mb"] = None if pico is None else round(pico, 1)
+    return estadisticas
+
+
+def _parsear_columnas(texto: str) -> Dict[str, str]:
+    columnas = {}
+    for par in texto.split(','):
+        if not par.strip():
+            continue
+        clave, _, nombre = par.partition('=')
+        if clave.strip() not in COLUMNAS_CRUCE or not nombre.strip():
+            raise argparse.ArgumentTypeError(
+                f"Columna inválida '{par}' (columnas: {', '.join(COLUMNAS_CRUCE)})")
+        columnas[clave.strip()] = nombre.strip()
+    return columnas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conciliación masiva de facturas contra tarifas de referencia")
+    parser.add_argument("entrada", help="CSV o Parquet de facturas")
+    parser.add_argument("salida", help="CSV o Parquet de salida (según la extensión)")
+    parser.add_argument("--dir-datos", default=DIR_DATOS, help="Directorio con las instantáneas y su historial")
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE, help="Filas por bloque")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--columnas", type=_parsear_columnas, default={}, metavar="CLAVE=NOMBRE,...",
+                        help="Nombres de las columnas de cruce en la entrada, p. ej. estrato=estratoUsuario")
+    parser.add_argument("--resumenes", action="store_true",
+                        help="Actualiza los resúmenes del dashboard con las filas conciliadas "
+                             "(la entrada debe ser la exportación completa de analisis_factura)")
+    parser.add_argument("--exportacion-completa", action="store_true",
+                        help="Confirma que la entrada es la exportación completa; requerido con --resumenes")
+    args = parser.parse_args()
+
+    if args.resumenes and not args.exportacion_completa:
+        parser.error("--resumenes reemplaza los resúmenes de todos los usuarios con lo que trae la entrada; "
+                     "úsalo solo con la exportación completa de analisis_factura y --exportacion-completa")
+
+    resumen = AcumuladorResumenes() if args.resumenes else None
+    try:
+        estadisticas = conciliar_archivo(args.entrada, args.salida, args.dir_datos,
+                                         args.bloque, args.procesos, args.columnas, resumen)
+        if resumen is not None:
+            estadisticas["resumenes"] = resumen.escribir(args.dir_datos)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
+        sys.exit(1)
+
+    print(json.dumps(estadisticas, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
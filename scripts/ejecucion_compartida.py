@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Una sola ejecución en curso por proveedor (single-flight).
+Cada "actualizar tarifas" de un usuario y cada corrida del planificador
+lanzan su propio scrape_<proveedor>.py; si se superponen, todos descargan
+las mismas páginas y procesan el mismo PDF al mismo tiempo.
+
+El primer proceso toma un candado exclusivo (flock) sobre
+datos_tarifas/en_curso/<proveedor>-<clave>.lock, hace el scrape, publica
+el resultado en <proveedor>-<clave>.json y suelta el candado. Los que
+llegan mientras el candado está tomado esperan a que se libere y
+escriben el resultado publicado, en su propio --format, sin tocar el
+sitio del proveedor. Si la ejecución en curso muere sin publicar (el
+kernel libera el candado), uno de los que esperaban toma el candado y
+hace el scrape (los procesos hijos creados con fork, como el de la
+extracción del PDF, cierran el candado heredado para no retenerlo). Lo mismo con un resultado parcial (plazos excedidos), que
+no se publica.
+
+La clave es un hash de los argumentos salvo --format: solo se comparte el
+resultado de una ejecución pedida con las mismas opciones. Un resultado se
+comparte si terminó después de que el proceso empezó a esperar (con un
+margen para el instante entre publicar y soltar el candado).
+
+Con --sin-ejecucion-compartida, o donde no hay fcntl (Windows), cada
+proceso hace su propio scrape.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from tarifas_comun import ruta_datos, escribir_atomico
+from modelo_tarifas import serializar
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sin flock cada proceso hace su propio scrape
+    fcntl = None
+
+
+ESPERA_MAXIMA = 1200      # segundos esperando una ejecución en curso antes de desistir
+INTERVALO_SONDEO = 0.2    # segundos entre intentos de tomar el candado
+MARGEN_PUBLICACION = 2.0  # segundos entre publicar el resultado y soltar el candado
+
+# Argumentos que no cambian el resultado
+ARGUMENTOS_IGNORADOS = ('format', 'sin_ejecucion_compartida', 'espera_compartida',
+                        'servir_vigente', 'vigencia_horas', 'antiguedad_maxima_horas', 'revalidacion')
+
+
+def dir_en_curso(directorio: Optional[str] = None) -> str:
+    return ruta_datos('en_curso', directorio=directorio)
+
+
+def clave_argumentos(args: argparse.Namespace) -> str:
+    """Hash de las opciones que afectan el resultado."""
+    opciones = {k: v for k, v in sorted(vars(args).items()) if k not in ARGUMENTOS_IGNORADOS}
+    return hashlib.sha1(json.dumps(opciones, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+# Candados tomados por este proceso; un hijo creado con fork no los conserva
+_CANDADOS = set()
+
+
+def _cerrar_candados_heredados():
+    for fd in _CANDADOS:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    _CANDADOS.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_cerrar_candados_heredados)
+
+
+class EjecucionCompartida:
+    """
+    Candado y resultado publicado de un proveedor. Sin directorio (o sin
+    fcntl) no hace nada y cada proceso hace su scrape, así el __main__
+    puede llamarlo siempre.
+    """
+
+    def __init__(self, proveedor: Optional[str] = None, clave: str = '',
+                 directorio: Optional[str] = None, espera_maxima: float = ESPERA_MAXIMA):
+        self.proveedor = proveedor
+        self.directorio = directorio
+        self.espera_maxima = espera_maxima
+        self._fd: Optional[int] = None
+        self._inicio: Optional[str] = None
+        if self.activo:
+            base = os.path.join(dir_en_curso(directorio), f"{proveedor}-{clave}")
+            self.ruta_candado = base + '.lock'
+            self.ruta_resultado = base + '.json'
+
+    @property
+    def activo(self) -> bool:
+        return self.proveedor is not None and self.directorio is not None and fcntl is not None
+
+    def _tomar(self, modo: int) -> bool:
+        try:
+            fcntl.flock(self._fd, modo | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _leer_publicado(self, desde: float) -> Optional[Dict[str, Any]]:
+        """Resultado publicado por una ejecución que terminó después de 'desde'."""
+        try:
+            with open(self.ruta_resultado, 'r', encoding='utf-8') as f:
+                publicado = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if publicado.get("fin_epoch", 0) < desde - MARGEN_PUBLICACION:
+            return None
+        return publicado
+
+    def en_curso(self) -> bool:
+        """Indica si otro proceso tiene el candado (hay una ejecución en curso)."""
+        if not self.activo or self._fd is not None:
+            return False
+        try:
+            fd = os.open(self.ruta_candado, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            return False
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+
+    def resultado_en_curso(self) -> Optional[Dict[str, Any]]:
+        """
+        None si este proceso queda a cargo del scrape (con el candado tomado
+        hasta publicar()), o el resultado de la ejecución que estaba en curso.
+        """
+        if not self.activo:
+            return None
+        os.makedirs(dir_en_curso(self.directorio), exist_ok=True)
+        self._fd = os.open(self.ruta_candado, os.O_RDWR | os.O_CREAT, 0o644)
+
+        llegada = time.time()
+        avisado = False
+        while True:
+            if self._tomar(fcntl.LOCK_EX):
+                self._inicio = datetime.now().isoformat()
+                os.ftruncate(self._fd, 0)
+                os.pwrite(self._fd, f"{os.getpid()} {self._inicio}\n".encode('utf-8'), 0)
+                _CANDADOS.add(self._fd)
+                return None
+
+            if not avisado:
+                print(f"Hay una ejecución de {self.proveedor} en curso; se espera su resultado", file=sys.stderr)
+                avisado = True
+            # Candado compartido: se obtiene cuando la ejecución en curso lo suelta
+            while not self._tomar(fcntl.LOCK_SH):
+                if time.time() - llegada > self.espera_maxima:
+                    print(json.dumps({
+                        "error": f"La ejecución en curso de {self.proveedor} no terminó "
+                                 f"en {self.espera_maxima:.0f} s"
+                    }, ensure_ascii=False), file=sys.stderr)
+                    sys.exit(1)
+                time.sleep(INTERVALO_SONDEO)
+
+            publicado = self._leer_publicado(llegada)
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            if publicado is not None:
+                os.close(self._fd)
+                self._fd = None
+                print(f"Resultado compartido de la ejecución de {self.proveedor} "
+                      f"iniciada {publicado.get('inicio')} (pid {publicado.get('pid')})", file=sys.stderr)
+                return publicado["resultado"]
+            # La ejecución en curso terminó sin publicar: se intenta tomar su lugar
+            print(f"La ejecución en curso de {self.proveedor} terminó sin resultado; se reintenta",
+                  file=sys.stderr)
+
+    def publicar(self, resultado: Dict[str, Any]):
+        """Publica el resultado para los que esperan y suelta el candado."""
+        if self._fd is None:
+            return
+        try:
+            escribir_atomico(self.ruta_resultado, serializar({
+                "pid": os.getpid(),
+                "inicio": self._inicio,
+                "fin": datetime.now().isoformat(),
+                "fin_epoch": time.time(),
+                "resultado": resultado,
+            }))
+        finally:
+            self.soltar()
+
+    def soltar(self):
+        """Suelta el candado sin publicar; los que esperan hacen su propio scrape."""
+        if self._fd is None:
+            return
+        _CANDADOS.discard(self._fd)
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--sin-ejecucion-compartida", action="store_true",
+                        help="Hace el scrape aunque haya otra ejecución del proveedor en curso "
+                             "(ver ejecucion_compartida.py)")
+    parser.add_argument("--espera-compartida", type=float, default=ESPERA_MAXIMA, metavar="SEGUNDOS",
+                        help=f"Espera máxima por una ejecución en curso (por defecto {ESPERA_MAXIMA} s)")
+
+
+def compartida_desde_argumentos(args: argparse.Namespace, proveedor: str) -> EjecucionCompartida:
+    if args.sin_ejecucion_compartida:
+        return EjecucionCompartida()
+    return EjecucionCompartida(proveedor, clave_argumentos(args), ruta_datos(), args.espera_compartida)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Búsqueda de varios patrones en una sola pasada sobre el texto de una página.
+Antes cada página se recorría una vez por patrón: seis re.search para los
+componentes de Afinia, tres para el CU, varios findall de subsidios... y
+el costo por página crecía con cada patrón que se agregaba.
+
+Cada Patron declara sus anclas: los literales con los que puede empezar una
+coincidencia (p. ej. 'generación' para r'generaci[oó]n[:\\s]*([\\d.,]+)').
+Un autómata de Aho-Corasick con todas las anclas recorre el texto una sola
+vez y la expresión de cada patrón solo se prueba (con match()) donde
+apareció una de sus anclas. El resultado es el mismo que re.search (la
+primera coincidencia) y re.findall (todas, sin solaparse), siempre que las
+anclas cubran todos los comienzos posibles de la expresión. Las variantes
+sin tilde de las anclas se agregan solas.
+
+Para patrones cuyo valor va antes del ancla (r'([\\d.,]+)\\s*\\$/kWh'), con
+antes=True la expresión se busca en los VENTANA_ANTES caracteres previos al
+ancla y debe terminar en ella (r'([\\d.,]+)\\s*$').
+
+Los huecos entre la etiqueta y el valor ("Estrato 1 ...... 70%") van
+con HUECO y los valores seguidos de más expresión con VALOR: con [^0-9]*
+y [\\d.,]+ sin límite, el motor de re retrocede de forma cuadrática ante
+una línea de puntos guía sin '%' (ver peor_caso_regex.py).
+
+El texto se pasa a minúsculas una vez; las anclas van en minúsculas.
+Con pyahocorasick instalado el autómata es el de C; si no, uno en Python
+con el mismo resultado.
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from tarifas_comun import normalizar_clave
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+VENTANA_ANTES = 40  # caracteres antes del ancla para los patrones con antes=True
+
+# Fragmentos acotados para las expresiones: el trabajo por ancla queda
+# limitado y el costo total es lineal en el largo del texto
+HUECO = r'[^0-9]{0,120}'    # texto sin dígitos entre la etiqueta y el valor (una línea larga)
+VALOR = r'([\d.,]{1,20})'   # "1.234.567,89" con margen
+
+
+class Automata:
+    """Aho-Corasick sobre literales: todas las apariciones (también solapadas) en una pasada."""
+
+    def __init__(self, palabras: Iterable[str]):
+        self.palabras = sorted(set(p for p in palabras if p))
+        self._c = None
+        if ahocorasick is not None and self.palabras:
+            self._c = ahocorasick.Automaton()
+            for palabra in self.palabras:
+                self._c.add_word(palabra, palabra)
+            self._c.make_automaton()
+        elif self.palabras:
+            self._construir()
+
+    def _construir(self):
+        # Trie: transiciones, estado de falla y palabras que terminan en cada estado
+        self._ir: List[Dict[str, int]] = [{}]
+        self._falla: List[int] = [0]
+        self._salida: List[Tuple[str, ...]] = [()]
+        for palabra in self.palabras:
+            estado = 0
+            for caracter in palabra:
+                siguiente = self._ir[estado].get(caracter)
+                if siguiente is None:
+                    siguiente = len(self._ir)
+                    self._ir.append({})
+                    self._falla.append(0)
+                    self._salida.append(())
+                    self._ir[estado][caracter] = siguiente
+                estado = siguiente
+            self._salida[estado] += (palabra,)
+
+        cola = deque(self._ir[0].values())
+        while cola:
+            estado = cola.popleft()
+            for caracter, siguiente in self._ir[estado].items():
+                cola.append(siguiente)
+                falla = self._falla[estado]
+                while falla and caracter not in self._ir[falla]:
+                    falla = self._falla[falla]
+                destino = self._ir[falla].get(caracter, 0)
+                self._falla[siguiente] = destino if destino != siguiente else 0
+                self._salida[siguiente] += self._salida[self._falla[siguiente]]
+
+    def _iterar(self, texto: str):
+        """(índice del último carácter, palabra) en orden de fin."""
+        if self._c is not None:
+            yield from self._c.iter(texto)
+            return
+        ir, falla, salida = self._ir, self._falla, self._salida
+        estado = 0
+        for i, caracter in enumerate(texto):
+            while estado and caracter not in ir[estado]:
+                estado = falla[estado]
+            estado = ir[estado].get(caracter, 0)
+            for palabra in salida[estado]:
+                yield i, palabra
+
+    def buscar(self, texto: str) -> List[Tuple[int, str]]:
+        """(inicio, palabra) de cada aparición, ordenadas por inicio."""
+        if not self.palabras:
+            return []
+        return sorted((fin - len(palabra) + 1, palabra) for fin, palabra in self._iterar(texto))
+
+    def contiene(self, texto: str) -> bool:
+        if not self.palabras:
+            return False
+        return next(self._iterar(texto), None) is not None
+
+
+@dataclass(slots=True)
+class Patron:
+    nombre: str
+    anclas: Tuple[str, ...]
+    expresion: str
+    antes: bool = False  # la expresión termina en el ancla en lugar de empezar en ella
+
+
+def palabras_clave(palabras: Sequence[str]) -> Automata:
+    """Autómata para chequeos de 'alguna de estas palabras está en el texto'."""
+    return Automata(list(palabras) + [normalizar_clave(p) for p in palabras])
+
+
+class Escaner:
+    """Conjunto de patrones que se buscan juntos en una sola pasada por texto."""
+
+    def __init__(self, patrones: Sequence[Patron]):
+        self.patrones = list(patrones)
+        self._por_ancla: Dict[str, List[Tuple[Patron, re.Pattern]]] = {}
+        for patron in self.patrones:
+            expresion = re.compile(patron.expresion, re.IGNORECASE)
+            anclas = set(a.lower() for a in patron.anclas)
+            anclas |= set(normalizar_clave(a) for a in anclas)
+            for ancla in anclas:
+                self._por_ancla.setdefault(ancla, []).append((patron, expresion))
+        self._automata = Automata(self._por_ancla)
+
+    def buscar(self, texto: str) -> Dict[str, List[re.Match]]:
+        """
+        Coincidencias de cada patrón (por nombre) en orden y sin solaparse,
+        como re.findall; la primera de la lista es la de re.search. Los
+        grupos se leen del texto en minúsculas.
+        """
+        texto = texto.lower()
+        coincidencias: Dict[str, List[re.Match]] = {p.nombre: [] for p in self.patrones}
+        fin_anterior: Dict[str, int] = {}
+        for inicio, ancla in self._automata.buscar(texto):
+            for patron, expresion in self._por_ancla[ancla]:
+                if inicio < fin_anterior.get(patron.nombre, 0):
+                    continue
+                if patron.antes:
+                    match = expresion.search(texto, max(0, inicio - VENTANA_ANTES), inicio)
+                else:
+                    match = expresion.match(texto, inicio)
+                if match and match.start() >= fin_anterior.get(patron.nombre, 0):
+                    coincidencias[patron.nombre].append(match)
+                    fin_anterior[patron.nombre] = max(match.end(), inicio + 1)
+        return coincidencias
+
+
+def primera(coincidencias: Dict[str, List[re.Match]], nombre: str) -> Optional[re.Match]:
+    """La coincidencia que habría dado re.search, o None."""
+    lista = coincidencias.get(nombre)
+    return lista[0] if lista else None
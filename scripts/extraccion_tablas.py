@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extracción rápida de tablas de PDFs de tarifas.
+page.extract_tables() de pdfplumber calcula intersecciones de líneas y bordes
+en toda la página, y es lo más costoso de extraer_tarifas_de_pdf(). Los
+boletines de tarifas tienen filas simples ("Estrato N" + valores), así que
+basta con agrupar los caracteres ya parseados (page.chars) por coordenada y
+(filas) y por separación en x (celdas y columnas). El resultado tiene la
+misma forma que extract_tables(): una lista de tablas, cada una lista de
+filas de celdas (str o None).
+
+Con cualquiera de los dos extractores, la detección se limita por defecto a
+la región de la tabla: se ubican palabras ancla (Estrato, Cargo fijo,
+Consumo, Nivel de tensión) en las líneas de texto ya calculadas y se recorta
+la página (page.crop) a esa franja, dejando fuera encabezados, texto legal
+y logos.
+
+Uso:
+    python scripts/extraccion_tablas.py benchmark boletin.pdf [otro.pdf ...]
+"""
+
+import json
+import re
+import time
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+EXTRACTORES = ('pdfplumber', 'rapido')
+
+TOLERANCIA_FILA = 3.0         # diferencia máxima de 'top' entre caracteres de una misma fila
+SEPARACION_MINIMA_CELDA = 4.0  # separación horizontal mínima entre celdas (puntos)
+FACTOR_SEPARACION = 0.6        # o una fracción del tamaño de fuente, si es mayor
+FACTOR_ESPACIO = 0.15          # hueco (en tamaños de fuente) que equivale a un espacio
+TOLERANCIA_COLUMNA = 8.0       # distancia máxima entre inicios de celda de una columna
+FACTOR_SALTO_TABLA = 2.5       # separación vertical (en alturas de línea) que cierra una tabla
+
+MARGEN_REGION = 1.5            # margen del recorte (en alturas de línea) para incluir bordes
+
+# Sin alguna de estas etiquetas la página no puede tener filas de tarifa
+ETIQUETAS_FILA = ('estrato', 'comercial', 'industrial', 'oficial', 'gnv', 'residencial')
+# Prefiltro de anclas por subcadena (mucho más barato que la regex sobre toda la página)
+PALABRAS_ANCLA = ('estrato', 'cargo', 'consumo', 'nivel')
+
+# Palabras que marcan el encabezado de una tabla de tarifas y etiquetas de sus filas
+ANCLAS_TABLA = re.compile(r'estrato|cargo\s*fijo|consumo|nivel\s*de\s*tensi[oó]n', re.IGNORECASE)
+INICIO_FILA = re.compile(r'^(estrato\s*\d|[1-6]\b|comercial|industrial|oficial|gnv|residencial)', re.IGNORECASE)
+
+Tabla = List[List[Optional[str]]]
+
+
+def _contiene_alguna(texto: str, palabras) -> bool:
+    texto = texto.lower()
+    return any(palabra in texto for palabra in palabras)
+
+
+def _agrupar_filas(caracteres: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    filas: List[List[Dict[str, Any]]] = []
+    for c in sorted(caracteres, key=lambda c: (c['top'], c['x0'])):
+        if filas and c['top'] - filas[-1][0]['top'] <= TOLERANCIA_FILA:
+            filas[-1].append(c)
+        else:
+            filas.append([c])
+    return filas
+
+
+def _celdas_de_fila(fila: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Une caracteres contiguos en celdas; un hueco horizontal grande abre una celda nueva."""
+    celdas: List[Dict[str, Any]] = []
+    for c in sorted(fila, key=lambda c: c['x0']):
+        hueco = c['x0'] - celdas[-1]['x1'] if celdas else None
+        if hueco is not None and hueco <= max(SEPARACION_MINIMA_CELDA, FACTOR_SEPARACION * c['size']):
+            if hueco > FACTOR_ESPACIO * c['size']:
+                celdas[-1]['texto'] += ' '
+            celdas[-1]['texto'] += c['text']
+            celdas[-1]['x1'] = c['x1']
+        else:
+            celdas.append({'texto': c['text'], 'x0': c['x0'], 'x1': c['x1']})
+    return celdas
+
+
+def _columnas(filas: List[List[Dict[str, Any]]]) -> List[float]:
+    """Inicios de columna: agrupa los x0 de todas las celdas del bloque."""
+    inicios = sorted(celda['x0'] for fila in filas for celda in fila)
+    columnas: List[List[float]] = []
+    for x in inicios:
+        if columnas and x - columnas[-1][-1] <= TOLERANCIA_COLUMNA:
+            columnas[-1].append(x)
+        else:
+            columnas.append([x])
+    return [min(grupo) for grupo in columnas]
+
+
+def _armar_tabla(filas: List[List[Dict[str, Any]]]) -> Tabla:
+    columnas = _columnas(filas)
+    tabla: Tabla = []
+    for fila in filas:
+        valores: List[Optional[str]] = [None] * len(columnas)
+        for celda in fila:
+            # Columna cuyo inicio está más cerca del inicio de la celda
+            idx = min(range(len(columnas)), key=lambda i: abs(columnas[i] - celda['x0']))
+            valores[idx] = celda['texto'] if valores[idx] is None else valores[idx] + ' ' + celda['texto']
+        tabla.append(valores)
+    return tabla
+
+
+def extraer_tablas_rapido(page, texto: Optional[str] = None,
+                          region: Optional[Tuple[float, float, float, float]] = None) -> List[Tabla]:
+    """
+    Extrae tablas agrupando caracteres en filas (por y) y celdas (por huecos en x).
+    Un bloque de filas consecutivas con al menos dos celdas forma una tabla.
+    Las páginas sin etiquetas de estrato/categoría se descartan sin agrupar
+    (si ya se tiene el texto de la página, pasarlo evita reconstruirlo).
+    Con region solo se usan los caracteres dentro de esa franja vertical.
+    """
+    if texto is not None and not _contiene_alguna(texto, ETIQUETAS_FILA):
+        return []
+    caracteres = [c for c in page.chars if not c['text'].isspace()]
+    if region is not None:
+        caracteres = [c for c in caracteres if c['top'] >= region[1] and c['bottom'] <= region[3]]
+    if not caracteres or not _contiene_alguna(''.join(c['text'] for c in caracteres), ETIQUETAS_FILA):
+        return []
+
+    tablas: List[Tabla] = []
+    bloque: List[List[Dict[str, Any]]] = []
+    fondo_anterior = None
+
+    for fila in _agrupar_filas(caracteres):
+        celdas = _celdas_de_fila(fila)
+        top = min(p['top'] for p in fila)
+        altura = max(p['bottom'] - p['top'] for p in fila)
+        separada = fondo_anterior is not None and top - fondo_anterior > FACTOR_SALTO_TABLA * altura
+
+        if len(celdas) < 2 or separada:
+            if len(bloque) >= 2:
+                tablas.append(_armar_tabla(bloque))
+            bloque = []
+
+        if len(celdas) >= 2:
+            bloque.append(celdas)
+        fondo_anterior = max(p['bottom'] for p in fila)
+
+    if len(bloque) >= 2:
+        tablas.append(_armar_tabla(bloque))
+    return tablas
+
+
+def region_tabla(page, texto: Optional[str] = None) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Franja de la página que contiene las tablas de tarifas: desde la primera
+    línea con una palabra ancla hasta la última línea ancla o de estrato/categoría.
+    Las líneas salen del mapa de texto que extract_text() ya calculó.
+    Retorna None si la página no tiene anclas.
+    """
+    if texto is not None and not _contiene_alguna(texto, PALABRAS_ANCLA):
+        return None
+    lineas = page.extract_text_lines(return_chars=False)
+    inicio = next((i for i, linea in enumerate(lineas) if ANCLAS_TABLA.search(linea['text'])), None)
+    if inicio is None:
+        return None
+
+    top = lineas[inicio]['top']
+    bottom = lineas[inicio]['bottom']
+    altura = bottom - top
+    for linea in lineas[inicio + 1:]:
+        if ANCLAS_TABLA.search(linea['text']) or INICIO_FILA.match(linea['text']):
+            bottom = linea['bottom']
+            altura = max(altura, linea['bottom'] - linea['top'])
+
+    x0, y0, x1, y1 = page.bbox
+    margen = MARGEN_REGION * altura
+    return (x0, max(y0, top - margen), x1, min(y1, bottom + margen))
+
+
+def extraer_tablas(page, extractor: str = 'pdfplumber', texto: Optional[str] = None,
+                   recortar: bool = True) -> List[Tabla]:
+    """
+    Extrae las tablas de una página con el extractor indicado. Con recortar,
+    solo se analiza la región de la tabla (toda la página si no hay anclas).
+    """
+    region = region_tabla(page, texto) if recortar else None
+    if extractor == 'rapido':
+        # Filtrar caracteres por la franja es más barato que construir un CroppedPage
+        return extraer_tablas_rapido(page, texto, region)
+    if region is not None and region != page.bbox:
+        page = page.crop(region)
+    return page.extract_tables()
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser, por_defecto: str = 'pdfplumber'):
+    parser.add_argument("--extractor-tablas", choices=EXTRACTORES, default=por_defecto,
+                        help=f"Extractor de tablas del PDF (por defecto: {por_defecto})")
+    parser.add_argument("--sin-recorte-tablas", action="store_true",
+                        help="Busca tablas en toda la página en lugar de solo en la región de las anclas")
+
+
+def _filas_de_tarifa(tablas: List[Tabla]) -> Dict[str, List[str]]:
+    """Filas con estrato/categoría -> valores numéricos, para comparar extractores."""
+    filas = {}
+    for tabla in tablas:
+        for fila in tabla:
+            if not fila or not fila[0]:
+                continue
+            etiqueta = str(fila[0]).strip().lower()
+            if re.match(r'^(estrato\s*\d|[1-6]$|comercial|industrial|oficial|gnv)', etiqueta):
+                valores = [re.sub(r'\s+', '', str(c)) for c in fila[1:] if c and re.search(r'\d', str(c))]
+                filas.setdefault(etiqueta, valores)
+    return filas
+
+
+# Variantes comparadas: nombre -> (extractor, recortar). La referencia es la primera.
+VARIANTES = {
+    'pdfplumber': ('pdfplumber', False),
+    'pdfplumber_recorte': ('pdfplumber', True),
+    'rapido': ('rapido', False),
+    'rapido_recorte': ('rapido', True),
+}
+
+
+def benchmark(rutas: List[str], repeticiones: int = 3) -> Dict[str, Any]:
+    """
+    Compara extractores con y sin recorte: tiempo, tablas detectadas y
+    coincidencia de las filas de tarifas tomando pdfplumber en toda la
+    página como referencia.
+    """
+    import pdfplumber
+
+    resumen: Dict[str, Any] = {"archivos": [], "tiempo_s": {v: 0.0 for v in VARIANTES}}
+    tablas_total = {v: 0 for v in VARIANTES}
+    filas_ok = {v: 0 for v in VARIANTES}
+    filas_extra = {v: 0 for v in VARIANTES}
+    filas_ref = 0
+
+    for ruta in rutas:
+        with pdfplumber.open(ruta) as pdf:
+            tiempos = {v: 0.0 for v in VARIANTES}
+            for page in pdf.pages:
+                tablas = {}
+                # En el flujo real el texto de la página ya se extrajo antes de las tablas
+                texto = page.extract_text() or ""
+                for variante, (extractor, recortar) in VARIANTES.items():
+                    inicio = time.perf_counter()
+                    for _ in range(repeticiones):
+                        tablas[variante] = extraer_tablas(page, extractor, texto, recortar)
+                    tiempos[variante] += (time.perf_counter() - inicio) / repeticiones
+
+                referencia = _filas_de_tarifa(tablas['pdfplumber'])
+                filas_ref += len(referencia)
+                for variante, encontradas in tablas.items():
+                    filas = _filas_de_tarifa(encontradas)
+                    tablas_total[variante] += len(encontradas)
+                    filas_ok[variante] += sum(1 for k, v in referencia.items() if filas.get(k) == v)
+                    filas_extra[variante] += len(set(filas) - set(referencia))
+
+            for variante, tiempo in tiempos.items():
+                resumen["tiempo_s"][variante] += tiempo
+            resumen["archivos"].append({
+                "archivo": ruta,
+                "paginas": len(pdf.pages),
+                "tiempo_s": {v: round(t, 4) for v, t in tiempos.items()},
+            })
+
+    total = resumen["tiempo_s"]
+    resumen["tiempo_s"] = {v: round(t, 4) for v, t in total.items()}
+    resumen["aceleracion"] = {v: round(total['pdfplumber'] / t, 2) if t else None for v, t in total.items()}
+    resumen["tablas_detectadas"] = tablas_total
+    resumen["filas_tarifa_referencia"] = filas_ref
+    resumen["filas_coincidentes"] = filas_ok
+    resumen["filas_adicionales"] = filas_extra
+    resumen["coincidencia"] = {v: round(n / filas_ref, 4) if filas_ref else None for v, n in filas_ok.items()}
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extractor rápido de tablas de tarifas")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    bench = sub.add_parser("benchmark", help="Compara velocidad y coincidencia con pdfplumber, con y sin recorte")
+    bench.add_argument("pdfs", nargs="+")
+    bench.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    print(json.dumps(benchmark(args.pdfs, args.repeticiones), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
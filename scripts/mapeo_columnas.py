@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caché de la disposición de columnas de las tablas de tarifas de los PDF.
+Los boletines de cada proveedor repiten la misma tabla mes a mes, pero
+extraer_tarifas_de_pdf() volvía a deducir en cada fila qué columna es la
+tarifa y cuál el cargo fijo (por encabezados y, si no, por rangos de
+valores como 500 < v < 10000). Un valor que se sale del rango un mes
+cambia de columna sin aviso.
+
+Cada tabla se identifica por una firma: los encabezados normalizados (sin
+tildes, sin números, que cambian con el mes) más el tamaño de la página y
+el número de columnas. Si la firma es conocida, las filas se leen directo
+por índice de columna. Si no, se usa la heurística de siempre y, al cerrar
+la tabla, se registra el mapeo solo si reproduce exactamente lo que la
+heurística extrajo en todas las filas. Si una fila mapeada no trae tarifa
+en su columna, esa fila vuelve a la heurística y el mapeo se olvida para
+aprenderlo de nuevo.
+
+Los mapeos se guardan por proveedor en datos_tarifas/mapeos_columnas.json,
+cada uno en cuanto cambia: la extracción puede correr en un proceso hijo
+(plazos_scrape.ejecutar_en_proceso) y el padre no ve lo que aprendió.
+Con --sin-cache-columnas se usa siempre la heurística.
+"""
+
+import sys
+import json
+import re
+import hashlib
+import argparse
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tarifas_comun import ruta_datos, normalizar_clave, escribir_atomico, candado_archivo
+
+
+FILAS_MINIMAS = 2  # filas que debe reproducir un mapeo para registrarlo
+
+ExtraerNumero = Callable[[str], float]
+
+
+def ruta_mapeos(directorio: Optional[str] = None) -> str:
+    return ruta_datos('mapeos_columnas.json', directorio=directorio)
+
+
+def _valor_celda(row: List[Any], indice: int, extraer_numero: ExtraerNumero) -> float:
+    if indice < 1 or indice >= len(row) or not row[indice]:
+        return 0
+    return extraer_numero(str(row[indice]))
+
+
+def firma_tabla(encabezados: List[str], ancho: float, alto: float) -> Tuple[str, str]:
+    """(firma, descripción legible) de la disposición de una tabla."""
+    normalizados = [re.sub(r'\s+', ' ', re.sub(r'\d+', '#', normalizar_clave(h))).strip() for h in encabezados]
+    descripcion = f"{round(ancho)}x{round(alto)}|{len(encabezados)}|" + '|'.join(normalizados)
+    return hashlib.sha1(descripcion.encode('utf-8')).hexdigest()[:16], descripcion
+
+
+@dataclass(slots=True)
+class MapeoColumnas:
+    consumo: int     # columna de la tarifa por unidad
+    cargo_fijo: int  # -1 si la tabla no trae cargo fijo
+
+    def valores(self, row: List[Any], extraer_numero: ExtraerNumero) -> Tuple[float, float]:
+        """(tarifa, cargo fijo) de una fila."""
+        return (_valor_celda(row, self.consumo, extraer_numero),
+                _valor_celda(row, self.cargo_fijo, extraer_numero))
+
+
+class TablaColumnas:
+    """Una tabla en proceso: aplica el mapeo conocido o aprende uno de la heurística."""
+
+    def __init__(self, cache: 'CacheColumnas', firma: Optional[str] = None,
+                 descripcion: str = '', mapeo: Optional[MapeoColumnas] = None):
+        self.cache = cache
+        self.firma = firma
+        self.descripcion = descripcion
+        self.mapeo = mapeo
+        self.fallos = 0
+        self._observadas: List[Tuple[List[Any], float, float]] = []
+        self._extraer_numero: Optional[ExtraerNumero] = None
+
+    def valores(self, row: List[Any], extraer_numero: ExtraerNumero) -> Optional[Tuple[float, float]]:
+        """(tarifa, cargo fijo) por el mapeo conocido, o None para usar la heurística."""
+        if self.mapeo is None:
+            return None
+        tarifa, cargo_fijo = self.mapeo.valores(row, extraer_numero)
+        if not tarifa:
+            self.fallos += 1
+            return None
+        return tarifa, cargo_fijo
+
+    def observar(self, row: List[Any], tarifa: float, cargo_fijo: float, extraer_numero: ExtraerNumero):
+        """Registra lo que extrajo la heurística en una fila."""
+        if self.firma is None or self.mapeo is not None:
+            return
+        self._observadas.append((row, tarifa, cargo_fijo))
+        self._extraer_numero = extraer_numero
+
+    def _deducir(self) -> Optional[MapeoColumnas]:
+        """El mapeo que reproduce todas las filas observadas, si existe."""
+        if len(self._observadas) < FILAS_MINIMAS:
+            return None
+        extraer_numero = self._extraer_numero
+        votos_consumo, votos_fijo = Counter(), Counter()
+        for row, tarifa, cargo_fijo in self._observadas:
+            numeros = [_valor_celda(row, i, extraer_numero) for i in range(len(row))]
+            votos_consumo.update(i for i, v in enumerate(numeros) if i and tarifa and v == tarifa)
+            votos_fijo.update(i for i, v in enumerate(numeros) if i and cargo_fijo and v == cargo_fijo)
+        if not votos_consumo:
+            return None
+        mapeo = MapeoColumnas(votos_consumo.most_common(1)[0][0],
+                              votos_fijo.most_common(1)[0][0] if votos_fijo else -1)
+        for row, tarifa, cargo_fijo in self._observadas:
+            if mapeo.valores(row, extraer_numero) != (tarifa, cargo_fijo):
+                return None
+        return mapeo
+
+    def cerrar(self):
+        """Registra el mapeo aprendido u olvida el que falló."""
+        if self.firma is None:
+            return
+        if self.mapeo is not None:
+            if self.fallos:
+                self.cache.olvidar(self.firma)
+            return
+        mapeo = self._deducir()
+        if mapeo is not None:
+            self.cache.registrar(self.firma, mapeo, self.descripcion)
+
+
+class CacheColumnas:
+    """
+    Mapeos de columnas de un proveedor. Sin directorio no hace nada y las
+    tablas usan siempre la heurística, así el código de extracción puede
+    llamarlo siempre.
+    """
+
+    def __init__(self, proveedor: Optional[str] = None, directorio: Optional[str] = None):
+        self.proveedor = proveedor
+        self.directorio = directorio
+        self.mapeos: Dict[str, Dict[str, Any]] = {}
+
+        if self.activo:
+            try:
+                with open(ruta_mapeos(directorio), 'r', encoding='utf-8') as f:
+                    self.mapeos = json.load(f).get(proveedor, {})
+            except (OSError, ValueError):
+                self.mapeos = {}
+
+    @property
+    def activo(self) -> bool:
+        return self.proveedor is not None and self.directorio is not None
+
+    def tabla(self, encabezados: List[str], page) -> TablaColumnas:
+        """Abre una tabla de la página con el mapeo de su firma, si se conoce."""
+        if not self.activo:
+            return TablaColumnas(self)
+        firma, descripcion = firma_tabla(encabezados, page.width, page.height)
+        guardado = self.mapeos.get(firma)
+        mapeo = None
+        if guardado:
+            mapeo = MapeoColumnas(guardado["consumo"], guardado["cargo_fijo"])
+            guardado["usos"] = guardado.get("usos", 0) + 1
+            guardado["usado"] = datetime.now().isoformat()
+            self._guardar(firma, guardado)
+            print(f"  Disposición de tabla conocida ({firma}): tarifa en columna {mapeo.consumo}, "
+                  f"cargo fijo en columna {mapeo.cargo_fijo}", file=sys.stderr)
+        return TablaColumnas(self, firma, descripcion, mapeo)
+
+    def registrar(self, firma: str, mapeo: MapeoColumnas, descripcion: str):
+        ahora = datetime.now().isoformat()
+        self.mapeos[firma] = {
+            "consumo": mapeo.consumo,
+            "cargo_fijo": mapeo.cargo_fijo,
+            "disposicion": descripcion,
+            "aprendido": ahora,
+            "usado": ahora,
+            "usos": 0,
+        }
+        self._guardar(firma, self.mapeos[firma])
+        print(f"  Disposición de tabla aprendida ({firma}): tarifa en columna {mapeo.consumo}, "
+              f"cargo fijo en columna {mapeo.cargo_fijo}", file=sys.stderr)
+
+    def olvidar(self, firma: str):
+        if self.mapeos.pop(firma, None) is not None:
+            self._guardar(firma, None)
+            print(f"  Disposición de tabla {firma} olvidada: una fila no trajo tarifa en su columna",
+                  file=sys.stderr)
+
+    def _guardar(self, firma: str, entrada: Optional[Dict[str, Any]]):
+        """
+        Escribe (o borra) una firma; las demás firmas y proveedores se conservan.
+        Los scrapers de los proveedores corren a la vez: se lee y reescribe con candado.
+        """
+        ruta = ruta_mapeos(self.directorio)
+        with candado_archivo(ruta):
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    guardado = json.load(f)
+            except (OSError, ValueError):
+                guardado = {}
+            mapeos = guardado.setdefault(self.proveedor, {})
+            if entrada is None:
+                mapeos.pop(firma, None)
+            else:
+                mapeos[firma] = entrada
+            escribir_atomico(ruta, json.dumps(guardado, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--sin-cache-columnas", action="store_true",
+                        help="No usa ni actualiza los mapeos de columnas aprendidos "
+                             "(ver mapeo_columnas.py)")
+
+
+def columnas_desde_argumentos(args: argparse.Namespace, proveedor: str) -> CacheColumnas:
+    if args.sin_cache_columnas:
+        return CacheColumnas()
+    return CacheColumnas(proveedor, ruta_datos())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modelo compartido de los registros que extraen los scrapers de tarifas.
+Las tarifas, subsidios y componentes se arman con las clases de este
+módulo en lugar de diccionarios con claves ligeramente distintas en cada
+scraper. Los nombres de los campos son las claves del JSON de siempre
+(cargoFijo, fuente_subsidio...) y los campos opcionales sin valor no se
+escriben, así la salida no cambia de forma.
+
+RegistrosPorEstrato reemplaza el patrón de lista + any(t['estrato'] == ...)
+por un diccionario por estrato en orden de inserción: agregar() conserva
+el primero (como el chequeo de duplicados de antes) y reemplazar() hace
+upsert, ambos en O(1).
+
+serializar() usa orjson si está instalado y, si no, json con el mismo
+resultado; los dos aceptan estos modelos en cualquier parte del valor.
+"""
+
+import json
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@dataclass(slots=True)
+class Tarifa:
+    estrato: str
+    tarifa: float
+    cargoFijo: float = 0
+    subsidio: Optional[float] = None
+    fuente_subsidio: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Subsidio:
+    estrato: str
+    porcentaje: float
+    fuente: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Componente:
+    nombre: str
+    valor: float
+
+
+Registro = Union[Tarifa, Subsidio, Componente]
+MODELOS = (Tarifa, Subsidio, Componente)
+
+
+def a_dict(registro: Union[Registro, Dict[str, Any]]) -> Dict[str, Any]:
+    """Diccionario con la forma JSON de siempre (omite los opcionales en None)."""
+    if isinstance(registro, dict):
+        return registro
+    resultado = {}
+    for campo in fields(registro):
+        valor = getattr(registro, campo.name)
+        if valor is not None or campo.default is not None:
+            resultado[campo.name] = valor
+    return resultado
+
+
+class RegistrosPorEstrato:
+    """Tarifas o subsidios indexados por estrato, en el orden en que se agregaron."""
+
+    __slots__ = ('_por_estrato',)
+
+    def __init__(self, registros: Optional[List[Union[Tarifa, Subsidio]]] = None):
+        self._por_estrato: Dict[str, Union[Tarifa, Subsidio]] = {}
+        for registro in registros or []:
+            self.agregar(registro)
+
+    def agregar(self, registro: Union[Tarifa, Subsidio]) -> bool:
+        """Agrega el registro si su estrato no estaba; retorna si se agregó."""
+        if registro.estrato in self._por_estrato:
+            return False
+        self._por_estrato[registro.estrato] = registro
+        return True
+
+    def reemplazar(self, registro: Union[Tarifa, Subsidio]):
+        """Agrega o reemplaza el registro de su estrato (conserva la posición original)."""
+        self._por_estrato[registro.estrato] = registro
+
+    def get(self, estrato: str) -> Optional[Union[Tarifa, Subsidio]]:
+        return self._por_estrato.get(estrato)
+
+    def __contains__(self, estrato: str) -> bool:
+        return estrato in self._por_estrato
+
+    def __len__(self) -> int:
+        return len(self._por_estrato)
+
+    def __bool__(self) -> bool:
+        return bool(self._por_estrato)
+
+    def __iter__(self) -> Iterator[Union[Tarifa, Subsidio]]:
+        return iter(self._por_estrato.values())
+
+    def ultimo(self) -> Union[Tarifa, Subsidio]:
+        return next(reversed(self._por_estrato.values()))
+
+    def a_lista(self) -> List[Dict[str, Any]]:
+        """Lista de diccionarios, la forma que guardan el resultado y el checkpoint."""
+        return [a_dict(registro) for registro in self._por_estrato.values()]
+
+
+def a_serializable(valor: Any) -> Any:
+    """Hook default= de orjson, json y msgpack para los modelos de este módulo."""
+    if isinstance(valor, MODELOS):
+        return a_dict(valor)
+    if isinstance(valor, RegistrosPorEstrato):
+        return valor.a_lista()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def serializar(valor: Any, indentar: bool = False) -> bytes:
+    """JSON UTF-8 (sin escapar tildes) del valor, con orjson si está disponible."""
+    if orjson is not None:
+        opciones = orjson.OPT_PASSTHROUGH_DATACLASS | (orjson.OPT_INDENT_2 if indentar else 0)
+        return orjson.dumps(valor, default=a_serializable, option=opciones)
+    return json.dumps(valor, default=a_serializable, ensure_ascii=False,
+                      indent=2 if indentar else None).encode('utf-8')
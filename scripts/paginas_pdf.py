@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Recorrido de PDFs página por página con memoria acotada.
+pdfplumber guarda en caché los objetos de layout (caracteres, líneas, mapa
+de texto) de cada página visitada y no los libera hasta cerrar el PDF, así
+que la memoria crece con el largo del documento: un anexo regulatorio de
+150 páginas llega a ~1 GB de RSS. Vaciando la caché de cada página
+después de extraerla (flush_cache()) el pico queda en decenas de MB.
+
+Opcionalmente se impone un techo de RSS: si se supera, se deja de leer
+páginas y la extracción continúa con lo obtenido hasta ese punto.
+"""
+
+import sys
+import argparse
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+def rss_actual_mb() -> Optional[float]:
+    """
+    RSS actual del proceso (Linux); en otros sistemas, el pico como
+    aproximación. None sin el módulo resource (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except (OSError, ValueError, IndexError):
+        return rss_pico_mb()
+
+
+def rss_pico_mb() -> Optional[float]:
+    """Pico de RSS del proceso; None sin el módulo resource (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    return pico / 2**20 if sys.platform == 'darwin' else pico / 1024
+
+
+def liberar_pagina(pagina):
+    """
+    Vacía la caché de layout de una página. flush_cache() existe desde
+    pdfplumber 0.10; Page.close() (0.11) no, y además vacía el mapa de texto.
+    """
+    pagina.flush_cache()
+    get_textmap = getattr(pagina, 'get_textmap', None)
+    if hasattr(get_textmap, 'cache_clear'):
+        get_textmap.cache_clear()
+
+
+def iterar_paginas(pdf, memoria_maxima_mb: Optional[float] = None,
+                   estadisticas: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[int, Any]]:
+    """
+    Genera (número, página) como enumerate(pdf.pages), liberando la caché de
+    cada página cuando el llamador pasa a la siguiente. Si el RSS supera
+    memoria_maxima_mb se detiene. En estadisticas quedan las páginas
+    procesadas, el pico de RSS y si se alcanzó el límite.
+    """
+    estadisticas = estadisticas if estadisticas is not None else {}
+    estadisticas.update({
+        "paginas_total": len(pdf.pages),
+        "paginas_procesadas": 0,
+        "limite_mb": memoria_maxima_mb,
+        "limite_excedido": False,
+    })
+
+    try:
+        for numero, pagina in enumerate(pdf.pages):
+            try:
+                yield numero, pagina
+            finally:
+                liberar_pagina(pagina)
+            estadisticas["paginas_procesadas"] = numero + 1
+
+            rss = rss_actual_mb() if memoria_maxima_mb else None
+            if rss is not None and rss > memoria_maxima_mb:
+                estadisticas["limite_excedido"] = True
+                print(f"  Límite de memoria alcanzado ({rss:.0f} MB > {memoria_maxima_mb:.0f} MB) "
+                      f"en la página {numero + 1} de {len(pdf.pages)}; se conserva lo extraído hasta aquí",
+                      file=sys.stderr)
+                return
+    finally:
+        pico = rss_pico_mb()
+        estadisticas["rss_pico_mb"] = None if pico is None else round(pico, 1)
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--memoria-maxima-mb", type=float, default=None, metavar="MB",
+                        help="Deja de leer páginas del PDF si el RSS del proceso supera este valor")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de peor caso de las expresiones regulares de los extractores.
+Las expresiones corren sobre el texto completo de páginas y PDF; con un
+cuantificador sin límite seguido de otro que acepta los mismos caracteres
+(r'[^0-9]*([\\d.,]+)\\s*%' ante una línea de puntos guía sin '%') el motor
+de re retrocede de forma cuadrática y un boletín raro puede detener el
+scraper.
+
+Se recogen todas las expresiones de los extractores: los Patron de cada
+Escaner (medidos a través del escáner, como corren en la extracción) y las
+re.Pattern de nivel de módulo. Cada una se mide sobre textos adversarios
+generados (anclas repetidas, puntos guía, corridas de dígitos y
+separadores, espacios largos...) de tamaño creciente, y el exponente de
+crecimiento del tiempo (1 = lineal, 2 = cuadrático) marca las que se
+disparan. Termina con código 1 si alguna es superlineal.
+
+Uso:
+    python scripts/peor_caso_regex.py
+    python scripts/peor_caso_regex.py --tamano-maximo 64000
+"""
+
+import sys
+import json
+import math
+import random
+import re
+import time
+import argparse
+import importlib
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from escaneo_texto import Escaner
+
+
+MODULOS = ('scrape_afinia', 'scrape_veolia', 'scrape_surtigas', 'extraccion_tablas')
+
+TAMANO_INICIAL = 4000
+TAMANO_MAXIMO = 32000
+TIEMPO_MAXIMO = 1.0       # segundos: no se agranda más el texto de una medición que ya tarda esto
+EXPONENTE_SUPERLINEAL = 1.5
+TIEMPO_MINIMO_MS = 2.0    # por debajo de esto el exponente es ruido
+
+# Palabras de los patrones sin anclas declaradas (las re.Pattern de módulo)
+ANCLAS_GENERICAS = ('estrato', '1 =', '$/kwh', 'cargo fijo', 'nivel de tensión')
+
+
+def _repetir(unidad: str, n: int) -> str:
+    return (unidad * (n // max(len(unidad), 1) + 1))[:n]
+
+
+def _aleatorio(ancla: str, n: int) -> str:
+    azar = random.Random(n)
+    fichas = [ancla, ' ', '1', '23', '.', ',', '%', '$', ':', '=', '\n', 'de', 'x']
+    return ''.join(azar.choice(fichas) for _ in range(n // 2))[:n]
+
+
+# nombre -> generador(ancla, n): texto de unos n caracteres
+GENERADORES: Dict[str, Callable[[str, int], str]] = {
+    'anclas_repetidas': lambda a, n: _repetir(a + ' ', n),
+    'anclas_con_digito': lambda a, n: _repetir(a + ' 1 ', n),
+    'puntos_guia': lambda a, n: a + ' 1 ' + '.' * n,
+    'separadores': lambda a, n: a + ' 1 ' + _repetir('1.,', n),
+    'digitos': lambda a, n: a + ' 1 ' + _repetir('1234567890', n),
+    'espacios': lambda a, n: a + ' 1' + ' ' * n + 'x',
+    'lineas_con_puntos': lambda a, n: _repetir(a + ' 1 ' + '.' * 60 + '\n', n),
+    'palabras_y_puntos': lambda a, n: a + ' 1 ' + _repetir(' subsidio estrato pesos ' + '.' * 30, n),
+    'digitos_y_espacios': lambda a, n: _repetir('1' * 12 + ' ' * 12 + a, n),
+    'aleatorio': _aleatorio,
+}
+
+
+def expresiones() -> Iterator[Tuple[str, Callable[[str], Any], Tuple[str, ...]]]:
+    """(origen, función que aplica la expresión a un texto, anclas) de cada expresión."""
+    for nombre_modulo in MODULOS:
+        modulo = importlib.import_module(nombre_modulo)
+        for atributo, valor in sorted(vars(modulo).items()):
+            if isinstance(valor, Escaner):
+                for patron in valor.patrones:
+                    escaner = Escaner([patron])
+                    yield f"{nombre_modulo}.{atributo}:{patron.nombre}", escaner.buscar, patron.anclas
+            elif isinstance(valor, re.Pattern):
+                yield f"{nombre_modulo}.{atributo}", valor.findall, ANCLAS_GENERICAS
+
+
+def _medir(funcion: Callable[[str], Any], texto: str) -> float:
+    mejor = None
+    for _ in range(3):
+        inicio = time.perf_counter()
+        funcion(texto)
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+        if transcurrido > TIEMPO_MAXIMO:
+            break
+    return mejor
+
+
+def medir_crecimiento(funcion: Callable[[str], Any], generador: Callable[[str, int], str], ancla: str,
+                      tamano_maximo: int = TAMANO_MAXIMO) -> Dict[str, Any]:
+    """Tiempos con textos de tamaño creciente y el exponente de crecimiento."""
+    tiempos: Dict[int, float] = {}
+    n = TAMANO_INICIAL
+    while n <= tamano_maximo:
+        tiempos[n] = _medir(funcion, generador(ancla, n))
+        if tiempos[n] > TIEMPO_MAXIMO:
+            break
+        n *= 2
+    tamanos = sorted(tiempos)
+    exponente = None
+    if len(tamanos) >= 2 and tiempos[tamanos[0]] > 0:
+        exponente = math.log(tiempos[tamanos[-1]] / tiempos[tamanos[0]]) / math.log(tamanos[-1] / tamanos[0])
+    return {
+        "tiempos_ms": {t: round(tiempos[t] * 1000, 3) for t in tamanos},
+        "exponente": None if exponente is None else round(exponente, 2),
+    }
+
+
+def benchmark(tamano_maximo: int = TAMANO_MAXIMO) -> Dict[str, Any]:
+    """Peor generador de cada expresión y la lista de las superlineales."""
+    resultados: List[Dict[str, Any]] = []
+    for origen, funcion, anclas in expresiones():
+        peor = None
+        for nombre, generador in GENERADORES.items():
+            for ancla in anclas:
+                medicion = medir_crecimiento(funcion, generador, ancla, tamano_maximo)
+                ultimo = medicion["tiempos_ms"][max(medicion["tiempos_ms"])]
+                if peor is None or ultimo > peor["peor_ms"]:
+                    peor = {"generador": nombre, "ancla": ancla, "peor_ms": ultimo, **medicion}
+        superlineal = (peor["exponente"] or 0) > EXPONENTE_SUPERLINEAL and peor["peor_ms"] > TIEMPO_MINIMO_MS
+        resultados.append({"expresion": origen, "superlineal": superlineal, **peor})
+        print(f"  {origen}: {peor['peor_ms']} ms ({peor['generador']}, exponente {peor['exponente']})",
+              file=sys.stderr)
+
+    return {
+        "tamano_maximo": tamano_maximo,
+        "expresiones": resultados,
+        "superlineales": [r["expresion"] for r in resultados if r["superlineal"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de peor caso de las expresiones de los extractores")
+    parser.add_argument("--tamano-maximo", type=int, default=TAMANO_MAXIMO,
+                        help=f"Caracteres del texto adversario más grande (por defecto {TAMANO_MAXIMO})")
+    args = parser.parse_args()
+
+    resultado = benchmark(args.tamano_maximo)
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    sys.exit(1 if resultado["superlineales"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perfilado por paso de los scrapers de tarifas (--profile).
+Cada "Paso" del scraper se ejecuta bajo cProfile y tracemalloc, y un hilo
+muestrea la pila del hilo principal para construir un perfil de tiempo real
+(incluye esperas de red y del navegador). Solo usa la biblioteca estándar,
+así se puede perfilar en el servidor de producción sin instalar nada.
+Con --profile la extracción del PDF corre en el proceso del scraper y sin
+plazo (ver plazos_scrape.py), para que quede en el perfil de su paso.
+
+Archivos generados en el directorio del perfil:
+    <NN>_<paso>.pstats  estadísticas de cProfile de cada paso, numeradas en
+                        orden para que un paso repetido no pise al anterior
+                        (python -m pstats)
+    pilas.folded        pilas colapsadas para flamegraph.pl / speedscope
+    memoria.tsv         tiempo, CPU y pico de memoria de cada paso
+"""
+
+import sys
+import os
+import re
+import cProfile
+import threading
+import time
+import tracemalloc
+import argparse
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from tarifas_comun import ruta_datos
+
+
+INTERVALO_MUESTREO = 0.005  # segundos entre muestras de pila (el GIL cede cada ~5 ms)
+PROFUNDIDAD_MAXIMA = 128    # marcos por pila muestreada
+
+
+def _nombre_marco(marco) -> str:
+    codigo = marco.f_code
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})".replace(';', ',')
+
+
+class MuestreadorPilas(threading.Thread):
+    """Hilo que toma la pila del hilo indicado a intervalos fijos y cuenta pilas colapsadas."""
+
+    def __init__(self, id_hilo: int, intervalo: float = INTERVALO_MUESTREO):
+        super().__init__(name="muestreador-pilas", daemon=True)
+        self.id_hilo = id_hilo
+        self.intervalo = intervalo
+        self.raiz = ''
+        self.pilas: Counter = Counter()
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            marco = sys._current_frames().get(self.id_hilo)
+            marcos: List[str] = []
+            while marco is not None and len(marcos) < PROFUNDIDAD_MAXIMA:
+                marcos.append(_nombre_marco(marco))
+                marco = marco.f_back
+            if marcos and self.raiz:
+                self.pilas[';'.join([self.raiz] + marcos[::-1])] += 1
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+
+class PerfilScrape:
+    """
+    Perfil de una ejecución dividida en pasos. Sin directorio no mide nada,
+    así los scrapers pueden marcar pasos sin comprobar si el perfil está activo.
+    """
+
+    def __init__(self, directorio: Optional[str] = None):
+        self.directorio = directorio
+        self.pasos: List[Dict[str, Any]] = []
+        self._actual: Optional[Dict[str, Any]] = None
+        self._perfilador: Optional[cProfile.Profile] = None
+        self._muestreador: Optional[MuestreadorPilas] = None
+        self._tracemalloc_propio = False
+
+    @property
+    def activo(self) -> bool:
+        return self.directorio is not None
+
+    def paso(self, nombre: str):
+        """Cierra el paso en curso (si hay) y empieza a medir el siguiente."""
+        if not self.activo:
+            return
+        self._cerrar_paso()
+
+        if self._muestreador is None:
+            os.makedirs(self.directorio, exist_ok=True)
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracemalloc_propio = True
+            self._muestreador = MuestreadorPilas(threading.get_ident())
+            self._muestreador.start()
+
+        etiqueta = re.sub(r'\W+', '_', nombre.strip().lower()).strip('_')
+        self._muestreador.raiz = etiqueta
+        tracemalloc.reset_peak()
+        memoria_inicial, _ = tracemalloc.get_traced_memory()
+        self._actual = {
+            "paso": etiqueta,
+            "inicio": time.perf_counter(),
+            "cpu_inicio": time.process_time(),
+            "memoria_inicial": memoria_inicial,
+        }
+        self._perfilador = cProfile.Profile()
+        self._perfilador.enable()
+
+    def _cerrar_paso(self):
+        if self._actual is None:
+            return
+        self._perfilador.disable()
+        # Escribir el pstats no debe contarse como parte del paso
+        self._muestreador.raiz = ''
+        memoria_final, pico = tracemalloc.get_traced_memory()
+        actual = self._actual
+        archivo = f"{len(self.pasos) + 1:02d}_{actual['paso']}.pstats"
+        self._perfilador.dump_stats(os.path.join(self.directorio, archivo))
+
+        self.pasos.append({
+            "paso": actual["paso"],
+            "tiempo_s": round(time.perf_counter() - actual["inicio"], 4),
+            "cpu_s": round(time.process_time() - actual["cpu_inicio"], 4),
+            "pico_memoria_kb": round((pico - actual["memoria_inicial"]) / 1024, 1),
+            "memoria_neta_kb": round((memoria_final - actual["memoria_inicial"]) / 1024, 1),
+            "pstats": archivo,
+        })
+        self._actual = None
+        self._perfilador = None
+
+    def finalizar(self):
+        """Cierra el último paso y escribe las pilas colapsadas y la tabla de memoria."""
+        if not self.activo or self._muestreador is None:
+            return
+        self._cerrar_paso()
+        self._muestreador.detener()
+        if self._tracemalloc_propio:
+            tracemalloc.stop()
+
+        with open(os.path.join(self.directorio, 'pilas.folded'), 'w', encoding='utf-8') as f:
+            for pila, cuenta in sorted(self._muestreador.pilas.items()):
+                f.write(f"{pila} {cuenta}\n")
+
+        columnas = ["paso", "tiempo_s", "cpu_s", "pico_memoria_kb", "memoria_neta_kb", "pstats"]
+        with open(os.path.join(self.directorio, 'memoria.tsv'), 'w', encoding='utf-8') as f:
+            f.write('\t'.join(columnas) + '\n')
+            for paso in self.pasos:
+                f.write('\t'.join(str(paso[c]) for c in columnas) + '\n')
+
+        print(f"\nPerfil guardado en {self.directorio}", file=sys.stderr)
+        print(f"  {'paso':<28}{'tiempo_s':>10}{'cpu_s':>10}{'pico_kb':>12}", file=sys.stderr)
+        for paso in self.pasos:
+            print(f"  {paso['paso']:<28}{paso['tiempo_s']:>10}{paso['cpu_s']:>10}{paso['pico_memoria_kb']:>12}",
+                  file=sys.stderr)
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--profile", nargs="?", const="", metavar="DIR",
+                        help="Perfila cada paso (cProfile, tracemalloc, pilas colapsadas); "
+                             "por defecto escribe en la ejecución del checkpoint")
+
+
+def perfil_desde_argumentos(args: argparse.Namespace, proveedor: str, checkpoint=None) -> PerfilScrape:
+    """El perfil va junto al resultado: en la ejecución del checkpoint o en datos_tarifas/perfiles/."""
+    if args.profile is None:
+        return PerfilScrape()
+    if args.profile:
+        return PerfilScrape(args.profile)
+    if checkpoint is not None and checkpoint.activo:
+        return PerfilScrape(os.path.join(checkpoint.directorio, 'perfil'))
+    nombre = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    return PerfilScrape(ruta_datos('perfiles', proveedor.lower(), nombre))
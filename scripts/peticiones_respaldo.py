@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Peticiones de respaldo (hedging) para los hosts lentos de los proveedores.
+Los sitios de los proveedores (afinia.com.co sobre todo) tienen colas de
+latencia largas: una conexión TCP lenta puede consumir casi todo el
+timeout de 30/60 s aunque una segunda conexión respondería enseguida.
+
+Con --peticiones-respaldo, si la primera petición no recibió los
+encabezados después del p90 observado para ese host (como mucho 4 veces
+la mediana), se lanza una segunda igual y se usa la que responda primero;
+la otra se cierra al terminar.
+Así se recorta la cola sin subir los timeouts, a costa de ~10% de
+peticiones extra.
+
+La latencia hasta los encabezados de cada petición alimenta un histograma
+por host (intervalos geométricos) que se guarda entre ejecuciones en
+datos_tarifas/latencias_hosts.json. Al cargarlo, los conteos anteriores se
+atenúan para que el p90 siga los cambios del sitio.
+"""
+
+import sys
+import json
+import math
+import threading
+import time
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from tarifas_comun import ruta_datos, escribir_atomico, candado_archivo
+
+
+LATENCIA_MINIMA = 0.05      # segundos: límite superior del primer intervalo
+FACTOR_INTERVALO = 1.2      # cada intervalo es 20% más ancho que el anterior
+NUM_INTERVALOS = 45         # hasta ~180 s
+PERCENTIL_RESPALDO = 0.9
+MUESTRAS_MINIMAS = 10       # con menos, se usa RETRASO_SIN_DATOS
+RETRASO_SIN_DATOS = 2.0
+RETRASO_MINIMO = 0.2
+FACTOR_MEDIANA = 4          # el retraso no pasa de 4 veces el p50
+ATENUACION_POR_EJECUCION = 0.9
+
+
+def ruta_latencias(directorio: Optional[str] = None) -> str:
+    return ruta_datos('latencias_hosts.json', directorio=directorio)
+
+
+class HistogramaLatencias:
+    """Conteos de latencias en intervalos geométricos; el último acumula todo lo mayor."""
+
+    __slots__ = ('conteos',)
+
+    def __init__(self, conteos: Optional[List[float]] = None):
+        self.conteos = list(conteos) if conteos and len(conteos) == NUM_INTERVALOS else [0.0] * NUM_INTERVALOS
+
+    @staticmethod
+    def limite(indice: int) -> float:
+        return LATENCIA_MINIMA * FACTOR_INTERVALO ** indice
+
+    def agregar(self, segundos: float):
+        if segundos <= LATENCIA_MINIMA:
+            indice = 0
+        else:
+            indice = min(math.ceil(math.log(segundos / LATENCIA_MINIMA, FACTOR_INTERVALO)), NUM_INTERVALOS - 1)
+        self.conteos[indice] += 1
+
+    @property
+    def total(self) -> float:
+        return sum(self.conteos)
+
+    def percentil(self, q: float) -> Optional[float]:
+        """Límite superior del intervalo que contiene el percentil q (None sin datos)."""
+        total = self.total
+        if not total:
+            return None
+        acumulado = 0.0
+        for indice, conteo in enumerate(self.conteos):
+            acumulado += conteo
+            if acumulado >= q * total:
+                return self.limite(indice)
+        return self.limite(NUM_INTERVALOS - 1)
+
+    def atenuar(self, factor: float):
+        self.conteos = [c * factor for c in self.conteos]
+
+
+class PeticionesRespaldo:
+    """
+    Sustituto de requests.get(..., stream=True) con petición de respaldo.
+    Sin directorio no persiste los histogramas (solo los de esta ejecución).
+    """
+
+    def __init__(self, directorio: Optional[str] = None):
+        self.directorio = directorio
+        self.histogramas: Dict[str, HistogramaLatencias] = {}
+        self.estadisticas = {"peticiones": 0, "respaldos": 0, "ganados_por_respaldo": 0}
+        self._candado = threading.Lock()
+
+        if directorio:
+            try:
+                with open(ruta_latencias(directorio), 'r', encoding='utf-8') as f:
+                    guardado = json.load(f)
+            except (OSError, ValueError):
+                guardado = {}
+            for host, datos in guardado.get("hosts", {}).items():
+                histograma = HistogramaLatencias(datos.get("conteos"))
+                histograma.atenuar(ATENUACION_POR_EJECUCION)
+                self.histogramas[host] = histograma
+
+    def _histograma(self, host: str) -> HistogramaLatencias:
+        if host not in self.histogramas:
+            self.histogramas[host] = HistogramaLatencias()
+        return self.histogramas[host]
+
+    def retraso(self, host: str) -> float:
+        """
+        Espera antes de lanzar el respaldo: el p90 observado del host. Si más
+        del 10% de las peticiones se quedan colgadas, el p90 cae dentro de la
+        cola y ya no recortaría nada; por eso se limita a FACTOR_MEDIANA * p50.
+        """
+        with self._candado:
+            histograma = self._histograma(host)
+            if histograma.total < MUESTRAS_MINIMAS:
+                return RETRASO_SIN_DATOS
+            retraso = min(histograma.percentil(PERCENTIL_RESPALDO),
+                          FACTOR_MEDIANA * histograma.percentil(0.5))
+            return max(retraso, RETRASO_MINIMO)
+
+    def _registrar(self, host: str, segundos: float):
+        with self._candado:
+            self._histograma(host).agregar(segundos)
+
+    def _peticion(self, host: str, url: str, kwargs: Dict[str, Any]) -> requests.Response:
+        inicio = time.monotonic()
+        response = requests.get(url, **kwargs)
+        # Con stream=True, get() retorna al recibir los encabezados
+        self._registrar(host, time.monotonic() - inicio)
+        return response
+
+    def _lanzar(self, host: str, url: str, kwargs: Dict[str, Any]) -> Future:
+        """
+        Petición en un hilo daemon: la que pierde puede seguir esperando hasta
+        su timeout y no debe retrasar el fin del proceso (un ThreadPoolExecutor
+        espera a sus hilos al salir).
+        """
+        futuro = Future()
+
+        def ejecutar():
+            futuro.set_running_or_notify_cancel()
+            try:
+                futuro.set_result(self._peticion(host, url, kwargs))
+            except BaseException as e:
+                futuro.set_exception(e)
+
+        threading.Thread(target=ejecutar, name=f"peticion-{host}", daemon=True).start()
+        return futuro
+
+    @staticmethod
+    def _cerrar_al_terminar(futuro):
+        def cerrar(f):
+            if not f.cancelled() and f.exception() is None:
+                f.result().close()
+        futuro.add_done_callback(cerrar)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        host = urlsplit(url).hostname or ''
+        kwargs.setdefault('stream', True)
+        retraso = self.retraso(host)
+        with self._candado:
+            self.estadisticas["peticiones"] += 1
+
+        primera = self._lanzar(host, url, kwargs)
+        if wait([primera], timeout=retraso).done:
+            return primera.result()
+
+        print(f"  Sin respuesta de {host} en {retraso:.2f} s; se lanza una petición de respaldo", file=sys.stderr)
+        respaldo = self._lanzar(host, url, kwargs)
+        with self._candado:
+            self.estadisticas["respaldos"] += 1
+
+        pendientes = {primera, respaldo}
+        error = None
+        while pendientes:
+            listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                if futuro.exception() is not None:
+                    error = futuro.exception()
+                    continue
+                # La otra petición se cierra cuando termine, para liberar la conexión
+                for otro in pendientes:
+                    self._cerrar_al_terminar(otro)
+                for otro in listos - {futuro}:
+                    self._cerrar_al_terminar(otro)
+                if futuro is respaldo:
+                    with self._candado:
+                        self.estadisticas["ganados_por_respaldo"] += 1
+                return futuro.result()
+        raise error
+
+    def finalizar(self):
+        """
+        Guarda los histogramas; los hosts de otras ejecuciones en curso se
+        conservan (el archivo se lee y reescribe con candado).
+        """
+        if not self.directorio:
+            return
+        ruta = ruta_latencias(self.directorio)
+        with candado_archivo(ruta):
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    guardado = json.load(f)
+            except (OSError, ValueError):
+                guardado = {}
+
+            hosts = guardado.get("hosts", {})
+            with self._candado:
+                for host, histograma in self.histogramas.items():
+                    if not histograma.total:
+                        continue
+                    hosts[host] = {
+                        "conteos": [round(c, 4) for c in histograma.conteos],
+                        "p50": histograma.percentil(0.5),
+                        "p90": histograma.percentil(0.9),
+                        "actualizado": datetime.now().isoformat(),
+                    }
+            escribir_atomico(ruta, json.dumps({
+                "limites": [round(HistogramaLatencias.limite(i), 4) for i in range(NUM_INTERVALOS)],
+                "hosts": hosts,
+            }, ensure_ascii=False, indent=2).encode('utf-8'))
+
+        if self.estadisticas["peticiones"]:
+            print(f"Peticiones de respaldo: {self.estadisticas['respaldos']} de "
+                  f"{self.estadisticas['peticiones']} ({self.estadisticas['ganados_por_respaldo']} respondieron primero)",
+                  file=sys.stderr)
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--peticiones-respaldo", action="store_true",
+                        help="Lanza una segunda petición si el host no responde dentro de su p90 "
+                             "de latencia (ver peticiones_respaldo.py)")
+
+
+def respaldo_desde_argumentos(args: argparse.Namespace) -> Optional[PeticionesRespaldo]:
+    if args.peticiones_respaldo:
+        return PeticionesRespaldo(ruta_datos())
+    return None
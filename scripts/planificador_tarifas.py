@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planificador adaptativo de actualización de tarifas - OptiFactura Montería
+Este planificador:
+1. Registra cuándo cambia realmente el boletín de cada proveedor
+   (PDF más reciente de Afinia/Veolia vía --sondeo, tabla de Surtigas por hash)
+2. Aprende la ventana de publicación de cada proveedor (días del mes)
+3. Sondea con frecuencia dentro de la ventana y de forma espaciada fuera de ella,
+   con jitter y backoff exponencial después de fallos
+4. Ejecuta el scrape completo solo cuando hay cambio y guarda el resultado en
+   datos_tarifas/<proveedor>_tarifas_actual.json
+
+Uso:
+    python scripts/planificador_tarifas.py             # ciclo continuo
+    python scripts/planificador_tarifas.py --una-vez   # ejecuta lo pendiente y termina (cron)
+"""
+
+import sys
+import json
+import hashlib
+import math
+import os
+import random
+import subprocess
+import time
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from tarifas_comun import PROVEEDORES, ruta_datos, ruta_resultado, escribir_atomico
+from sondeo_tarifas import CODIGO_SIN_CAMBIOS, CODIGO_CAMBIO
+
+
+DIR_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+
+# Proveedores con modo --sondeo; el resto se compara por hash del resultado completo
+PROVEEDORES_CON_SONDEO = ('afinia', 'veolia')
+# Los scrapes programados se pueden reanudar y quedan archivados para reprocesarlos
+ARGUMENTOS_SCRAPE = ['--checkpoint', '--archivar']
+
+INTERVALO_DENSO = timedelta(hours=1)       # dentro de la ventana de publicación
+INTERVALO_BASE = timedelta(hours=6)        # mientras no hay ventana aprendida
+INTERVALO_DISPERSO = timedelta(hours=24)   # fuera de la ventana
+INTERVALO_REINTENTO = timedelta(minutes=15)  # primer reintento después de un fallo
+JITTER = 0.15                              # ±15% sobre cada intervalo
+ESPERA_MAXIMA = 300                        # segundos máximos de espera entre revisiones
+
+CAMBIOS_MINIMOS = 2       # cambios necesarios para aprender una ventana
+CAMBIOS_A_CONSERVAR = 12  # historial usado para la ventana (aprox. un año)
+MARGEN_MINIMO_DIAS = 2
+MARGEN_MAXIMO_DIAS = 7
+DIAS_CICLO = 31
+
+TIMEOUT_SONDEO = 60
+TIMEOUT_SCRAPE = 900
+
+
+def ruta_estado() -> str:
+    return ruta_datos('planificador_estado.json')
+
+
+def cargar_estado() -> Dict[str, Any]:
+    try:
+        with open(ruta_estado(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_estado(estado: Dict[str, Any]):
+    escribir_atomico(ruta_estado(), json.dumps(estado, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def estado_proveedor(estado: Dict[str, Any], proveedor: str) -> Dict[str, Any]:
+    return estado.setdefault(proveedor, {
+        "cambios": [],
+        "fallos_consecutivos": 0,
+        "ultima_ejecucion": None,
+        "proxima_ejecucion": None,
+        "huella_tarifas": None,
+    })
+
+
+def _distancia_dias(a: float, b: float) -> float:
+    """Distancia circular entre dos días del mes (el 30 y el 2 están cerca)."""
+    d = abs(a - b) % DIAS_CICLO
+    return min(d, DIAS_CICLO - d)
+
+
+def aprender_ventana(cambios: List[str]) -> Optional[Tuple[float, float]]:
+    """
+    Estima la ventana de publicación como (día central, margen en días)
+    usando media y dispersión circulares sobre los días del mes de los cambios.
+    """
+    dias = [datetime.fromisoformat(c).day for c in cambios[-CAMBIOS_A_CONSERVAR:]]
+    if len(dias) < CAMBIOS_MINIMOS:
+        return None
+
+    angulos = [2 * math.pi * (d - 1) / DIAS_CICLO for d in dias]
+    seno = sum(math.sin(a) for a in angulos) / len(angulos)
+    coseno = sum(math.cos(a) for a in angulos) / len(angulos)
+    centro = (math.atan2(seno, coseno) % (2 * math.pi)) * DIAS_CICLO / (2 * math.pi) + 1
+
+    # Desviación estándar circular convertida a días
+    r = min(max(math.hypot(seno, coseno), 1e-9), 1.0)
+    desviacion = math.sqrt(-2 * math.log(r)) * DIAS_CICLO / (2 * math.pi)
+    margen = min(max(2 * desviacion, MARGEN_MINIMO_DIAS), MARGEN_MAXIMO_DIAS)
+    return centro, margen
+
+
+def en_ventana(momento: datetime, ventana: Tuple[float, float]) -> bool:
+    centro, margen = ventana
+    return _distancia_dias(momento.day, centro) <= margen
+
+
+def calcular_intervalo(datos: Dict[str, Any], ahora: datetime) -> timedelta:
+    """Intervalo hasta la próxima ejecución según ventana, cambios recientes y fallos."""
+    fallos = datos.get("fallos_consecutivos", 0)
+    if fallos:
+        return min(INTERVALO_REINTENTO * (2 ** (fallos - 1)), INTERVALO_DISPERSO)
+
+    ventana = aprender_ventana(datos.get("cambios", []))
+    if ventana is None:
+        return INTERVALO_BASE
+
+    if en_ventana(ahora, ventana):
+        # Si ya se detectó el boletín de esta ventana no hace falta seguir sondeando
+        ultimo = datos["cambios"][-1] if datos["cambios"] else None
+        if ultimo and ahora - datetime.fromisoformat(ultimo) < timedelta(days=2 * ventana[1] + 1):
+            return INTERVALO_DISPERSO
+        return INTERVALO_DENSO
+
+    # Fuera de la ventana: no dormir más allá de su inicio
+    siguiente = ahora + INTERVALO_DISPERSO
+    paso = ahora
+    while paso < siguiente:
+        paso += INTERVALO_DENSO
+        if en_ventana(paso, ventana):
+            return max(paso - ahora, INTERVALO_DENSO)
+    return INTERVALO_DISPERSO
+
+
+def con_jitter(intervalo: timedelta) -> timedelta:
+    return intervalo * (1 + random.uniform(-JITTER, JITTER))
+
+
+def _ejecutar_script(proveedor: str, argumentos: List[str], timeout: int) -> subprocess.CompletedProcess:
+    comando = [sys.executable, os.path.join(DIR_SCRIPTS, f"scrape_{proveedor}.py"), *argumentos]
+    return subprocess.run(comando, capture_output=True, text=True, timeout=timeout)
+
+
+def _huella_tarifas(resultado: Dict[str, Any]) -> str:
+    contenido = {k: resultado.get(k) for k in ("tarifas", "subsidios", "componentes")}
+    canonico = json.dumps(contenido, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+
+def scrape_completo(proveedor: str) -> Dict[str, Any]:
+    """Ejecuta el scraper completo y publica su resultado si fue exitoso."""
+    proceso = _ejecutar_script(proveedor, ARGUMENTOS_SCRAPE, TIMEOUT_SCRAPE)
+    if proceso.returncode != 0:
+        raise RuntimeError(f"scrape_{proveedor}.py terminó con código {proceso.returncode}")
+
+    resultado = json.loads(proceso.stdout)
+    if resultado.get("error"):
+        raise RuntimeError(resultado["error"])
+    if resultado.get("plazos_excedidos"):
+        raise RuntimeError(f"Resultado parcial: plazos excedidos en {', '.join(resultado['plazos_excedidos'])}")
+
+    escribir_atomico(ruta_resultado(proveedor),
+                     json.dumps(resultado, ensure_ascii=False, indent=2).encode('utf-8'))
+    return resultado
+
+
+def revisar_proveedor(proveedor: str, datos: Dict[str, Any], ahora: datetime) -> str:
+    """
+    Sondea (o scrapea) un proveedor y registra el cambio si lo hubo.
+    Retorna "cambio", "sin_cambios" o "actualizado" (primera referencia).
+    """
+    if proveedor in PROVEEDORES_CON_SONDEO:
+        sondeo = _ejecutar_script(proveedor, ["--sondeo"], TIMEOUT_SONDEO)
+        if sondeo.returncode == CODIGO_SIN_CAMBIOS:
+            return "sin_cambios"
+        if sondeo.returncode != CODIGO_CAMBIO:
+            raise RuntimeError(f"Sondeo de {proveedor} falló (código {sondeo.returncode})")
+
+        estado_sondeo = json.loads(sondeo.stdout).get("estado")
+        scrape_completo(proveedor)
+        if estado_sondeo == "cambio":
+            datos["cambios"].append(ahora.isoformat())
+            return "cambio"
+        return "actualizado"
+
+    resultado = scrape_completo(proveedor)
+    huella = _huella_tarifas(resultado)
+    anterior = datos.get("huella_tarifas")
+    datos["huella_tarifas"] = huella
+    if anterior is None:
+        return "actualizado"
+    if anterior != huella:
+        datos["cambios"].append(ahora.isoformat())
+        return "cambio"
+    return "sin_cambios"
+
+
+def ejecutar_pendientes(estado: Dict[str, Any], proveedores: List[str], forzar: bool = False) -> datetime:
+    """Ejecuta los proveedores vencidos y retorna el momento de la próxima ejecución."""
+    for proveedor in proveedores:
+        datos = estado_proveedor(estado, proveedor)
+        ahora = datetime.now()
+        proxima = datos.get("proxima_ejecucion")
+
+        if forzar or not proxima or datetime.fromisoformat(proxima) <= ahora:
+            try:
+                resultado = revisar_proveedor(proveedor, datos, ahora)
+                datos["fallos_consecutivos"] = 0
+                print(f"[{ahora.isoformat(timespec='seconds')}] {proveedor}: {resultado}", file=sys.stderr)
+            except Exception as e:
+                datos["fallos_consecutivos"] = datos.get("fallos_consecutivos", 0) + 1
+                print(f"[{ahora.isoformat(timespec='seconds')}] {proveedor}: error ({str(e)}), "
+                      f"fallos consecutivos: {datos['fallos_consecutivos']}", file=sys.stderr)
+
+            datos["cambios"] = datos["cambios"][-CAMBIOS_A_CONSERVAR:]
+            datos["ultima_ejecucion"] = ahora.isoformat()
+            datos["proxima_ejecucion"] = (ahora + con_jitter(calcular_intervalo(datos, ahora))).isoformat()
+            ventana = aprender_ventana(datos["cambios"])
+            datos["ventana"] = {"dia_central": round(ventana[0], 1), "margen_dias": round(ventana[1], 1)} if ventana else None
+            guardar_estado(estado)
+
+    return min(datetime.fromisoformat(estado[p]["proxima_ejecucion"]) for p in proveedores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planificador adaptativo de scrapes de tarifas")
+    parser.add_argument("--una-vez", action="store_true", help="Ejecuta lo pendiente y termina")
+    parser.add_argument("--forzar", action="store_true", help="Ignora la próxima ejecución programada")
+    parser.add_argument("--proveedores", default=",".join(PROVEEDORES),
+                        help="Lista separada por comas (por defecto todos)")
+    args = parser.parse_args()
+
+    proveedores = [p.strip().lower() for p in args.proveedores.split(",") if p.strip()]
+    desconocidos = [p for p in proveedores if p not in PROVEEDORES]
+    if desconocidos:
+        parser.error(f"Proveedores desconocidos: {', '.join(desconocidos)}")
+
+    estado = cargar_estado()
+    proxima = ejecutar_pendientes(estado, proveedores, args.forzar)
+    if args.una_vez:
+        print(json.dumps({p: estado[p] for p in proveedores}, ensure_ascii=False, indent=2))
+        return
+
+    try:
+        while True:
+            espera = (proxima - datetime.now()).total_seconds()
+            time.sleep(min(max(espera, 1), ESPERA_MAXIMA))
+            estado = cargar_estado()
+            proxima = ejecutar_pendientes(estado, proveedores)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plazos de tiempo real por etapa para los scrapers de tarifas.
+El timeout= de requests solo limita cada lectura del socket (una descarga
+que gotea datos puede durar indefinidamente) y pdfplumber puede quedarse
+minutos en un PDF patológico. Aquí cada etapa tiene un plazo de pared,
+recortado por lo que quede de un presupuesto total de la ejecución:
+
+- Descargas: se leen por bloques y se abortan al vencer el plazo.
+- Extracción del PDF: corre en un proceso hijo que se mata al vencer el
+  plazo; los registros que el hijo ya emitió (tarifas, subsidios,
+  componentes) forman un resultado parcial marcado con "parcial": True.
+  Si el scraper muere, el hijo termina también (no queda huérfano sin
+  plazo ni con el candado de ejecucion_compartida.py).
+- Navegador: un vigilante cierra el driver al vencer el plazo y el
+  scraper sigue con lo que ya había extraído.
+
+Las etapas vencidas quedan en resultado["plazos_excedidos"].
+"""
+
+import os
+import sys
+import time
+import queue
+import threading
+import multiprocessing
+import argparse
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from salida_tarifas import EmisorRegistros
+
+
+# Segundos por etapa; "total" acota toda la ejecución
+PLAZOS_POR_DEFECTO = {
+    "total": 600,
+    "pagina": 45,
+    "pdf": 90,
+    "extraccion_pdf": 240,
+    "navegador": 240,
+}
+CONEXION_MAXIMA = 10          # segundos para establecer la conexión
+BLOQUE_DESCARGA = 64 * 1024
+BLOQUE_SIN_READ1 = 4 * 1024   # urllib3 1.x: read(n) espera n bytes, bloques chicos acotan la espera
+ESPERA_CIERRE_HIJO = 2        # segundos entre terminate() y kill()
+VIGILANCIA_PADRE = 1          # segundos entre comprobaciones de que el padre sigue vivo
+
+
+class PlazoExcedido(TimeoutError):
+    pass
+
+
+class Descargas:
+    """
+    Colaboradores de las descargas de una ejecución; cada uno es opcional:
+    - archivo: guarda cada descarga o, al reprocesar, la sirve desde lo
+      archivado (ver archivo_artefactos.py)
+    - respaldo: peticiones de respaldo para hosts lentos (ver
+      peticiones_respaldo.py); sin él, requests.get
+    - circuito: cortacircuitos de los hosts (ver circuito_hosts.py); sin él,
+      las peticiones pasan siempre
+    """
+
+    def __init__(self, archivo=None, respaldo=None, circuito=None):
+        self.archivo = archivo
+        self.respaldo = respaldo
+        self.circuito = circuito
+
+
+class Presupuesto:
+    """
+    Plazos de una ejecución. Sin plazos no limita nada, así las funciones
+    pueden consultarlo siempre.
+    """
+
+    def __init__(self, plazos: Optional[Dict[str, float]] = None, en_proceso: bool = False):
+        self.plazos = dict(plazos or {})
+        # Con --profile las etapas de ejecutar_en_proceso corren aquí, sin
+        # plazo: el perfil del scraper no ve lo que pasa en un proceso hijo
+        self.en_proceso = en_proceso
+        self.inicio = time.monotonic()
+        self.excedidos: List[str] = []
+
+    def restante(self, etapa: str) -> Optional[float]:
+        """Segundos disponibles para una etapa que empieza ahora (None = sin límite)."""
+        limites = []
+        if "total" in self.plazos:
+            limites.append(self.plazos["total"] - (time.monotonic() - self.inicio))
+        if etapa in self.plazos:
+            limites.append(self.plazos[etapa])
+        return max(min(limites), 0.0) if limites else None
+
+    def excedido(self, etapa: str):
+        if etapa not in self.excedidos:
+            self.excedidos.append(etapa)
+        print(f"  Plazo excedido en la etapa '{etapa}'", file=sys.stderr)
+
+    def vigilar(self, etapa: str, accion: Callable[[], Any]) -> Optional[threading.Timer]:
+        """
+        Arranca un vigilante que ejecuta accion (p. ej. driver.quit) si la etapa
+        no termina a tiempo. El llamador debe cancelarlo al terminar.
+        """
+        plazo = self.restante(etapa)
+        if plazo is None:
+            return None
+
+        def vencer():
+            self.excedido(etapa)
+            try:
+                accion()
+            except Exception as e:
+                print(f"  Error deteniendo la etapa '{etapa}': {str(e)}", file=sys.stderr)
+
+        vigilante = threading.Timer(plazo, vencer)
+        vigilante.daemon = True
+        vigilante.start()
+        return vigilante
+
+
+def _bloques(response):
+    """
+    Bloques del cuerpo a medida que llegan. iter_content() espera a llenar cada
+    bloque, así una respuesta que gotea nunca llega a comprobar el plazo;
+    read1() (urllib3 2.x) retorna lo que haya disponible.
+    """
+    leer = getattr(getattr(response, 'raw', None), 'read1', None)
+    if leer is None:
+        yield from response.iter_content(BLOQUE_SIN_READ1)
+        return
+    while True:
+        bloque = leer(BLOQUE_DESCARGA, decode_content=True)
+        if not bloque:
+            return
+        yield bloque
+
+
+def descargar(url: str, headers: Dict[str, str], presupuesto: Optional[Presupuesto] = None,
+              etapa: str = 'pagina', timeout: float = 30, descargas: Optional[Descargas] = None) -> bytes:
+    """
+    requests.get con plazo de tiempo total: el cuerpo se lee por bloques y la
+    descarga se aborta con PlazoExcedido si el plazo de la etapa vence.
+    Lo descargado queda en el archivo de la ejecución, si hay uno. Con el
+    circuito del host abierto falla al instante con CircuitoAbierto.
+    """
+    descargas = descargas or Descargas()
+    archivo, circuito = descargas.archivo, descargas.circuito
+    archivado = archivo.obtener(url) if archivo is not None else None
+    if archivado is not None:
+        return archivado
+
+    presupuesto = presupuesto or Presupuesto()
+    plazo = presupuesto.restante(etapa)
+    if plazo is not None and plazo <= 0:
+        presupuesto.excedido(etapa)
+        raise PlazoExcedido(f"Sin tiempo para la etapa '{etapa}'")
+
+    lectura = timeout if plazo is None else max(min(timeout, plazo), 0.1)
+    limite = None if plazo is None else time.monotonic() + plazo
+
+    if circuito is not None:
+        circuito.comprobar(url)
+
+    obtener = descargas.respaldo.get if descargas.respaldo is not None else requests.get
+    try:
+        with obtener(url, headers=headers, timeout=(min(CONEXION_MAXIMA, lectura), lectura),
+                     stream=True) as response:
+            response.raise_for_status()
+            bloques = []
+            for bloque in _bloques(response):
+                bloques.append(bloque)
+                if limite is not None and time.monotonic() > limite:
+                    presupuesto.excedido(etapa)
+                    raise PlazoExcedido(f"La descarga de {url} superó el plazo de {plazo:.0f} s")
+            contenido = b''.join(bloques)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        if circuito is not None:
+            circuito.fallo(url, e)
+        raise
+    except requests.HTTPError as e:
+        # Un 4xx es el sitio respondiendo; solo los 5xx cuentan como caída
+        if circuito is not None and e.response is not None and e.response.status_code >= 500:
+            circuito.fallo(url, e)
+        raise
+    if circuito is not None:
+        circuito.exito(url)
+
+    if archivo is not None:
+        archivo.guardar(url, contenido, etapa)
+    return contenido
+
+
+class _EmisorCola(EmisorRegistros):
+    """Emisor del proceso hijo: envía cada registro al padre por la cola."""
+
+    def __init__(self, cola):
+        super().__init__()
+        self.cola = cola
+
+    @property
+    def activo(self) -> bool:
+        return True
+
+    def emitir(self, tipo: str, datos: Dict[str, Any], fuente: str):
+        self.cola.put(('registro', tipo, datos, fuente))
+
+
+def _vigilar_padre(padre: int):
+    """Termina el hijo si el padre muere (p. ej. con SIGKILL) y queda huérfano."""
+    while os.getppid() == padre:
+        time.sleep(VIGILANCIA_PADRE)
+    os._exit(1)
+
+
+def _ejecutar_hijo(cola, padre: int, funcion: Callable, args: tuple, kwargs: Dict[str, Any]):
+    threading.Thread(target=_vigilar_padre, args=(padre,), name="vigilante-padre", daemon=True).start()
+    try:
+        cola.put(('resultado', funcion(*args, emisor=_EmisorCola(cola), **kwargs)))
+    except BaseException as e:
+        cola.put(('error', f"{type(e).__name__}: {str(e)}"))
+
+
+def _acumular(parcial: Dict[str, Any], tipo: str, datos: Dict[str, Any]):
+    if tipo == 'tarifa':
+        parcial["tarifas"].append(datos)
+    elif tipo == 'subsidio':
+        parcial["subsidios"].append(datos)
+    elif tipo == 'componente':
+        parcial["componentes"][datos["nombre"]] = datos["valor"]
+
+
+def _detener_hijo(proceso):
+    if proceso.is_alive():
+        proceso.terminate()
+        proceso.join(ESPERA_CIERRE_HIJO)
+    if proceso.is_alive():
+        proceso.kill()
+    proceso.join()
+
+
+def ejecutar_en_proceso(etapa: str, presupuesto: Optional[Presupuesto], emisor: Optional[EmisorRegistros],
+                        funcion: Callable, *args, **kwargs) -> Dict[str, Any]:
+    """
+    Ejecuta funcion(*args, emisor=..., **kwargs) en un proceso hijo con el
+    plazo de la etapa. Los registros del hijo se reenvían al emisor a medida
+    que llegan; si el plazo vence se mata el hijo y se retorna lo recibido
+    con "parcial": True. Sin plazo (o con presupuesto.en_proceso) se ejecuta
+    en este mismo proceso.
+    El hijo arranca con spawn: funcion debe poder importarse y todo lo que
+    necesite (extractor, límites, caché de columnas) va en args y kwargs.
+    """
+    presupuesto = presupuesto or Presupuesto()
+    emisor = emisor or EmisorRegistros()
+    plazo = presupuesto.restante(etapa)
+    if plazo is None or presupuesto.en_proceso:
+        if plazo is not None:
+            print(f"  La etapa '{etapa}' corre en este proceso y sin plazo para perfilarla", file=sys.stderr)
+        return funcion(*args, emisor=emisor, **kwargs)
+
+    # spawn en todas las plataformas: un fork copiaría los hilos del scraper
+    # (vigilantes, peticiones de respaldo) a medio camino. La configuración
+    # llega al hijo en args/kwargs, no en variables del módulo.
+    contexto = multiprocessing.get_context('spawn')
+    cola = contexto.Queue()
+    proceso = contexto.Process(target=_ejecutar_hijo, args=(cola, os.getpid(), funcion, args, kwargs),
+                               name=f"etapa-{etapa}", daemon=True)
+    parcial: Dict[str, Any] = {"tarifas": [], "subsidios": [], "componentes": {}}
+    limite = time.monotonic() + plazo
+    proceso.start()
+
+    try:
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                mensaje = cola.get(timeout=min(restante, 0.5))
+            except queue.Empty:
+                if not proceso.is_alive():
+                    raise RuntimeError(f"El proceso de la etapa '{etapa}' terminó sin resultado "
+                                       f"(código {proceso.exitcode})")
+                continue
+
+            if mensaje[0] == 'registro':
+                _, tipo, datos, fuente = mensaje
+                emisor.emitir(tipo, datos, fuente)
+                _acumular(parcial, tipo, datos)
+            elif mensaje[0] == 'resultado':
+                return mensaje[1]
+            else:
+                raise RuntimeError(mensaje[1])
+    finally:
+        _detener_hijo(proceso)
+        cola.close()
+
+    presupuesto.excedido(etapa)
+    print(f"  Se usan los datos parciales de '{etapa}': {len(parcial['tarifas'])} tarifas, "
+          f"{len(parcial['subsidios'])} subsidios, {len(parcial['componentes'])} componentes", file=sys.stderr)
+    parcial["parcial"] = True
+    return parcial
+
+
+def _parsear_plazos(texto: str) -> Dict[str, float]:
+    plazos = {}
+    for par in texto.split(','):
+        if not par.strip():
+            continue
+        etapa, _, segundos = par.partition('=')
+        if etapa.strip() not in PLAZOS_POR_DEFECTO or not segundos:
+            raise argparse.ArgumentTypeError(
+                f"Plazo inválido '{par}' (etapas: {', '.join(PLAZOS_POR_DEFECTO)})")
+        plazos[etapa.strip()] = float(segundos)
+    return plazos
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    grupo = parser.add_argument_group("plazos")
+    grupo.add_argument("--plazos", type=_parsear_plazos, default={}, metavar="ETAPA=S,...",
+                       help="Segundos por etapa, p. ej. total=300,extraccion_pdf=60 "
+                            f"(por defecto: {','.join(f'{k}={v}' for k, v in PLAZOS_POR_DEFECTO.items())})")
+    grupo.add_argument("--sin-plazos", action="store_true",
+                       help="Sin plazos por etapa (solo los timeouts de cada petición)")
+
+
+def presupuesto_desde_argumentos(args: argparse.Namespace) -> Presupuesto:
+    if args.sin_plazos:
+        return Presupuesto()
+    perfilando = getattr(args, 'profile', None) is not None
+    return Presupuesto({**PLAZOS_POR_DEFECTO, **args.plazos}, en_proceso=perfilando)
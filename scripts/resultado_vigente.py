@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Último resultado bueno de un proveedor, servido mientras se revalida
+(stale-while-revalidate). Un scrape tarda lo que tarda el sitio del
+proveedor, y uno que falla deja a quien lo pidió sin tarifas aunque las
+del mes sigan vigentes.
+
+El último resultado bueno es la instantánea que publica
+guardar_snapshot_resultado() (solo con tarifas y sin error); su edad se
+toma de fechaExtraccion. Con --servir-vigente:
+
+- edad <= --vigencia-horas: se responde con la instantánea, sin scrape.
+- hasta --antiguedad-maxima-horas: se responde con la instantánea y se
+  lanza un scrape en segundo plano que la reemplaza al terminar. Si ya
+  hay uno en curso (ver ejecucion_compartida.py) no se lanza otro.
+- más vieja, o sin instantánea: se espera el scrape como siempre.
+
+Si el scrape falla o queda parcial (plazos excedidos, ver
+plazos_scrape.py), se responde con la instantánea (de cualquier edad) y
+el error queda en "vigencia". Los resultados servidos desde la
+instantánea llevan "vigencia" con su fecha y edad; los del scrape no.
+"""
+
+import os
+import sys
+import subprocess
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from tarifas_comun import ruta_datos
+from snapshot_tarifas import abrir_snapshot
+from ejecucion_compartida import EjecucionCompartida, dir_en_curso
+
+
+VIGENCIA_HORAS = 6.0
+ANTIGUEDAD_MAXIMA_HORAS = 168.0
+
+
+def comando_revalidacion() -> List[str]:
+    """Mismo script y argumentos, como scrape normal en segundo plano."""
+    return [sys.executable, os.path.abspath(sys.argv[0])] + sys.argv[1:] + ["--revalidacion"]
+
+
+def ultimo_bueno(proveedor: str, directorio: Optional[str] = None) -> Optional[Tuple[Dict[str, Any], float]]:
+    """(resultado, edad en horas) de la instantánea vigente, o None."""
+    try:
+        with abrir_snapshot(proveedor, directorio) as snapshot:
+            resultado = snapshot.a_resultado()
+            modificado = datetime.fromtimestamp(os.stat(snapshot.ruta).st_mtime)
+    except (OSError, ValueError):
+        return None
+    try:
+        fecha = datetime.fromisoformat(resultado.get("fechaExtraccion"))
+    except (TypeError, ValueError):
+        fecha = modificado
+    return resultado, max((datetime.now() - fecha).total_seconds() / 3600, 0.0)
+
+
+class ResultadoVigente:
+    """
+    Política de servicio del último resultado bueno. Sin proveedor no hace
+    nada y siempre se espera el scrape, así el __main__ puede llamarlo siempre.
+    """
+
+    def __init__(self, proveedor: Optional[str] = None, directorio: Optional[str] = None,
+                 vigencia_horas: float = VIGENCIA_HORAS,
+                 antiguedad_maxima_horas: float = ANTIGUEDAD_MAXIMA_HORAS,
+                 compartida: Optional[EjecucionCompartida] = None):
+        self.proveedor = proveedor
+        self.directorio = directorio
+        self.vigencia_horas = vigencia_horas
+        self.antiguedad_maxima_horas = antiguedad_maxima_horas
+        self.compartida = compartida or EjecucionCompartida()
+
+    @property
+    def activo(self) -> bool:
+        return self.proveedor is not None
+
+    def _revalidar(self) -> bool:
+        """Lanza el scrape en segundo plano salvo que ya haya uno en curso."""
+        if self.compartida.en_curso():
+            print(f"Ya hay una ejecución de {self.proveedor} en curso", file=sys.stderr)
+            return True
+        os.makedirs(dir_en_curso(self.directorio), exist_ok=True)
+        try:
+            with open(os.path.join(dir_en_curso(self.directorio), f"{self.proveedor}-revalidacion.log"), 'ab') as log:
+                # Sesión propia y sin heredar stdout: quien leyó esta respuesta no espera al scrape
+                proceso = subprocess.Popen(comando_revalidacion(), stdin=subprocess.DEVNULL,
+                                           stdout=subprocess.DEVNULL, stderr=log, start_new_session=True)
+        except OSError as e:
+            print(f"No se pudo lanzar la revalidación: {str(e)}", file=sys.stderr)
+            return False
+        print(f"Revalidación de {self.proveedor} en segundo plano (pid {proceso.pid})", file=sys.stderr)
+        return True
+
+    def servir(self) -> Optional[Dict[str, Any]]:
+        """El último resultado bueno si no pasó la antigüedad máxima, o None para esperar el scrape."""
+        if not self.activo:
+            return None
+        ultimo = ultimo_bueno(self.proveedor, self.directorio)
+        if ultimo is None:
+            print(f"No hay un resultado anterior de {self.proveedor}; se espera el scrape", file=sys.stderr)
+            return None
+        resultado, edad = ultimo
+        if edad > self.antiguedad_maxima_horas:
+            print(f"El último resultado de {self.proveedor} tiene {edad:.1f} h "
+                  f"(máximo {self.antiguedad_maxima_horas:g} h); se espera el scrape", file=sys.stderr)
+            return None
+
+        revalidando = edad > self.vigencia_horas and self._revalidar()
+        print(f"Resultado vigente de {self.proveedor} ({edad:.1f} h)", file=sys.stderr)
+        resultado["vigencia"] = {
+            "fecha": resultado.get("fechaExtraccion"),
+            "edad_horas": round(edad, 2),
+            "revalidando": revalidando,
+        }
+        return resultado
+
+    def respaldo(self, resultado: Dict[str, Any]) -> Dict[str, Any]:
+        """El resultado del scrape o, si falló o quedó parcial, el último bueno con el error."""
+        parcial = resultado.get("plazos_excedidos")
+        if not self.activo or (not resultado.get("error") and resultado.get("tarifas") and not parcial):
+            return resultado
+        ultimo = ultimo_bueno(self.proveedor, self.directorio)
+        if ultimo is None:
+            return resultado
+        vigente, edad = ultimo
+        print(f"El scrape de {self.proveedor} falló o quedó parcial; se responde con el resultado de hace {edad:.1f} h",
+              file=sys.stderr)
+        vigente["vigencia"] = {
+            "fecha": vigente.get("fechaExtraccion"),
+            "edad_horas": round(edad, 2),
+            "revalidando": False,
+            "error_actualizacion": resultado.get("error") or (
+                f"Plazos excedidos en {', '.join(parcial)}" if parcial else "El scrape no trajo tarifas"),
+        }
+        return vigente
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--servir-vigente", action="store_true",
+                        help="Responde con el último resultado bueno y lo revalida en segundo plano "
+                             "(ver resultado_vigente.py)")
+    parser.add_argument("--vigencia-horas", type=float, default=VIGENCIA_HORAS, metavar="HORAS",
+                        help=f"Edad hasta la que no se revalida (por defecto {VIGENCIA_HORAS:g})")
+    parser.add_argument("--antiguedad-maxima-horas", type=float, default=ANTIGUEDAD_MAXIMA_HORAS, metavar="HORAS",
+                        help=f"Edad a partir de la que se espera el scrape (por defecto {ANTIGUEDAD_MAXIMA_HORAS:g})")
+    # Lo agrega el proceso que lanza la revalidación
+    parser.add_argument("--revalidacion", action="store_true", help=argparse.SUPPRESS)
+
+
+def vigente_desde_argumentos(args: argparse.Namespace, proveedor: str,
+                             compartida: Optional[EjecucionCompartida] = None) -> ResultadoVigente:
+    if not args.servir_vigente or args.revalidacion:
+        return ResultadoVigente()
+    return ResultadoVigente(proveedor, ruta_datos(), args.vigencia_horas, args.antiguedad_maxima_horas, compartida)
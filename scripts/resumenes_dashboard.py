@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resúmenes precalculados para el dashboard - OptiFactura Montería
+services/dashboard-service.js armaba cada vista recorriendo todas las filas
+de AnalisisFactura del usuario, así que la latencia crecía con la antigüedad
+de la cuenta. Esta etapa materializa los agregados una vez (después de cada
+lote de facturas o de cada scrape) y el dashboard lee unas pocas filas.
+
+Archivos en datos_tarifas/resumenes/:
+    usuarios/<userId>.json   por mes y proveedor: facturas, consumo, gasto,
+                             ahorro (diferenciaTarifa > 0), suma de
+                             porcentajeDiferencia y facturas con anomalías
+    proveedores.json         lo mismo por proveedor y mes, con usuarios distintos
+    tendencia_tarifas.json   tarifa de cada mes por proveedor y estrato, con la
+                             variación respecto al mes anterior
+    estado.json              corte: createdAt más reciente incluido, en UTC
+                             ("...Z"). El dashboard suma en vivo solo las
+                             facturas posteriores al corte
+
+Los agregados guardan sumas y conteos (no promedios) para poder combinarlos
+con las facturas posteriores al corte.
+
+Uso:
+    python scripts/resumenes_dashboard.py analisis_factura.csv   # exportación completa
+    python scripts/resumenes_dashboard.py --solo-tendencia       # después de un scrape
+    python scripts/conciliar_facturas.py analisis_factura.csv salida.csv --resumenes --exportacion-completa
+"""
+
+import sys
+import json
+import os
+import re
+import argparse
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from tarifas_comun import DIR_DATOS, PROVEEDORES, ruta_datos, escribir_atomico
+from snapshot_tarifas import SnapshotTarifas, historial_snapshots, ruta_snapshot
+
+
+# Índices de los contadores de cada celda (usuario o proveedor, mes, proveedor)
+FACTURAS, CONSUMO, GASTO, AHORRO, SUMA_PORCENTAJE, ANOMALIAS = range(6)
+CAMPOS_CELDA = ("facturas", "consumo", "gasto", "ahorro", "sumaPorcentajeDiferencia", "anomalias")
+
+COLUMNAS_FACTURA = ("userId", "proveedor", "fechaFactura", "consumo", "valorTotal", "unidadConsumo",
+                    "diferenciaTarifa", "porcentajeDiferencia", "anomalias", "createdAt")
+FORMATOS_FECHA = ('%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+MES_ISO = re.compile(r'^\d{4}-\d{2}')
+OFFSET_HORAS = re.compile(r'(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?[+-]\d{2})$')
+
+
+def ruta_resumenes(*partes: str, directorio: Optional[str] = None) -> str:
+    return ruta_datos('resumenes', *partes, directorio=directorio)
+
+
+def _mes(valor: Any) -> Optional[str]:
+    """YYYY-MM de una fecha (datetime, date o texto), como toISOString().substring(0, 7)."""
+    if isinstance(valor, (datetime, date)):
+        return f"{valor.year:04d}-{valor.month:02d}"
+    if not valor:
+        return None
+    texto = str(valor).strip()
+    if MES_ISO.match(texto):
+        return texto[:7]
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).strftime('%Y-%m')
+        except ValueError:
+            continue
+    return None
+
+
+def _numero(valor: Any) -> float:
+    if valor is None or valor == '':
+        return 0.0
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _tiene_anomalias(valor: Any) -> bool:
+    # Mismo criterio que dashboard-service.js: anomalias distinto de "[]"
+    return valor is not None and str(valor).strip() not in ('', '[]')
+
+
+def _instante_utc(valor: Any) -> Optional[datetime]:
+    """
+    createdAt como datetime en UTC. Los valores sin zona (Parquet, CSV sin
+    desfase) se toman como UTC, que es como los guarda Prisma.
+    """
+    if not valor:
+        return None
+    if isinstance(valor, datetime):
+        instante = valor
+    else:
+        texto = str(valor).strip()
+        # fromisoformat de Python < 3.11 no acepta "Z" ni desfases de solo horas ("-05")
+        texto = OFFSET_HORAS.sub(r'\1:00', re.sub(r'[Zz]$', '+00:00', texto))
+        try:
+            instante = datetime.fromisoformat(texto)
+        except ValueError:
+            raise ValueError(f"createdAt inválido: {valor!r}") from None
+    if instante.tzinfo is None:
+        return instante.replace(tzinfo=timezone.utc)
+    return instante.astimezone(timezone.utc)
+
+
+def _corte_iso(instante: Optional[datetime]) -> Optional[str]:
+    """ISO-8601 en UTC con "Z" y milisegundos (truncados), como toISOString()."""
+    if instante is None:
+        return None
+    return instante.replace(tzinfo=None).isoformat(timespec='milliseconds') + 'Z'
+
+
+def _nombre_archivo(user_id: str) -> str:
+    return re.sub(r'[^\w-]', '_', user_id) + '.json'
+
+
+class AcumuladorResumenes:
+    """
+    Agrega facturas por bloques (columnas como listas), así se puede
+    alimentar mientras se lee o concilia un archivo de cualquier tamaño.
+    """
+
+    def __init__(self):
+        self.usuarios: Dict[str, Dict[str, Dict[str, list]]] = {}
+        self.unidades: Dict[str, str] = {}
+        self.proveedores: Dict[str, Dict[str, list]] = {}
+        self.usuarios_proveedor: Dict[tuple, set] = {}
+        self.corte: Optional[datetime] = None
+        self.filas = 0
+
+    def agregar_bloque(self, columnas: Dict[str, List[Any]]):
+        n = len(next(iter(columnas.values()), []))
+        vacia = [None] * n
+        datos = [columnas.get(nombre) or vacia for nombre in COLUMNAS_FACTURA]
+
+        for user_id, proveedor, fecha, consumo, valor, unidad, diferencia, porcentaje, anomalias, creado \
+                in zip(*datos):
+            mes = _mes(fecha)
+            if not user_id or not proveedor or not mes:
+                continue
+            self.filas += 1
+            proveedor = str(proveedor)
+            diferencia = _numero(diferencia)
+            celda_usuario = self.usuarios.setdefault(str(user_id), {}).setdefault(mes, {})
+            for celda in (celda_usuario.setdefault(proveedor, [0, 0.0, 0.0, 0.0, 0.0, 0]),
+                          self.proveedores.setdefault(proveedor, {}).setdefault(mes, [0, 0.0, 0.0, 0.0, 0.0, 0])):
+                celda[FACTURAS] += 1
+                celda[CONSUMO] += _numero(consumo)
+                celda[GASTO] += _numero(valor)
+                celda[AHORRO] += diferencia if diferencia > 0 else 0.0
+                celda[SUMA_PORCENTAJE] += _numero(porcentaje)
+                celda[ANOMALIAS] += _tiene_anomalias(anomalias)
+
+            self.usuarios_proveedor.setdefault((proveedor, mes), set()).add(user_id)
+            if unidad and proveedor not in self.unidades:
+                self.unidades[proveedor] = str(unidad)
+            creado = _instante_utc(creado)
+            if creado and (self.corte is None or creado > self.corte):
+                self.corte = creado
+
+    def _resumen_usuario(self, meses: Dict[str, Dict[str, list]]) -> Dict[str, Any]:
+        totales = [0, 0.0, 0.0, 0.0, 0.0, 0]
+        salida = {}
+        for mes in sorted(meses):
+            salida[mes] = {}
+            for proveedor, celda in sorted(meses[mes].items()):
+                salida[mes][proveedor] = {**dict(zip(CAMPOS_CELDA, celda)),
+                                          "unidad": self.unidades.get(proveedor)}
+                totales = [a + b for a, b in zip(totales, celda)]
+        return {"meses": salida, "totales": dict(zip(CAMPOS_CELDA, totales))}
+
+    def escribir(self, directorio: Optional[str] = None, completo: bool = True) -> Dict[str, Any]:
+        """
+        Escribe los resúmenes. Solo se reescriben los archivos de usuario que
+        cambiaron; con completo=True (exportación de toda la tabla) se borran
+        los de usuarios que ya no aparecen.
+        """
+        base = ruta_resumenes('usuarios', directorio=directorio)
+        os.makedirs(base, exist_ok=True)
+        escritos = sin_cambios = 0
+        vigentes = set()
+
+        for user_id, meses in self.usuarios.items():
+            nombre = _nombre_archivo(user_id)
+            vigentes.add(nombre)
+            datos = json.dumps({"userId": user_id, **self._resumen_usuario(meses)},
+                               ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            ruta = os.path.join(base, nombre)
+            try:
+                with open(ruta, 'rb') as f:
+                    if f.read() == datos:
+                        sin_cambios += 1
+                        continue
+            except OSError:
+                pass
+            escribir_atomico(ruta, datos)
+            escritos += 1
+
+        eliminados = 0
+        if completo:
+            for nombre in os.listdir(base):
+                if nombre.endswith('.json') and nombre not in vigentes:
+                    os.unlink(os.path.join(base, nombre))
+                    eliminados += 1
+
+        proveedores = {
+            proveedor: {mes: {**dict(zip(CAMPOS_CELDA, celda)),
+                              "usuarios": len(self.usuarios_proveedor[(proveedor, mes)]),
+                              "unidad": self.unidades.get(proveedor)}
+                        for mes, celda in sorted(meses.items())}
+            for proveedor, meses in sorted(self.proveedores.items())
+        }
+        escribir_atomico(ruta_resumenes('proveedores.json', directorio=directorio),
+                         json.dumps(proveedores, ensure_ascii=False, indent=2).encode('utf-8'))
+
+        estado = {"corte": _corte_iso(self.corte), "generado": datetime.now().isoformat(),
+                  "facturas": self.filas, "usuarios": len(self.usuarios)}
+        escribir_atomico(ruta_resumenes('estado.json', directorio=directorio),
+                         json.dumps(estado, ensure_ascii=False, indent=2).encode('utf-8'))
+
+        return {**estado, "archivos_escritos": escritos, "archivos_sin_cambios": sin_cambios,
+                "archivos_eliminados": eliminados}
+
+
+def tendencia_tarifas(directorio: Optional[str] = None) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """
+    Tarifa de cada mes por proveedor y estrato según el historial de
+    instantáneas (la última de cada mes), con la variación porcentual.
+    """
+    tendencia = {}
+    for proveedor in PROVEEDORES:
+        por_mes: Dict[str, Dict[str, float]] = {}
+        rutas = historial_snapshots(proveedor, directorio) + [ruta_snapshot(proveedor, directorio)]
+        for ruta in rutas:
+            if not os.path.exists(ruta):
+                continue
+            try:
+                with SnapshotTarifas(ruta) as snapshot:
+                    mes = _mes(snapshot.metadatos.get("fechaExtraccion"))
+                    tarifas = {snapshot.estrato(i): snapshot.tarifa[i] for i in range(snapshot.n_tarifas)
+                               if snapshot.tarifa[i] == snapshot.tarifa[i]}  # sin NaN
+            except (OSError, ValueError) as e:
+                print(f"  Instantánea ignorada {ruta}: {str(e)}", file=sys.stderr)
+                continue
+            if mes and tarifas:
+                por_mes[mes] = tarifas  # rutas en orden: gana la última del mes
+
+        estratos: Dict[str, List[Dict[str, Any]]] = {}
+        for mes in sorted(por_mes):
+            for estrato, tarifa in por_mes[mes].items():
+                serie = estratos.setdefault(estrato, [])
+                anterior = serie[-1]["tarifa"] if serie else None
+                serie.append({
+                    "mes": mes,
+                    "tarifa": tarifa,
+                    "variacion": round((tarifa - anterior) / anterior * 100, 2) if anterior else None,
+                })
+        if estratos:
+            tendencia[proveedor] = estratos
+    return tendencia
+
+
+def actualizar_tendencia_tarifas(resultado: Optional[Dict[str, Any]] = None,
+                                 directorio: Optional[str] = None) -> Optional[str]:
+    """
+    Reescribe tendencia_tarifas.json. Los scrapers la llaman después de
+    publicar la instantánea; un resultado con error o sin tarifas no cambia nada.
+    """
+    if resultado is not None and (resultado.get("error") or not resultado.get("tarifas")):
+        return None
+    try:
+        ruta = ruta_resumenes('tendencia_tarifas.json', directorio=directorio)
+        datos = json.dumps(tendencia_tarifas(directorio), ensure_ascii=False, indent=2)
+        return escribir_atomico(ruta, datos.encode('utf-8'))
+    except Exception as e:
+        print(f"Error actualizando la tendencia de tarifas: {str(e)}", file=sys.stderr)
+        return None
+
+
+def resumir_archivo(entrada: str, directorio: Optional[str] = None, tamano_bloque: int = 50_000) -> Dict[str, Any]:
+    """Resume una exportación completa de AnalisisFactura (CSV o Parquet) leída por bloques."""
+    from conciliar_facturas import abrir_lector
+
+    acumulador = AcumuladorResumenes()
+    lector = abrir_lector(entrada, tamano_bloque)
+    try:
+        for bloque in lector.bloques():
+            acumulador.agregar_bloque({c: lector.columna(bloque, c) for c in COLUMNAS_FACTURA})
+    finally:
+        lector.cerrar()
+    return acumulador.escribir(directorio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resúmenes precalculados para el dashboard")
+    parser.add_argument("entrada", nargs="?", help="Exportación de analisis_factura (CSV o Parquet)")
+    parser.add_argument("--dir-datos", default=DIR_DATOS, help="Directorio de datos (resumenes/ queda adentro)")
+    parser.add_argument("--solo-tendencia", action="store_true",
+                        help="Solo recalcula la tendencia de tarifas desde el historial de instantáneas")
+    args = parser.parse_args()
+
+    if not args.entrada and not args.solo_tendencia:
+        parser.error("Indica una exportación de facturas o --solo-tendencia")
+
+    estadisticas = {}
+    if args.entrada:
+        try:
+            estadisticas = resumir_archivo(args.entrada, args.dir_datos)
+        except (OSError, ValueError) as e:
+            print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
+            sys.exit(1)
+    estadisticas["tendencia"] = actualizar_tendencia_tarifas(directorio=args.dir_datos)
+    print(json.dumps(estadisticas, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
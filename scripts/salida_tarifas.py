@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Salida de los scrapers de tarifas.
+Con --format json (por defecto) el resultado completo se imprime al final,
+como siempre. Con --format jsonl cada tarifa, subsidio y componente se
+escribe en stdout como una línea JSON en cuanto se extrae, y un registro
+final de tipo "resumen" cierra el flujo con el resultado definitivo.
+
+Los registros intermedios indican su fuente (pdf, html, tabla, texto,
+pagina, calculado...). Una fuente puede descartarse después (p. ej. las
+tarifas del HTML de Veolia si el PDF trae tarifas); el resumen es el que
+define qué quedó en el resultado. Si el scraper se cae a mitad de camino,
+lo ya emitido no se pierde.
+
+Los registros y el resultado se serializan con modelo_tarifas.serializar()
+(orjson si está instalado, con la misma salida que json).
+
+Con --format msgpack el resultado sale en binario para el puente con Node
+(lib/salida-python.js): un encabezado de 6 bytes (magic 'OFMP' + versión
+del esquema, u16 big-endian) y tramas de u32 big-endian con el largo + el
+registro en MessagePack. Cada scraper escribe una sola trama, el resumen;
+las tramas permiten concatenar varios resultados (backfill, varias
+regiones) en un mismo flujo. Para comprobar que una salida msgpack
+decodifica a lo mismo que la JSON:
+    python scripts/salida_tarifas.py comparar resultado.json resultado.msgpack
+npm run test-salida-python (scripts/test-salida-python.js) codifica un
+resultado de prueba en los tres formatos y verifica que leer_tramas() y
+parsearSalida() de lib/salida-python.js lo decodifican igual.
+
+Ejemplo de flujo:
+    {"tipo": "tarifa", "proveedor": "veolia", "fuente": "pdf", "estrato": "1", "tarifa": 1400.25, ...}
+    {"tipo": "subsidio", "proveedor": "veolia", "fuente": "pdf", "estrato": "1", "porcentaje": -70}
+    {"tipo": "resumen", "proveedor": "Veolia", "tarifas": [...], "subsidios": [...], ...}
+"""
+
+import sys
+import json
+import os
+import struct
+import argparse
+from typing import Any, BinaryIO, Dict, Iterator, Optional, TextIO, Union
+
+from modelo_tarifas import Componente, Subsidio, Tarifa, a_dict, a_serializable, serializar
+
+
+FORMATOS = ('json', 'jsonl', 'msgpack')
+
+MAGIC_MSGPACK = b'OFMP'
+VERSION_ESQUEMA = 1  # subir si cambia la forma de los registros o del resumen
+ENCABEZADO_MSGPACK = struct.Struct('>4sH')
+LARGO_TRAMA = struct.Struct('>I')
+
+_con_encabezado = set()  # id() de los flujos msgpack que ya tienen encabezado
+
+
+def _importar_msgpack():
+    try:
+        import msgpack
+    except ImportError as e:
+        print(json.dumps({
+            "error": f"Dependencias faltantes: {str(e)}. Ejecuta: pip install msgpack"
+        }), file=sys.stderr)
+        sys.exit(1)
+    return msgpack
+
+
+def escribir_encabezado(flujo: BinaryIO):
+    """Escribe el encabezado msgpack una sola vez por flujo."""
+    if id(flujo) in _con_encabezado:
+        return
+    flujo.write(ENCABEZADO_MSGPACK.pack(MAGIC_MSGPACK, VERSION_ESQUEMA))
+    _con_encabezado.add(id(flujo))
+
+
+def escribir_trama(flujo: BinaryIO, registro: Dict[str, Any]):
+    datos = _importar_msgpack().packb(registro, default=a_serializable, use_bin_type=True)
+    flujo.write(LARGO_TRAMA.pack(len(datos)) + datos)
+    flujo.flush()
+
+
+def leer_tramas(flujo: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """Registros de un flujo msgpack; valida el encabezado y la versión del esquema."""
+    msgpack = _importar_msgpack()
+    encabezado = flujo.read(ENCABEZADO_MSGPACK.size)
+    if len(encabezado) < ENCABEZADO_MSGPACK.size:
+        raise ValueError("Flujo msgpack sin encabezado")
+    magic, version = ENCABEZADO_MSGPACK.unpack(encabezado)
+    if magic != MAGIC_MSGPACK:
+        raise ValueError("El flujo no es una salida msgpack de los scrapers")
+    if version > VERSION_ESQUEMA:
+        raise ValueError(f"Versión de esquema {version} no soportada (máxima {VERSION_ESQUEMA})")
+
+    while True:
+        largo = flujo.read(LARGO_TRAMA.size)
+        if not largo:
+            return
+        if len(largo) < LARGO_TRAMA.size:
+            raise ValueError("Trama msgpack truncada")
+        (n,) = LARGO_TRAMA.unpack(largo)
+        datos = flujo.read(n)
+        if len(datos) < n:
+            raise ValueError("Trama msgpack truncada")
+        yield msgpack.unpackb(datos, raw=False)
+
+
+class EmisorRegistros:
+    """
+    Escribe registros JSON Lines a medida que se extraen. Sin flujo no emite
+    nada, así las funciones de extracción pueden llamarlo siempre.
+    """
+
+    def __init__(self, proveedor: Optional[str] = None, flujo: Optional[TextIO] = None):
+        self.proveedor = proveedor
+        self.flujo = flujo
+
+    @property
+    def activo(self) -> bool:
+        return self.flujo is not None
+
+    def emitir(self, tipo: str, datos: Dict[str, Any], fuente: str):
+        if not self.activo:
+            return
+        registro = {"tipo": tipo, "proveedor": self.proveedor, "fuente": fuente, **datos}
+        self.flujo.write(serializar(registro).decode('utf-8') + '\n')
+        self.flujo.flush()
+
+    def tarifa(self, tarifa: Union[Tarifa, Dict[str, Any]], fuente: str):
+        self.emitir('tarifa', a_dict(tarifa), fuente)
+
+    def subsidio(self, subsidio: Union[Subsidio, Dict[str, Any]], fuente: str):
+        self.emitir('subsidio', a_dict(subsidio), fuente)
+
+    def componente(self, nombre: str, valor: float, fuente: str):
+        self.emitir('componente', a_dict(Componente(nombre, valor)), fuente)
+
+    def extraccion(self, datos: Dict[str, Any], fuente: str):
+        """Emite todo lo de una etapa ya extraída (p. ej. cargada de un checkpoint)."""
+        for tarifa in datos.get("tarifas") or []:
+            self.tarifa(tarifa, fuente)
+        for subsidio in datos.get("subsidios") or []:
+            self.subsidio(subsidio, fuente)
+        for nombre, valor in (datos.get("componentes") or {}).items():
+            self.componente(nombre, valor, fuente)
+
+
+def escribir_resultado(resultado: Dict[str, Any], formato: str = 'json',
+                       flujo: Optional[Union[TextIO, BinaryIO]] = None):
+    """Imprime el resultado final: el JSON de siempre o el registro de resumen del flujo."""
+    if formato == 'msgpack':
+        flujo = flujo or sys.stdout.buffer
+        escribir_encabezado(flujo)
+        escribir_trama(flujo, {"tipo": "resumen", **resultado})
+        return
+    flujo = flujo or sys.stdout
+    if formato == 'jsonl':
+        flujo.write(serializar({"tipo": "resumen", **resultado}).decode('utf-8') + '\n')
+    else:
+        flujo.write(serializar(resultado, indentar=True).decode('utf-8') + '\n')
+    flujo.flush()
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--format", choices=FORMATOS, default='json',
+                        help="json: resultado completo al final; jsonl: un registro por tarifa, "
+                             "subsidio y componente a medida que se extraen, y un resumen al final; "
+                             "msgpack: el resultado en una trama MessagePack con encabezado de versión")
+
+
+def emisor_desde_argumentos(args: argparse.Namespace, proveedor: str) -> EmisorRegistros:
+    if args.format == 'jsonl':
+        return EmisorRegistros(proveedor, sys.stdout)
+    if args.format == 'msgpack':
+        _importar_msgpack()  # falla antes de empezar a extraer
+    return EmisorRegistros()
+
+
+# Cambian entre dos ejecuciones sobre los mismos datos
+CLAVES_VOLATILES = ("fechaExtraccion", "pdf_descubierto", "memoria_pdf")
+
+
+def comparar(referencia: str, ruta_msgpack: str, ignorar=CLAVES_VOLATILES) -> Dict[str, Any]:
+    """
+    Compara una salida msgpack con la JSON de la misma extracción: contra un
+    .json se compara el resumen y contra un .jsonl, registro por registro.
+    Las claves de ignorar no se comparan.
+    """
+    with open(ruta_msgpack, 'rb') as f:
+        registros = list(leer_tramas(f))
+    with open(referencia, 'r', encoding='utf-8') as f:
+        if referencia.endswith('.jsonl'):
+            esperados = [json.loads(linea) for linea in f if linea.strip()]
+        else:
+            esperados = [{"tipo": "resumen", **json.load(f)}]
+            registros = registros[-1:]
+
+    def sin_volatiles(registro):
+        return {k: v for k, v in registro.items() if k not in ignorar}
+
+    diferencias = [i for i, (a, b) in enumerate(zip(esperados, registros))
+                   if sin_volatiles(a) != sin_volatiles(b)]
+    return {
+        "iguales": not diferencias and len(esperados) == len(registros),
+        "registros": len(registros),
+        "diferencias": diferencias,
+        "bytes_json": os.path.getsize(referencia),
+        "bytes_msgpack": os.path.getsize(ruta_msgpack),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Herramientas de la salida de los scrapers")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    sub = subcomandos.add_parser("comparar", help="Verifica que una salida msgpack decodifica igual que la JSON")
+    sub.add_argument("referencia", help="Salida --format json o jsonl")
+    sub.add_argument("msgpack", help="Salida --format msgpack de la misma extracción")
+    sub.add_argument("--ignorar", default=','.join(CLAVES_VOLATILES), metavar="CLAVE,...",
+                     help="Claves que no se comparan (por defecto, las que cambian entre ejecuciones)")
+    args = parser.parse_args()
+
+    try:
+        resultado = comparar(args.referencia, args.msgpack, [c for c in args.ignorar.split(',') if c])
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    sys.exit(0 if resultado["iguales"] else 1)
+
+
+if __name__ == "__main__":
+    main()
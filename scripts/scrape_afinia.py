@@ -14,6 +14,8 @@ import json
 import re
 import os
 import tempfile
+import time
+import argparse
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from urllib.parse import urljoin
@@ -28,6 +30,36 @@ except ImportError as e:
     }), file=sys.stderr)
     sys.exit(1)
 
+from snapshot_tarifas import guardar_snapshot_resultado
+from resumenes_dashboard import actualizar_tendencia_tarifas
+from checkpoint_scrape import CheckpointScrape, agregar_argumentos, checkpoint_desde_argumentos
+import perfil_scrape
+from perfil_scrape import PerfilScrape, perfil_desde_argumentos
+import salida_tarifas
+from salida_tarifas import EmisorRegistros, emisor_desde_argumentos, escribir_resultado
+from modelo_tarifas import RegistrosPorEstrato, Subsidio, Tarifa, a_dict
+import sondeo_tarifas
+from sondeo_tarifas import calcular_huella, evaluar_sondeo, guardar_huella_resultado, TIMEOUT_SONDEO
+import extraccion_tablas
+from extraccion_tablas import extraer_tablas
+import paginas_pdf
+from paginas_pdf import iterar_paginas
+import plazos_scrape
+import archivo_artefactos
+from archivo_artefactos import archivo_desde_argumentos
+import peticiones_respaldo
+from peticiones_respaldo import respaldo_desde_argumentos
+import mapeo_columnas
+from mapeo_columnas import CacheColumnas, columnas_desde_argumentos
+import ejecucion_compartida
+from ejecucion_compartida import compartida_desde_argumentos
+import resultado_vigente
+from resultado_vigente import vigente_desde_argumentos
+import circuito_hosts
+from circuito_hosts import circuito_desde_argumentos
+from escaneo_texto import Escaner, Patron, palabras_clave, primera
+from plazos_scrape import Descargas, Presupuesto, descargar, ejecutar_en_proceso, presupuesto_desde_argumentos
+
 
 # Configuración
 BASE_URL = "https://afinia.com.co"
@@ -37,6 +69,10 @@ HEADERS = {
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
     'Accept-Language': 'es-CO,es;q=0.9',
 }
+EXTRACTOR_TABLAS = 'pdfplumber'  # o 'rapido' (ver extraccion_tablas.py)
+RECORTAR_TABLAS = True  # buscar tablas solo en la región de las palabras ancla
+MEMORIA_MAXIMA_MB = None  # techo de RSS al leer el PDF (None = sin límite)
+CACHE_COLUMNAS = CacheColumnas()  # mapeos de columnas aprendidos (ver mapeo_columnas.py)
 
 # Subsidios oficiales CREG para Electricidad (fallback si no se extraen de la página)
 # Según regulación CREG vigente
@@ -56,6 +92,15 @@ SUBSIDIOS_CREG_ELECTRICIDAD = {
 CONSUMO_SUBSISTENCIA_ELECTRICIDAD = 173  # kWh/mes para municipios < 1000 msnm
 
 
+def obtener_pagina_tarifas(timeout: int = 30, presupuesto: Optional[Presupuesto] = None,
+                           descargas: Optional[Descargas] = None) -> bytes:
+    """
+    Descarga la página de tarifas y retorna su HTML sin decodificar.
+    Con presupuesto, la descarga completa respeta el plazo de la etapa 'pagina'.
+    """
+    return descargar(TARIFAS_URL, HEADERS, presupuesto, 'pagina', timeout, descargas)
+
+
 def encontrar_pdf_mas_reciente(soup: BeautifulSoup) -> Optional[Dict[str, str]]:
     """
     Busca el enlace al PDF de tarifas más reciente en la página.
@@ -113,21 +158,22 @@ def encontrar_pdf_mas_reciente(soup: BeautifulSoup) -> Optional[Dict[str, str]]:
     return None
 
 
-def descargar_pdf(url: str) -> Optional[str]:
+def descargar_pdf(url: str, presupuesto: Optional[Presupuesto] = None,
+                  descargas: Optional[Descargas] = None) -> Optional[str]:
     """
     Descarga un PDF y retorna la ruta del archivo temporal.
+    Con presupuesto, la descarga completa respeta el plazo de la etapa 'pdf'.
     """
     try:
         print(f"Descargando PDF desde: {url}", file=sys.stderr)
-        response = requests.get(url, headers=HEADERS, timeout=60)
-        response.raise_for_status()
+        contenido = descargar(url, HEADERS, presupuesto, 'pdf', 60, descargas)
         
         # Guardar en archivo temporal
         fd, path = tempfile.mkstemp(suffix='.pdf')
         with os.fdopen(fd, 'wb') as f:
-            f.write(response.content)
+            f.write(contenido)
         
-        print(f"PDF descargado: {len(response.content)} bytes", file=sys.stderr)
+        print(f"PDF descargado: {len(contenido)} bytes", file=sys.stderr)
         return path
         
     except Exception as e:
@@ -160,6 +206,13 @@ def extraer_numero(texto: str) -> float:
         return 0.0
 
 
+# Patrones sobre el texto completo de la página HTML
+# Subsidios: "1 = XX.XX%" o "Estrato 1 = XX%"
+PATRON_SUBSIDIO_PAGINA = re.compile(r'(?:estrato\s*)?(\d)\s*[=:]\s*([\d.,]+)\s*%')
+# CU: número seguido de $/kWh
+PATRON_CU_PAGINA = re.compile(r'(\d{1,3}[.,]?\d{0,3}[.,]?\d{2})\s*\$/kWh')
+
+
 def extraer_subsidios_de_pagina(soup: BeautifulSoup) -> Dict[str, float]:
     """
     Extrae los porcentajes de subsidio directamente de la página HTML.
@@ -170,9 +223,7 @@ def extraer_subsidios_de_pagina(soup: BeautifulSoup) -> Dict[str, float]:
     # Buscar en todo el texto de la página
     text = soup.get_text()
     
-    # Patrón para subsidios: "1 = XX.XX%" o "Estrato 1 = XX%"
-    patron_subsidio = r'(?:estrato\s*)?(\d)\s*[=:]\s*([\d.,]+)\s*%'
-    matches = re.findall(patron_subsidio, text.lower())
+    matches = PATRON_SUBSIDIO_PAGINA.findall(text.lower())
     
     for estrato, porcentaje in matches:
         if estrato in ['1', '2', '3']:
@@ -192,9 +243,7 @@ def extraer_cu_de_pagina(soup: BeautifulSoup) -> Optional[float]:
     text = soup.get_text()
     
     # Buscar el CU en el texto
-    # Patrón: número seguido de $/kWh
-    patron_cu = r'(\d{1,3}[.,]?\d{0,3}[.,]?\d{2})\s*\$/kWh'
-    matches = re.findall(patron_cu, text)
+    matches = PATRON_CU_PAGINA.findall(text)
     
     if matches:
         for match in matches:
@@ -206,36 +255,58 @@ def extraer_cu_de_pagina(soup: BeautifulSoup) -> Optional[float]:
     return None
 
 
-def extraer_tarifas_de_pdf(pdf_path: str) -> Dict[str, Any]:
+# Texto de cada página del PDF: CU y componentes en una sola pasada (ver escaneo_texto.py)
+# Patrones comunes del CU: "CU: $XXX,XX", "Costo Unitario $XXX.XX" o "XXX,XX $/kWh"
+PATRONES_CU = ('cu', 'cu_kwh', 'cu_nivel_tension')
+COMPONENTES_PDF = ('Generación', 'Transmisión', 'Distribución', 'Comercialización', 'Pérdidas', 'Restricciones')
+ESCANER_PDF = Escaner([
+    Patron('cu', ('cu', 'costo'), r'(?:CU|costo\s*unitario)[:\s]*\$?\s*([\d.,]+)'),
+    Patron('cu_kwh', ('$/kwh',), r'([\d.,]+)\s*$', antes=True),
+    Patron('cu_nivel_tension', ('nivel',), r'nivel\s*(?:de\s*)?tensi[oó]n\s*1[^0-9]*([\d.,]+)'),
+    Patron('Generación', ('generación',), r'generaci[oó]n[:\s]*([\d.,]+)'),
+    Patron('Transmisión', ('transmisión',), r'transmisi[oó]n[:\s]*([\d.,]+)'),
+    Patron('Distribución', ('distribución',), r'distribuci[oó]n[:\s]*([\d.,]+)'),
+    Patron('Comercialización', ('comercialización',), r'comercializaci[oó]n[:\s]*([\d.,]+)'),
+    Patron('Pérdidas', ('pérdidas',), r'p[eé]rdidas[:\s]*([\d.,]+)'),
+    Patron('Restricciones', ('restricciones',), r'restricciones[:\s]*([\d.,]+)'),
+])
+ENCABEZADOS_TARIFA = palabras_clave(['estrato', 'kwh', 'tarifa', 'cargo', 'nivel'])
+
+
+def extraer_tarifas_de_pdf(pdf_path: str, eliminar: bool = True,
+                           emisor: Optional[EmisorRegistros] = None,
+                           extractor: str = EXTRACTOR_TABLAS, recortar: bool = RECORTAR_TABLAS,
+                           memoria_maxima_mb: Optional[float] = MEMORIA_MAXIMA_MB,
+                           cache_columnas: Optional[CacheColumnas] = None) -> Dict[str, Any]:
     """
     Extrae las tarifas del PDF de Afinia.
     Busca:
     - Costo Unitario (CU) base
     - Tarifas por estrato
     - Componentes de tarifa
+    Con eliminar=False el archivo se conserva (p. ej. si pertenece a un checkpoint).
+    Las páginas se leen de a una y se liberan al terminar (ver paginas_pdf.py).
+    Cada tarifa y componente se emite en cuanto se encuentra (--format jsonl).
     """
+    emisor = emisor or EmisorRegistros()
+    cache_columnas = cache_columnas or CacheColumnas()
     cu_base = None
-    tarifas_extraidas = []
+    tarifas_extraidas = RegistrosPorEstrato()
     componentes = {}
     
     try:
+        memoria = {}
         with pdfplumber.open(pdf_path) as pdf:
             print(f"PDF tiene {len(pdf.pages)} páginas", file=sys.stderr)
             
-            for page_num, page in enumerate(pdf.pages):
+            for page_num, page in iterar_paginas(pdf, memoria_maxima_mb, memoria):
                 text = page.extract_text() or ""
+                coincidencias = ESCANER_PDF.buscar(text)
                 
                 # Buscar CU (Costo Unitario)
-                # Patrones comunes: "CU: $XXX,XX" o "Costo Unitario $XXX.XX"
                 if not cu_base:
-                    patrones_cu = [
-                        r'(?:CU|costo\s*unitario)[:\s]*\$?\s*([\d.,]+)',
-                        r'([\d.,]+)\s*\$/kWh',
-                        r'nivel\s*(?:de\s*)?tensi[oó]n\s*1[^0-9]*([\d.,]+)',
-                    ]
-                    
-                    for patron in patrones_cu:
-                        match = re.search(patron, text, re.IGNORECASE)
+                    for nombre in PATRONES_CU:
+                        match = primera(coincidencias, nombre)
                         if match:
                             valor = extraer_numero(match.group(1))
                             if 500 < valor < 2000:  # Rango razonable
@@ -244,7 +315,7 @@ def extraer_tarifas_de_pdf(pdf_path: str) -> Dict[str, Any]:
                                 break
                 
                 # Extraer tablas
-                tables = page.extract_tables()
+                tables = extraer_tablas(page, extractor, text, recortar)
                 
                 for table in tables:
                     if not table or len(table) < 2:
@@ -255,8 +326,9 @@ def extraer_tarifas_de_pdf(pdf_path: str) -> Dict[str, Any]:
                     header_text = ' '.join(headers)
                     
                     # Buscar tablas con datos de estratos o tarifas
-                    if any(kw in header_text for kw in ['estrato', 'kwh', 'tarifa', 'cargo', 'nivel']):
+                    if ENCABEZADOS_TARIFA.contiene(header_text):
                         print(f"  Tabla de tarifas encontrada en página {page_num + 1}", file=sys.stderr)
+                        columnas = cache_columnas.tabla(headers, page)
                         
                         for row in table[1:]:
                             if not row or len(row) < 2:
@@ -285,45 +357,45 @@ def extraer_tarifas_de_pdf(pdf_path: str) -> Dict[str, Any]:
                                         valores.append(val)
                                 
                                 if valores:
-                                    # Intentar identificar cargo fijo vs tarifa por consumo
-                                    tarifa = next((v for v in valores if 100 < v < 2000), valores[0])
-                                    cargo_fijo = next((v for v in valores if 3000 < v < 50000), 0)
+                                    mapeados = columnas.valores(row, extraer_numero)
+                                    if mapeados:
+                                        tarifa, cargo_fijo = mapeados
+                                    else:
+                                        # Intentar identificar cargo fijo vs tarifa por consumo
+                                        tarifa = next((v for v in valores if 100 < v < 2000), valores[0])
+                                        cargo_fijo = next((v for v in valores if 3000 < v < 50000), 0)
+                                        columnas.observar(row, tarifa, cargo_fijo, extraer_numero)
                                     
-                                    tarifas_extraidas.append({
-                                        "estrato": estrato,
-                                        "tarifa": tarifa,
-                                        "cargoFijo": cargo_fijo
-                                    })
-                                    print(f"    Tarifa: Estrato {estrato} = ${tarifa}/kWh, Cargo fijo: ${cargo_fijo}", file=sys.stderr)
+                                    # Si el estrato se repite en otra tabla vale el primero
+                                    registro = Tarifa(estrato, tarifa, cargo_fijo)
+                                    if tarifas_extraidas.agregar(registro):
+                                        emisor.tarifa(registro, 'pdf')
+                                        print(f"    Tarifa: Estrato {estrato} = ${tarifa}/kWh, Cargo fijo: ${cargo_fijo}", file=sys.stderr)
+                        
+                        columnas.cerrar()
                 
                 # Buscar componentes de tarifa en el texto
-                componentes_patron = [
-                    (r'generaci[oó]n[:\s]*([\d.,]+)', 'Generación'),
-                    (r'transmisi[oó]n[:\s]*([\d.,]+)', 'Transmisión'),
-                    (r'distribuci[oó]n[:\s]*([\d.,]+)', 'Distribución'),
-                    (r'comercializaci[oó]n[:\s]*([\d.,]+)', 'Comercialización'),
-                    (r'p[eé]rdidas[:\s]*([\d.,]+)', 'Pérdidas'),
-                    (r'restricciones[:\s]*([\d.,]+)', 'Restricciones'),
-                ]
-                
-                for patron, nombre in componentes_patron:
+                for nombre in COMPONENTES_PDF:
                     if nombre not in componentes:
-                        match = re.search(patron, text, re.IGNORECASE)
+                        match = primera(coincidencias, nombre)
                         if match:
                             valor = extraer_numero(match.group(1))
                             if 10 < valor < 500:
                                 componentes[nombre] = valor
+                                emisor.componente(nombre, valor, 'pdf')
         
         # Limpiar archivo temporal
-        try:
-            os.unlink(pdf_path)
-        except:
-            pass
+        if eliminar:
+            try:
+                os.unlink(pdf_path)
+            except:
+                pass
         
         return {
             "cu_base": cu_base,
-            "tarifas": tarifas_extraidas,
-            "componentes": componentes
+            "tarifas": tarifas_extraidas.a_lista(),
+            "componentes": componentes,
+            "memoria": memoria
         }
         
     except Exception as e:
@@ -339,7 +411,7 @@ def calcular_tarifas_por_estrato(cu_base: float, subsidios: Dict[str, float]) ->
     Usa subsidios extraídos de la página, o fallback a regulación CREG.
     Subsidios para estratos 1-3, contribución del 20% para estratos 5-6.
     """
-    tarifas = []
+    tarifas = RegistrosPorEstrato()
     
     # Estratos residenciales
     for estrato in ['1', '2', '3', '4', '5', '6']:
@@ -362,34 +434,66 @@ def calcular_tarifas_por_estrato(cu_base: float, subsidios: Dict[str, float]) ->
             factor = 1 + (subsidio_porcentaje / 100)  # subsidio es negativo
             tarifa_final = cu_base * factor
         
-        tarifas.append({
-            "estrato": estrato,
-            "tarifa": round(tarifa_final, 2),
-            "cargoFijo": 0,  # Se extraerá del PDF si está disponible
-            "subsidio": subsidio_porcentaje,
-            "fuente_subsidio": "extraído" if estrato in subsidios else "CREG"
-        })
+        tarifas.agregar(Tarifa(
+            estrato=estrato,
+            tarifa=round(tarifa_final, 2),
+            cargoFijo=0,  # Se extraerá del PDF si está disponible
+            subsidio=subsidio_porcentaje,
+            fuente_subsidio="extraído" if estrato in subsidios else "CREG"
+        ))
     
     # Comercial e Industrial (con contribución del 20%)
     for tipo in ['Comercial', 'Industrial']:
         contribucion = SUBSIDIOS_CREG_ELECTRICIDAD.get(tipo, 20)
-        tarifas.append({
-            "estrato": tipo,
-            "tarifa": round(cu_base * (1 + contribucion / 100), 2),
-            "cargoFijo": 0,
-            "subsidio": contribucion,
-            "fuente_subsidio": "CREG"
-        })
+        tarifas.agregar(Tarifa(
+            estrato=tipo,
+            tarifa=round(cu_base * (1 + contribucion / 100), 2),
+            cargoFijo=0,
+            subsidio=contribucion,
+            fuente_subsidio="CREG"
+        ))
     
-    return tarifas
+    return tarifas.a_lista()
+
+
+def huella_pagina(soup: BeautifulSoup, pdf_info: Optional[Dict[str, Any]],
+                  subsidios: Optional[Dict[str, float]] = None, cu_base: Optional[float] = None) -> str:
+    """
+    Huella del boletín seleccionado y del CU/subsidios publicados en la página.
+    """
+    if subsidios is None:
+        subsidios = extraer_subsidios_de_pagina(soup)
+    if cu_base is None:
+        cu_base = extraer_cu_de_pagina(soup)
+    return calcular_huella(pdf_info, {"cu": cu_base, "subsidios": subsidios})
+
+
+def sondear_afinia(descargas: Optional[Descargas] = None) -> Dict[str, Any]:
+    """
+    Sondeo rápido: solo la página de tarifas, sin descargar ni parsear el PDF.
+    """
+    inicio = time.perf_counter()
+    soup = BeautifulSoup(obtener_pagina_tarifas(TIMEOUT_SONDEO, descargas=descargas), 'lxml')
+    pdf_info = encontrar_pdf_mas_reciente(soup)
+    return evaluar_sondeo("afinia", huella_pagina(soup, pdf_info), pdf_info, inicio)
 
 
-def scrape_afinia() -> Dict[str, Any]:
+def scrape_afinia(checkpoint: Optional[CheckpointScrape] = None,
+                  perfil: Optional[PerfilScrape] = None,
+                  emisor: Optional[EmisorRegistros] = None,
+                  presupuesto: Optional[Presupuesto] = None,
+                  descargas: Optional[Descargas] = None) -> Dict[str, Any]:
     """
     Scraper autónomo para Afinia Montería.
     Extrae tarifas reales desde la página oficial.
+    Con un checkpoint activo, las etapas ya completadas se cargan del disco.
     """
     print("=== Iniciando scraper autónomo de Afinia ===", file=sys.stderr)
+    checkpoint = checkpoint or CheckpointScrape()
+    perfil = perfil or PerfilScrape()
+    emisor = emisor or EmisorRegistros()
+    presupuesto = presupuesto or Presupuesto()
+    descargas = descargas or Descargas()
     
     resultado = {
         "url": TARIFAS_URL,
@@ -405,23 +509,30 @@ def scrape_afinia() -> Dict[str, Any]:
     
     try:
         # Paso 1: Obtener página de tarifas
+        perfil.paso("Paso 1")
         print("Paso 1: Accediendo a página de tarifas...", file=sys.stderr)
-        response = requests.get(TARIFAS_URL, headers=HEADERS, timeout=30)
-        response.raise_for_status()
+        html = checkpoint.etapa('pagina', 'html', obtener_pagina_tarifas,
+                                presupuesto=presupuesto, descargas=descargas)
         
-        soup = BeautifulSoup(response.content, 'lxml')
+        soup = BeautifulSoup(html, 'lxml')
         
         # Paso 2: Extraer subsidios de la página
+        perfil.paso("Paso 2")
         print("Paso 2: Extrayendo subsidios de la página...", file=sys.stderr)
         subsidios = extraer_subsidios_de_pagina(soup)
+        for estrato, porcentaje in subsidios.items():
+            emisor.subsidio(Subsidio(estrato, porcentaje), 'pagina')
         
         # Paso 3: Intentar extraer CU de la página
+        perfil.paso("Paso 3")
         print("Paso 3: Buscando CU en la página...", file=sys.stderr)
         cu_base = extraer_cu_de_pagina(soup)
         
         # Paso 4: Buscar y descargar PDF más reciente
+        perfil.paso("Paso 4")
         print("Paso 4: Buscando PDF de tarifas más reciente...", file=sys.stderr)
-        pdf_info = encontrar_pdf_mas_reciente(soup)
+        pdf_info = checkpoint.etapa('pdf_info', 'json', encontrar_pdf_mas_reciente, soup)
+        resultado["huella_pagina"] = huella_pagina(soup, pdf_info, subsidios, cu_base)
         
         datos_pdf = {"cu_base": None, "tarifas": [], "componentes": {}}
         
@@ -430,12 +541,29 @@ def scrape_afinia() -> Dict[str, Any]:
             resultado["mes_tarifa"] = pdf_info.get('mes', 'desconocido')
             
             # Paso 5: Descargar y parsear PDF
+            perfil.paso("Paso 5")
             print("Paso 5: Descargando PDF...", file=sys.stderr)
-            pdf_path = descargar_pdf(pdf_info['url'])
+            pdf_path = checkpoint.etapa('pdf', 'archivo', descargar_pdf, pdf_info['url'], presupuesto, descargas)
             
             if pdf_path:
+                perfil.paso("Paso 6")
                 print("Paso 6: Extrayendo tarifas del PDF...", file=sys.stderr)
-                datos_pdf = extraer_tarifas_de_pdf(pdf_path)
+                reanudada = checkpoint.completada('extraccion_pdf')
+                # En un proceso hijo que se mata si vence el plazo (queda lo parcial)
+                datos_pdf = checkpoint.etapa('extraccion_pdf', 'json', ejecutar_en_proceso,
+                                             'extraccion_pdf', presupuesto, emisor, extraer_tarifas_de_pdf,
+                                             pdf_path, eliminar=not checkpoint.activo,
+                                             # Explícitos: el hijo no hereda la configuración del módulo
+                                             extractor=EXTRACTOR_TABLAS, recortar=RECORTAR_TABLAS,
+                                             memoria_maxima_mb=MEMORIA_MAXIMA_MB, cache_columnas=CACHE_COLUMNAS)
+                if reanudada:
+                    emisor.extraccion(datos_pdf, 'pdf')
+                if datos_pdf.get("parcial") and not checkpoint.activo:
+                    # El hijo se detuvo antes de borrar el temporal
+                    try:
+                        os.unlink(pdf_path)
+                    except OSError:
+                        pass
         
         # Usar CU del PDF si no se encontró en la página
         if not cu_base and datos_pdf.get('cu_base'):
@@ -443,23 +571,29 @@ def scrape_afinia() -> Dict[str, Any]:
         
         # Paso 7: Calcular tarifas finales
         if cu_base and subsidios:
+            perfil.paso("Paso 7")
             print(f"Paso 7: Calculando tarifas (CU base: ${cu_base}/kWh)...", file=sys.stderr)
             resultado["tarifas"] = calcular_tarifas_por_estrato(cu_base, subsidios)
+            for tarifa in resultado["tarifas"]:
+                emisor.tarifa(tarifa, 'calculado')
             resultado["cu_base"] = cu_base
         elif datos_pdf.get('tarifas'):
             # Usar tarifas extraídas directamente del PDF
             resultado["tarifas"] = datos_pdf['tarifas']
         
+        if datos_pdf.get('memoria'):
+            resultado["memoria_pdf"] = datos_pdf['memoria']
+        
         # Agregar componentes si se extrajeron
         if datos_pdf.get('componentes'):
             resultado["componentes"] = datos_pdf['componentes']
         
         # Agregar subsidios
         for estrato, porcentaje in subsidios.items():
-            resultado["subsidios"].append({
-                "estrato": estrato,
-                "porcentaje": porcentaje
-            })
+            resultado["subsidios"].append(a_dict(Subsidio(estrato, porcentaje)))
+        
+        if presupuesto.excedidos:
+            resultado["plazos_excedidos"] = presupuesto.excedidos
         
         # Verificar que obtuvimos datos
         if not resultado["tarifas"]:
@@ -481,9 +615,62 @@ def scrape_afinia() -> Dict[str, Any]:
         
         resultado["error"] = str(e)
         resultado["sugerencia"] = "Verificar conectividad y que la URL sea accesible: " + TARIFAS_URL
+        if presupuesto.excedidos:
+            resultado["plazos_excedidos"] = presupuesto.excedidos
         return resultado
 
 
 if __name__ == "__main__":
-    resultado = scrape_afinia()
-    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    parser = argparse.ArgumentParser(description="Scraper de tarifas de Afinia")
+    agregar_argumentos(parser)
+    perfil_scrape.agregar_argumentos(parser)
+    salida_tarifas.agregar_argumentos(parser)
+    sondeo_tarifas.agregar_argumentos(parser)
+    extraccion_tablas.agregar_argumentos(parser, EXTRACTOR_TABLAS)
+    paginas_pdf.agregar_argumentos(parser)
+    plazos_scrape.agregar_argumentos(parser)
+    archivo_artefactos.agregar_argumentos(parser)
+    peticiones_respaldo.agregar_argumentos(parser)
+    mapeo_columnas.agregar_argumentos(parser)
+    ejecucion_compartida.agregar_argumentos(parser)
+    resultado_vigente.agregar_argumentos(parser)
+    circuito_hosts.agregar_argumentos(parser)
+    args = parser.parse_args()
+    EXTRACTOR_TABLAS = args.extractor_tablas
+    RECORTAR_TABLAS = not args.sin_recorte_tablas
+    MEMORIA_MAXIMA_MB = args.memoria_maxima_mb
+    CACHE_COLUMNAS = columnas_desde_argumentos(args, "afinia")
+    circuito = circuito_desde_argumentos(args)
+    
+    if args.sondeo:
+        sys.exit(sondeo_tarifas.ejecutar_sondeo("afinia", lambda: sondear_afinia(Descargas(circuito=circuito))))
+    
+    compartida = compartida_desde_argumentos(args, "afinia")
+    vigente = vigente_desde_argumentos(args, "afinia", compartida)
+    resultado = vigente.servir() or compartida.resultado_en_curso()
+    if resultado is not None:
+        escribir_resultado(vigente.respaldo(resultado), args.format)
+        sys.exit(0)
+    
+    checkpoint = checkpoint_desde_argumentos(args, "afinia")
+    perfil = perfil_desde_argumentos(args, "afinia", checkpoint)
+    emisor = emisor_desde_argumentos(args, "afinia")
+    presupuesto = presupuesto_desde_argumentos(args)
+    archivo = archivo_desde_argumentos(args, "afinia")
+    respaldo = respaldo_desde_argumentos(args)
+    descargas = Descargas(archivo, respaldo, circuito)
+    resultado = scrape_afinia(checkpoint, perfil, emisor, presupuesto, descargas)
+    perfil.finalizar()
+    checkpoint.finalizar(resultado)
+    archivo.finalizar(resultado)
+    if respaldo:
+        respaldo.finalizar()
+    if resultado.get("plazos_excedidos"):
+        # Resultado parcial: no reemplaza el último bueno ni se comparte
+        compartida.soltar()
+    else:
+        guardar_snapshot_resultado(resultado)
+        actualizar_tendencia_tarifas(resultado)
+        guardar_huella_resultado(resultado)
+        compartida.publicar(resultado)
+    escribir_resultado(vigente.respaldo(resultado), args.format)
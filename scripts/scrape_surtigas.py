@@ -7,7 +7,11 @@ Este scraper:
 2. Extrae las tarifas vigentes dinámicamente
 3. NO tiene valores hardcodeados - todo se extrae de la fuente
 
-Usa Selenium porque la página bloquea requests directos.
+Primero intenta la ruta del PDF de tarifas: lo localiza sin navegador (la
+página con requests, o el último PDF descubierto si es reciente), lo
+descarga y extrae sus tablas como Afinia y Veolia. Solo si el PDF no es
+accesible o no trae tarifas se abre Chrome con Selenium, porque la página
+bloquea requests directos.
 """
 
 import sys
@@ -15,10 +19,16 @@ import json
 import re
 import os
 import time
-from datetime import datetime
-from typing import Dict, Any, List, Optional
+import tempfile
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urljoin
 
 try:
+    import requests
+    from bs4 import BeautifulSoup
+    import pdfplumber
     from selenium import webdriver
     from selenium.webdriver.chrome.service import Service
     from selenium.webdriver.chrome.options import Options
@@ -28,14 +38,70 @@ try:
     from webdriver_manager.chrome import ChromeDriverManager
 except ImportError as e:
     print(json.dumps({
-        "error": f"Dependencias faltantes: {str(e)}. Ejecuta: pip install selenium webdriver-manager"
+        "error": f"Dependencias faltantes: {str(e)}. Ejecuta: pip install requests beautifulsoup4 pdfplumber lxml selenium webdriver-manager"
     }), file=sys.stderr)
     sys.exit(1)
 
+from snapshot_tarifas import abrir_snapshot, guardar_snapshot_resultado
+from resumenes_dashboard import actualizar_tendencia_tarifas
+from checkpoint_scrape import CheckpointScrape, agregar_argumentos, checkpoint_desde_argumentos
+import perfil_scrape
+from perfil_scrape import PerfilScrape, perfil_desde_argumentos
+import salida_tarifas
+from salida_tarifas import EmisorRegistros, emisor_desde_argumentos, escribir_resultado
+from modelo_tarifas import RegistrosPorEstrato, Subsidio, Tarifa, a_dict
+import plazos_scrape
+import archivo_artefactos
+from archivo_artefactos import archivo_desde_argumentos
+import peticiones_respaldo
+from peticiones_respaldo import respaldo_desde_argumentos
+import mapeo_columnas
+from mapeo_columnas import CacheColumnas, columnas_desde_argumentos
+import ejecucion_compartida
+from ejecucion_compartida import compartida_desde_argumentos
+import resultado_vigente
+from resultado_vigente import vigente_desde_argumentos
+import circuito_hosts
+from circuito_hosts import circuito_desde_argumentos
+from escaneo_texto import HUECO, VALOR, Escaner, Patron, palabras_clave, primera
+from plazos_scrape import Descargas, Presupuesto, descargar, ejecutar_en_proceso, presupuesto_desde_argumentos
+import extraccion_tablas
+from extraccion_tablas import extraer_tablas
+import paginas_pdf
+from paginas_pdf import iterar_paginas
+
 
 # Configuración
+BASE_URL = "https://www.surtigas.com.co"
 TARIFAS_URL = "https://www.surtigas.com.co/informacion-tarifaria"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'es-CO,es;q=0.9',
+}
 TIMEOUT = 30
+EXTRACTOR_TABLAS = 'pdfplumber'  # o 'rapido' (ver extraccion_tablas.py)
+RECORTAR_TABLAS = True  # buscar tablas solo en la región de las palabras ancla
+MEMORIA_MAXIMA_MB = None  # techo de RSS al leer el PDF (None = sin límite)
+CACHE_COLUMNAS = CacheColumnas()  # mapeos de columnas aprendidos (ver mapeo_columnas.py)
+USAR_PDF = True  # intentar la ruta del PDF antes de abrir el navegador
+USAR_NAVEGADOR = True  # False al reprocesar lo archivado (ver archivo_artefactos.py)
+# Perfil liviano de Chrome (--bloquear-recursos): sin imágenes, fuentes, hojas de
+# estilo ni rastreadores, ventana chica y carga 'eager'. Sin CSS puede cambiar lo
+# que devuelve .text, así que queda opcional hasta compararlo con la ruta del PDF
+# en el sitio real; por defecto se usa el perfil completo de siempre.
+BLOQUEAR_RECURSOS = False
+URLS_BLOQUEADAS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*clarity.ms*",
+]
+# Días que se reutiliza el último PDF descubierto cuando la página no responde a requests;
+# pasado ese plazo se abre el navegador para descubrir si hay un boletín nuevo
+REUSO_PDF_CONOCIDO_DIAS = 7
 
 # Subsidios oficiales CREG para Gas Natural (fallback si no se extraen de la página)
 # Según regulación CREG - Resolución 105_5 de 2022
@@ -78,34 +144,109 @@ def extraer_numero(texto: str) -> float:
         return 0.0
 
 
+def clasificar_categoria(texto: str) -> Optional[str]:
+    """
+    Estrato o categoría de una fila de tarifas ('1'..'6', Residencial,
+    Comercial, Industrial, GNV); None si la fila no es de tarifas.
+    """
+    texto = texto.strip().lower()
+    if re.match(r'^estrato\s*\d', texto):
+        match = re.search(r'(\d)', texto)
+        if match:
+            return match.group(1)
+    elif re.match(r'^\d$', texto[:1] if texto else ''):
+        return texto[:1]
+    elif 'residencial' in texto:
+        return 'Residencial'
+    elif 'comercial' in texto:
+        return 'Comercial'
+    elif 'industrial' in texto:
+        return 'Industrial'
+    elif 'gnv' in texto:
+        return 'GNV'
+    return None
+
+
+def identificar_valores(valores: List[float]) -> Tuple[float, float]:
+    """Separa (tarifa $/m³, cargo fijo) de los valores de una fila sin encabezados claros."""
+    tarifa = next((v for v in valores if 500 < v < 10000), valores[0] if valores else 0)
+    cargo_fijo = next((v for v in valores if 3000 < v < 100000 and v != tarifa), 0)
+    return tarifa, cargo_fijo
+
+
+# Subsidios, componentes y tarifas del texto (PDF o página) en una sola pasada (ver escaneo_texto.py)
+PATRONES_SUBSIDIO = ('subsidio_estrato', 'estrato_porcentaje', 'estrato_subsidio')
+COMPONENTES_TEXTO = ('Costo_gas_natural', 'Cargo_distribución', 'Cargo_comercialización', 'Cargo_transporte')
+PATRONES_TARIFA_TEXTO = ('estrato_m3', 'residencial', 'estrato_pesos')
+ESCANER_TEXTO = Escaner([
+    Patron('subsidio_estrato', ('estrato',), rf'estrato\s*(\d){HUECO}subsidio{HUECO}{VALOR}\s*%'),
+    Patron('estrato_porcentaje', ('estrato',), rf'estrato\s*(\d){HUECO}{VALOR}\s*%\s*(?:subsidio|descuento)'),
+    Patron('estrato_subsidio', ('subsidio',), rf'subsidio{HUECO}estrato\s*(\d){HUECO}{VALOR}\s*%'),
+    Patron('Costo_gas_natural', ('costo',), r'costo\s*gas\s*natural[:\s]*([\d.,]+)'),
+    Patron('Cargo_distribución', ('cargo',), r'cargo\s*distribuci[oó]n[:\s]*([\d.,]+)'),
+    Patron('Cargo_comercialización', ('cargo',), r'cargo\s*comercializaci[oó]n[:\s]*([\d.,]+)'),
+    Patron('Cargo_transporte', ('cargo',), r'cargo\s*transporte[:\s]*([\d.,]+)'),
+    # "Estrato 1: $X.XXX/m³"
+    Patron('estrato_m3', ('estrato',), r'estrato\s*(\d)[:\s]*\$?([\d.,]+)\s*/?\s*m[³3]'),
+    Patron('residencial', ('residencial',), r'residencial\s*(\d)[:\s]*\$?([\d.,]+)'),
+    Patron('estrato_pesos', ('estrato',), rf'estrato\s*(\d){HUECO}{VALOR}\s*pesos'),
+])
+ENCABEZADOS_TARIFA = palabras_clave(['estrato', 'categor', 'uso', 'cargo', 'tarifa', 'm3', 'm³', 'consumo'])
+
+
+def subsidios_de_texto(texto: str, coincidencias: Optional[Dict[str, List]] = None) -> Dict[str, float]:
+    """
+    Busca patrones como "Estrato 1: subsidio 60%" en un texto (página o PDF).
+    coincidencias es ESCANER_TEXTO.buscar(texto), si ya se calculó.
+    """
+    subsidios_extraidos = {}
+    if coincidencias is None:
+        coincidencias = ESCANER_TEXTO.buscar(texto)
+    
+    for nombre in PATRONES_SUBSIDIO:
+        for match in coincidencias[nombre]:
+            estrato, porcentaje = match.groups()
+            if estrato in ['1', '2', '3']:
+                valor = extraer_numero(porcentaje)
+                if 0 < valor <= 70:  # Rango válido de subsidio
+                    subsidios_extraidos[estrato] = -valor
+                    print(f"  Subsidio extraído: Estrato {estrato} = -{valor}%", file=sys.stderr)
+    
+    return subsidios_extraidos
+
+
+def componentes_de_texto(texto: str, emisor: EmisorRegistros, fuente: str,
+                         coincidencias: Optional[Dict[str, List]] = None) -> Dict[str, float]:
+    """
+    Busca los componentes de la tarifa (costo del gas, distribución...) en un texto.
+    coincidencias es ESCANER_TEXTO.buscar(texto), si ya se calculó.
+    """
+    componentes = {}
+    if coincidencias is None:
+        coincidencias = ESCANER_TEXTO.buscar(texto)
+    
+    for nombre in COMPONENTES_TEXTO:
+        match = primera(coincidencias, nombre)
+        if match:
+            valor = extraer_numero(match.group(1))
+            if 50 < valor < 5000:
+                componentes[nombre] = valor
+                emisor.componente(nombre, valor, fuente)
+                print(f"  Componente: {nombre} = ${valor}", file=sys.stderr)
+    
+    return componentes
+
+
 def extraer_subsidios_de_pagina(driver) -> Optional[Dict[str, float]]:
     """
     Intenta extraer los porcentajes de subsidio reales de la página de Surtigas.
     Busca patrones como "Estrato 1: 60%" o tablas con información de subsidios.
     Si no encuentra, retorna None para usar los valores CREG como fallback.
     """
-    subsidios_extraidos = {}
-    
     try:
         # Buscar en el texto de la página
         body = driver.find_element(By.TAG_NAME, "body")
-        texto = body.text.lower()
-        
-        # Patrones para buscar subsidios
-        patrones = [
-            r'estrato\s*(\d)[^0-9]*subsidio[^0-9]*([\d.,]+)\s*%',
-            r'estrato\s*(\d)[^0-9]*([\d.,]+)\s*%\s*(?:subsidio|descuento)',
-            r'subsidio[^0-9]*estrato\s*(\d)[^0-9]*([\d.,]+)\s*%',
-        ]
-        
-        for patron in patrones:
-            matches = re.findall(patron, texto)
-            for estrato, porcentaje in matches:
-                if estrato in ['1', '2', '3']:
-                    valor = extraer_numero(porcentaje)
-                    if 0 < valor <= 70:  # Rango válido de subsidio
-                        subsidios_extraidos[estrato] = -valor
-                        print(f"  Subsidio extraído de página: Estrato {estrato} = -{valor}%", file=sys.stderr)
+        subsidios_extraidos = subsidios_de_texto(body.text)
         
         # Buscar en tablas
         tablas = driver.find_elements(By.TAG_NAME, "table")
@@ -146,15 +287,35 @@ def obtener_subsidio(estrato: str, subsidios_extraidos: Optional[Dict] = None) -
 
 
 def crear_driver() -> webdriver.Chrome:
-    """Crea y configura el driver de Chrome."""
+    """
+    Crea y configura el driver de Chrome. Con BLOQUEAR_RECURSOS las imágenes
+    se desactivan por preferencias y el resto de URLS_BLOQUEADAS (fuentes,
+    hojas de estilo, rastreadores) se corta con Network.setBlockedURLs de CDP.
+    """
     chrome_options = Options()
-    chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
     chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
     
+    if BLOQUEAR_RECURSOS:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1280,800")
+        # Sin servicios de fondo que arrancan con el navegador y no aportan a una sola página
+        for argumento in ("--disable-extensions", "--disable-background-networking", "--disable-sync",
+                          "--disable-default-apps", "--disable-component-update", "--no-first-run",
+                          "--mute-audio", "--disable-features=Translate,MediaRouter,OptimizationHints"):
+            chrome_options.add_argument(argumento)
+        chrome_options.add_experimental_option('prefs', {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+        # driver.get retorna con el DOM listo; las tablas se esperan con WebDriverWait
+        chrome_options.page_load_strategy = 'eager'
+    else:
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--window-size=1920,1080")
+    
     # Suprimir logs de webdriver
     chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
     
@@ -162,19 +323,74 @@ def crear_driver() -> webdriver.Chrome:
         service = Service(ChromeDriverManager().install())
         driver = webdriver.Chrome(service=service, options=chrome_options)
         driver.set_page_load_timeout(TIMEOUT)
+        if BLOQUEAR_RECURSOS:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {"urls": URLS_BLOQUEADAS})
         return driver
     except Exception as e:
         print(f"Error creando driver: {str(e)}", file=sys.stderr)
         raise
 
 
-def extraer_tarifas_de_tabla(driver: webdriver.Chrome, subsidios_extraidos: Optional[Dict] = None) -> List[Dict]:
+def memoria_navegador_mb(driver: webdriver.Chrome) -> Optional[float]:
+    """RSS de chromedriver y todos los procesos de Chrome que cuelgan de él (solo Linux)."""
+    try:
+        raiz = driver.service.process.pid
+        hijos: Dict[int, List[int]] = {}
+        for nombre in os.listdir('/proc'):
+            if not nombre.isdigit():
+                continue
+            try:
+                with open(f'/proc/{nombre}/stat', 'r') as f:
+                    # El nombre del proceso va entre paréntesis y puede tener espacios
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            hijos.setdefault(ppid, []).append(int(nombre))
+        
+        total = 0
+        pendientes = [raiz]
+        while pendientes:
+            pid = pendientes.pop()
+            pendientes.extend(hijos.get(pid, []))
+            try:
+                with open(f'/proc/{pid}/statm', 'r') as f:
+                    total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+            except (OSError, ValueError, IndexError):
+                continue
+        return round(total / 2**20, 1)
+    except Exception:
+        return None
+
+
+def trafico_pagina(driver: webdriver.Chrome) -> Dict[str, Any]:
+    """
+    Recursos cargados y bytes transferidos según la Resource Timing API. Los
+    recursos de otros dominios sin Timing-Allow-Origin reportan 0 bytes, así
+    que el total es una cota inferior.
+    """
+    try:
+        return driver.execute_script("""
+            const entradas = performance.getEntriesByType('navigation')
+                .concat(performance.getEntriesByType('resource'));
+            return {
+                recursos: entradas.length,
+                bytes_transferidos: entradas.reduce((total, e) => total + (e.transferSize || 0), 0),
+            };
+        """) or {}
+    except Exception:
+        return {}
+
+
+def extraer_tarifas_de_tabla(driver: webdriver.Chrome, subsidios_extraidos: Optional[Dict] = None,
+                             emisor: Optional[EmisorRegistros] = None) -> List[Dict]:
     """
     Extrae tarifas de las tablas en la página.
     Busca tablas con información de estratos y tarifas.
     Usa subsidios extraídos o fallback a CREG.
     """
-    tarifas = []
+    emisor = emisor or EmisorRegistros()
+    tarifas = RegistrosPorEstrato()
     
     try:
         # Esperar a que la página cargue
@@ -197,24 +413,8 @@ def extraer_tarifas_de_tabla(driver: webdriver.Chrome, subsidios_extraidos: Opti
                         celdas = fila.find_elements(By.TAG_NAME, "th")
                     
                     if len(celdas) >= 2:
-                        primera_celda = celdas[0].text.strip().lower()
-                        
                         # Buscar filas con estratos
-                        estrato = None
-                        if re.match(r'^estrato\s*\d', primera_celda):
-                            match = re.search(r'(\d)', primera_celda)
-                            if match:
-                                estrato = match.group(1)
-                        elif re.match(r'^\d$', primera_celda[:1] if primera_celda else ''):
-                            estrato = primera_celda[:1]
-                        elif 'residencial' in primera_celda:
-                            estrato = 'Residencial'
-                        elif 'comercial' in primera_celda:
-                            estrato = 'Comercial'
-                        elif 'industrial' in primera_celda:
-                            estrato = 'Industrial'
-                        elif 'gnv' in primera_celda:
-                            estrato = 'GNV'
+                        estrato = clasificar_categoria(celdas[0].text)
                         
                         if estrato:
                             # Extraer valores de las demás celdas
@@ -226,22 +426,16 @@ def extraer_tarifas_de_tabla(driver: webdriver.Chrome, subsidios_extraidos: Opti
                             
                             if valores:
                                 # Identificar tarifa ($/m³) y cargo fijo
-                                tarifa = next((v for v in valores if 500 < v < 10000), valores[0] if valores else 0)
-                                cargo_fijo = next((v for v in valores if 3000 < v < 100000 and v != tarifa), 0)
+                                tarifa, cargo_fijo = identificar_valores(valores)
                                 
                                 # Obtener subsidio (extraído o CREG)
                                 subsidio = obtener_subsidio(estrato, subsidios_extraidos)
                                 
-                                tarifa_data = {
-                                    "estrato": estrato,
-                                    "tarifa": tarifa,
-                                    "cargoFijo": cargo_fijo,
-                                    "subsidio": subsidio
-                                }
+                                tarifa_data = Tarifa(estrato, tarifa, cargo_fijo, subsidio)
                                 
                                 # Evitar duplicados
-                                if not any(t['estrato'] == estrato for t in tarifas):
-                                    tarifas.append(tarifa_data)
+                                if tarifas.agregar(tarifa_data):
+                                    emisor.tarifa(tarifa_data, 'tabla')
                                     print(f"  Tarifa extraída: Estrato {estrato} = ${tarifa}/m³, Cargo fijo: ${cargo_fijo}", file=sys.stderr)
             
             except Exception as e:
@@ -251,16 +445,18 @@ def extraer_tarifas_de_tabla(driver: webdriver.Chrome, subsidios_extraidos: Opti
     except Exception as e:
         print(f"Error buscando tablas: {str(e)}", file=sys.stderr)
     
-    return tarifas
+    return tarifas.a_lista()
 
 
-def extraer_tarifas_de_texto(driver: webdriver.Chrome, subsidios_extraidos: Optional[Dict] = None) -> List[Dict]:
+def extraer_tarifas_de_texto(driver: webdriver.Chrome, subsidios_extraidos: Optional[Dict] = None,
+                             emisor: Optional[EmisorRegistros] = None) -> List[Dict]:
     """
     Extrae tarifas del texto de la página si no hay tablas claras.
     Busca patrones como "Estrato 1: $X.XXX/m³"
     Usa subsidios extraídos o fallback a CREG.
     """
-    tarifas = []
+    emisor = emisor or EmisorRegistros()
+    tarifas = RegistrosPorEstrato()
     
     try:
         # Obtener todo el texto de la página
@@ -269,32 +465,23 @@ def extraer_tarifas_de_texto(driver: webdriver.Chrome, subsidios_extraidos: Opti
         
         # Buscar patrones de tarifas
         # Patrón: Estrato X ... $XXX.XXX o XXX,XX
-        patrones = [
-            r'estrato\s*(\d)[:\s]*\$?([\d.,]+)\s*/?\s*m[³3]',
-            r'residencial\s*(\d)[:\s]*\$?([\d.,]+)',
-            r'estrato\s*(\d)[^0-9]*([\d.,]+)\s*pesos',
-        ]
-        
-        for patron in patrones:
-            matches = re.findall(patron, texto.lower())
-            for estrato, valor in matches:
+        coincidencias = ESCANER_TEXTO.buscar(texto)
+        for nombre in PATRONES_TARIFA_TEXTO:
+            for match in coincidencias[nombre]:
+                estrato, valor = match.groups()
                 tarifa = extraer_numero(valor)
-                if 500 < tarifa < 10000 and not any(t['estrato'] == estrato for t in tarifas):
+                if 500 < tarifa < 10000 and estrato not in tarifas:
                     # Obtener subsidio (extraído o CREG)
                     subsidio = obtener_subsidio(estrato, subsidios_extraidos)
                     
-                    tarifas.append({
-                        "estrato": estrato,
-                        "tarifa": tarifa,
-                        "cargoFijo": 0,
-                        "subsidio": subsidio
-                    })
+                    tarifas.agregar(Tarifa(estrato, tarifa, 0, subsidio))
+                    emisor.tarifa(tarifas.ultimo(), 'texto')
                     print(f"  Tarifa del texto: Estrato {estrato} = ${tarifa}/m³", file=sys.stderr)
         
     except Exception as e:
         print(f"Error extrayendo del texto: {str(e)}", file=sys.stderr)
     
-    return tarifas
+    return tarifas.a_lista()
 
 
 def buscar_pdf_tarifas(driver: webdriver.Chrome) -> Optional[str]:
@@ -318,29 +505,16 @@ def buscar_pdf_tarifas(driver: webdriver.Chrome) -> Optional[str]:
     return None
 
 
-def extraer_componentes(driver: webdriver.Chrome) -> Dict[str, float]:
+def extraer_componentes(driver: webdriver.Chrome, emisor: Optional[EmisorRegistros] = None) -> Dict[str, float]:
     """
     Extrae los componentes de la tarifa si están disponibles.
     """
+    emisor = emisor or EmisorRegistros()
     componentes = {}
     
     try:
         texto = driver.find_element(By.TAG_NAME, "body").text
-        
-        patrones = [
-            (r'costo\s*gas\s*natural[:\s]*([\d.,]+)', 'Costo_gas_natural'),
-            (r'cargo\s*distribuci[oó]n[:\s]*([\d.,]+)', 'Cargo_distribución'),
-            (r'cargo\s*comercializaci[oó]n[:\s]*([\d.,]+)', 'Cargo_comercialización'),
-            (r'cargo\s*transporte[:\s]*([\d.,]+)', 'Cargo_transporte'),
-        ]
-        
-        for patron, nombre in patrones:
-            match = re.search(patron, texto.lower())
-            if match:
-                valor = extraer_numero(match.group(1))
-                if 50 < valor < 5000:
-                    componentes[nombre] = valor
-                    print(f"  Componente: {nombre} = ${valor}", file=sys.stderr)
+        componentes = componentes_de_texto(texto, emisor, 'navegador')
     
     except Exception as e:
         print(f"Error extrayendo componentes: {str(e)}", file=sys.stderr)
@@ -348,63 +522,428 @@ def extraer_componentes(driver: webdriver.Chrome) -> Dict[str, float]:
     return componentes
 
 
-def scrape_surtigas() -> Dict[str, Any]:
+def buscar_pdf_en_html(soup: BeautifulSoup) -> Optional[str]:
+    """Mismo criterio que buscar_pdf_tarifas(), sobre el HTML obtenido sin navegador."""
+    for link in soup.find_all('a', href=True):
+        href = link.get('href', '')
+        texto = link.get_text().strip().lower()
+        if '.pdf' in href.lower() and ('tarifa' in texto or 'tarifa' in href.lower()):
+            return href if href.startswith('http') else urljoin(BASE_URL, href)
+    return None
+
+
+def pdf_conocido() -> Optional[Dict[str, str]]:
     """
-    Scraper autónomo para Surtigas Montería.
-    Extrae tarifas reales desde la página oficial usando Selenium.
+    Último PDF descubierto en la página en vivo, tomado de la instantánea
+    vigente. Solo se reutiliza durante REUSO_PDF_CONOCIDO_DIAS.
     """
-    print("=== Iniciando scraper autónomo de Surtigas ===", file=sys.stderr)
+    try:
+        with abrir_snapshot("surtigas") as snapshot:
+            meta = snapshot.metadatos
+    except Exception:
+        return None
     
-    resultado = {
-        "url": TARIFAS_URL,
-        "fechaExtraccion": datetime.now().isoformat(),
-        "proveedor": "Surtigas",
-        "servicio": "gas",
-        "region": "Montería",
-        "unidad": "m³",
-        "tarifas": [],
-        "subsidios": [],
-        "componentes": {}
+    url, descubierto = meta.get("pdf_url"), meta.get("pdf_descubierto")
+    if not url or not descubierto:
+        return None
+    try:
+        if datetime.now() - datetime.fromisoformat(descubierto) > timedelta(days=REUSO_PDF_CONOCIDO_DIAS):
+            print(f"  El último PDF conocido se descubrió hace más de {REUSO_PDF_CONOCIDO_DIAS} días", file=sys.stderr)
+            return None
+    except ValueError:
+        return None
+    return {"url": url, "origen": "conocido", "descubierto": descubierto}
+
+
+def localizar_pdf_tarifas(presupuesto: Optional[Presupuesto] = None,
+                          descargas: Optional[Descargas] = None) -> Optional[Dict[str, str]]:
+    """
+    Localiza el PDF de tarifas sin abrir el navegador: primero en la página
+    descargada con requests y, si la página lo bloquea, el último PDF conocido.
+    """
+    try:
+        html = descargar(TARIFAS_URL, HEADERS, presupuesto, 'pagina', TIMEOUT, descargas)
+        url = buscar_pdf_en_html(BeautifulSoup(html, 'lxml'))
+        if url:
+            print(f"PDF de tarifas encontrado sin navegador: {url}", file=sys.stderr)
+            return {"url": url, "origen": "pagina", "descubierto": datetime.now().isoformat()}
+        print("  La página no enlaza un PDF de tarifas en su HTML estático", file=sys.stderr)
+    except Exception as e:
+        print(f"  La página no respondió sin navegador: {str(e)}", file=sys.stderr)
+    
+    info = pdf_conocido()
+    if info:
+        print(f"Usando el último PDF conocido: {info['url']}", file=sys.stderr)
+    return info
+
+
+def descargar_pdf(url: str, presupuesto: Optional[Presupuesto] = None,
+                  descargas: Optional[Descargas] = None) -> Optional[str]:
+    """
+    Descarga un PDF y retorna la ruta del archivo temporal.
+    Con presupuesto, la descarga completa respeta el plazo de la etapa 'pdf'.
+    """
+    try:
+        print(f"Descargando PDF desde: {url}", file=sys.stderr)
+        contenido = descargar(url, HEADERS, presupuesto, 'pdf', 60, descargas)
+        if not contenido.startswith(b'%PDF'):
+            # Páginas de bloqueo o de error servidas con código 200
+            print("El archivo descargado no es un PDF", file=sys.stderr)
+            return None
+        
+        # Guardar en archivo temporal
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(contenido)
+        
+        print(f"PDF descargado: {len(contenido)} bytes", file=sys.stderr)
+        return path
+        
+    except Exception as e:
+        print(f"Error descargando PDF: {str(e)}", file=sys.stderr)
+        return None
+
+
+def extraer_tarifas_de_pdf(pdf_path: str, eliminar: bool = True,
+                           emisor: Optional[EmisorRegistros] = None,
+                           extractor: str = EXTRACTOR_TABLAS, recortar: bool = RECORTAR_TABLAS,
+                           memoria_maxima_mb: Optional[float] = MEMORIA_MAXIMA_MB,
+                           cache_columnas: Optional[CacheColumnas] = None) -> Dict[str, Any]:
+    """
+    Extrae las tarifas del PDF de Surtigas.
+    Busca:
+    - Cargo variable ($/m³) y cargo fijo por estrato, Comercial, Industrial y GNV
+    - Subsidios en el texto (si no, se usan los CREG)
+    - Componentes de la tarifa (costo del gas, distribución, transporte...)
+    Con eliminar=False el archivo se conserva (p. ej. si pertenece a un checkpoint).
+    Las páginas se leen de a una y se liberan al terminar (ver paginas_pdf.py).
+    Cada tarifa y componente se emite en cuanto se encuentra (--format jsonl).
+    """
+    emisor = emisor or EmisorRegistros()
+    cache_columnas = cache_columnas or CacheColumnas()
+    tarifas = RegistrosPorEstrato()
+    subsidios_extraidos = {}
+    componentes = {}
+    
+    try:
+        memoria = {}
+        with pdfplumber.open(pdf_path) as pdf:
+            print(f"PDF tiene {len(pdf.pages)} páginas", file=sys.stderr)
+            
+            for page_num, page in iterar_paginas(pdf, memoria_maxima_mb, memoria):
+                text = page.extract_text() or ""
+                
+                # Subsidios y componentes del texto antes que las tablas,
+                # así las tarifas de esta página ya usan los subsidios publicados
+                coincidencias = ESCANER_TEXTO.buscar(text)
+                for estrato, porcentaje in subsidios_de_texto(text, coincidencias).items():
+                    subsidios_extraidos.setdefault(estrato, porcentaje)
+                for nombre, valor in componentes_de_texto(text, emisor, 'pdf', coincidencias).items():
+                    componentes.setdefault(nombre, valor)
+                
+                tables = extraer_tablas(page, extractor, text, recortar)
+                
+                for table in tables:
+                    if not table or len(table) < 2:
+                        continue
+                    
+                    headers = [str(h).lower() if h else '' for h in table[0]]
+                    header_text = ' '.join(headers)
+                    if not ENCABEZADOS_TARIFA.contiene(header_text):
+                        continue
+                    print(f"Tabla de tarifas encontrada en página {page_num + 1}", file=sys.stderr)
+                    columnas = cache_columnas.tabla(headers, page)
+                    
+                    # Columnas del cargo fijo y del cargo variable por m³
+                    idx_cargo_fijo = next((i for i, h in enumerate(headers) if 'fijo' in h), -1)
+                    idx_consumo = next((i for i, h in enumerate(headers)
+                                        if 'variable' in h or 'm³' in h or 'm3' in h or 'consumo' in h), -1)
+                    
+                    for row in table[1:]:
+                        if not row or len(row) < 2 or not row[0]:
+                            continue
+                        
+                        estrato = clasificar_categoria(str(row[0]))
+                        if not estrato or estrato in tarifas:
+                            continue
+                        
+                        valores = [v for v in (extraer_numero(str(c) if c else '') for c in row[1:]) if v > 0]
+                        if not valores:
+                            continue
+                        
+                        mapeados = columnas.valores(row, extraer_numero)
+                        if mapeados:
+                            tarifa, cargo_fijo = mapeados
+                        else:
+                            if 0 < idx_consumo < len(row):
+                                tarifa = extraer_numero(str(row[idx_consumo]) if row[idx_consumo] else '')
+                                cargo_fijo = extraer_numero(str(row[idx_cargo_fijo]) if row[idx_cargo_fijo] else '') \
+                                    if 0 < idx_cargo_fijo < len(row) else 0
+                            else:
+                                tarifa, cargo_fijo = identificar_valores(valores)
+                            columnas.observar(row, tarifa, cargo_fijo, extraer_numero)
+                        
+                        if not tarifa:
+                            continue
+                        
+                        tarifas.agregar(Tarifa(estrato, tarifa, cargo_fijo,
+                                               obtener_subsidio(estrato, subsidios_extraidos)))
+                        emisor.tarifa(tarifas.ultimo(), 'pdf')
+                        print(f"  Extraída: Estrato {estrato} = ${tarifa}/m³, cargo fijo: ${cargo_fijo}", file=sys.stderr)
+                    
+                    columnas.cerrar()
+        
+        # Limpiar archivo temporal
+        if eliminar:
+            try:
+                os.unlink(pdf_path)
+            except:
+                pass
+        
+        return {
+            "tarifas": tarifas.a_lista(),
+            "subsidios_extraidos": subsidios_extraidos or None,
+            "componentes": componentes,
+            "memoria": memoria
+        }
+        
+    except Exception as e:
+        print(f"Error extrayendo datos del PDF: {str(e)}", file=sys.stderr)
+        import traceback
+        traceback.print_exc(file=sys.stderr)
+        return {"tarifas": [], "subsidios_extraidos": None, "componentes": {}}
+
+
+def extraer_con_pdf(checkpoint: CheckpointScrape, perfil: PerfilScrape, emisor: EmisorRegistros,
+                    presupuesto: Presupuesto, descargas: Descargas) -> Optional[Dict[str, Any]]:
+    """
+    Ruta sin navegador: localiza, descarga y extrae el PDF de tarifas.
+    Retorna lo extraído con la misma forma que extraer_con_navegador(), o
+    None si el PDF no es accesible o no trae tarifas.
+    """
+    perfil.paso("Paso PDF 1")
+    print("Paso PDF 1: Localizando PDF de tarifas sin navegador...", file=sys.stderr)
+    pdf_info = checkpoint.etapa('pdf_info', 'json', localizar_pdf_tarifas, presupuesto, descargas)
+    if not pdf_info:
+        return None
+    
+    perfil.paso("Paso PDF 2")
+    print("Paso PDF 2: Descargando PDF...", file=sys.stderr)
+    pdf_path = checkpoint.etapa('pdf', 'archivo', descargar_pdf, pdf_info['url'], presupuesto, descargas)
+    if not pdf_path:
+        return None
+    
+    perfil.paso("Paso PDF 3")
+    print("Paso PDF 3: Extrayendo tarifas del PDF...", file=sys.stderr)
+    reanudada = checkpoint.completada('extraccion_pdf')
+    # En un proceso hijo que se mata si vence el plazo (queda lo parcial)
+    datos = checkpoint.etapa('extraccion_pdf', 'json', ejecutar_en_proceso,
+                             'extraccion_pdf', presupuesto, emisor, extraer_tarifas_de_pdf,
+                             pdf_path, eliminar=not checkpoint.activo,
+                             # Explícitos: el hijo no hereda la configuración del módulo
+                             extractor=EXTRACTOR_TABLAS, recortar=RECORTAR_TABLAS,
+                             memoria_maxima_mb=MEMORIA_MAXIMA_MB, cache_columnas=CACHE_COLUMNAS)
+    if reanudada:
+        emisor.extraccion(datos, 'pdf')
+    if datos.get("parcial") and not checkpoint.activo:
+        # El hijo se detuvo antes de borrar el temporal
+        try:
+            os.unlink(pdf_path)
+        except OSError:
+            pass
+    
+    if not datos.get("tarifas"):
+        print("  El PDF no trae tarifas reconocibles", file=sys.stderr)
+        return None
+    
+    return {
+        "subsidios_extraidos": datos.get("subsidios_extraidos"),
+        "tarifas": datos["tarifas"],
+        "pdf_url": pdf_info["url"],
+        "pdf_origen": pdf_info["origen"],
+        "pdf_descubierto": pdf_info.get("descubierto"),
+        "componentes": datos.get("componentes") or {},
+        "memoria": datos.get("memoria")
     }
+
+
+def extraer_con_navegador(checkpoint: CheckpointScrape, perfil: PerfilScrape, emisor: EmisorRegistros,
+                          presupuesto: Presupuesto, descargas: Descargas) -> Dict[str, Any]:
+    """
+    Ejecuta todo el trabajo del navegador (Pasos 1 a 7) y retorna lo extraído.
+    El HTML renderizado se guarda en el checkpoint para diagnóstico.
+    Si el plazo del navegador vence, el vigilante cierra Chrome y se retorna
+    lo extraído hasta ese punto con "parcial": True.
+    Con el circuito del sitio abierto no se abre Chrome (CircuitoAbierto).
+    """
+    if descargas.circuito is not None:
+        descargas.circuito.comprobar(TARIFAS_URL)
     
     driver = None
+    vigilante = None
+    datos = {
+        "subsidios_extraidos": None,
+        "tarifas": [],
+        "pdf_url": None,
+        "componentes": {}
+    }
     
     try:
         # Paso 1: Crear driver
+        perfil.paso("Paso 1")
         print("Paso 1: Iniciando navegador...", file=sys.stderr)
+        inicio = time.perf_counter()
         driver = crear_driver()
+        vigilante = presupuesto.vigilar('navegador', driver.quit)
+        metricas = {
+            "perfil": "liviano" if BLOQUEAR_RECURSOS else "completo",
+            "arranque_s": round(time.perf_counter() - inicio, 2),
+        }
+        datos["navegador"] = metricas
         
         # Paso 2: Navegar a la página de tarifas
+        perfil.paso("Paso 2")
         print(f"Paso 2: Navegando a {TARIFAS_URL}...", file=sys.stderr)
+        inicio = time.perf_counter()
         driver.get(TARIFAS_URL)
+        metricas["carga_pagina_s"] = round(time.perf_counter() - inicio, 2)
         
         # Esperar carga inicial
         time.sleep(3)
+        checkpoint.guardar('pagina', driver.page_source.encode('utf-8'), 'html')
+        metricas.update(trafico_pagina(driver))
+        metricas["memoria_chrome_mb"] = memoria_navegador_mb(driver)
+        print(f"  Navegador ({metricas['perfil']}): arranque {metricas['arranque_s']} s, "
+              f"carga {metricas['carga_pagina_s']} s, {metricas.get('recursos')} recursos, "
+              f"{metricas.get('bytes_transferidos')} bytes, {metricas['memoria_chrome_mb']} MB", file=sys.stderr)
         
         # Paso 3: Extraer subsidios de la página
+        perfil.paso("Paso 3")
         print("Paso 3: Extrayendo subsidios de la página...", file=sys.stderr)
         subsidios_extraidos = extraer_subsidios_de_pagina(driver)
+        datos["subsidios_extraidos"] = subsidios_extraidos
         
         # Paso 4: Extraer tarifas de tablas
+        perfil.paso("Paso 4")
         print("Paso 4: Extrayendo tarifas de tablas...", file=sys.stderr)
-        tarifas = extraer_tarifas_de_tabla(driver, subsidios_extraidos)
+        tarifas = extraer_tarifas_de_tabla(driver, subsidios_extraidos, emisor)
         
         # Paso 5: Si no hay tablas, buscar en texto
         if not tarifas:
+            perfil.paso("Paso 5")
             print("Paso 5: Buscando tarifas en texto...", file=sys.stderr)
-            tarifas = extraer_tarifas_de_texto(driver, subsidios_extraidos)
+            tarifas = extraer_tarifas_de_texto(driver, subsidios_extraidos, emisor)
+        datos["tarifas"] = tarifas
         
         # Paso 6: Buscar PDF de tarifas
+        perfil.paso("Paso 6")
         print("Paso 6: Buscando PDF de tarifas...", file=sys.stderr)
         pdf_url = buscar_pdf_tarifas(driver)
+        datos["pdf_url"] = pdf_url
         if pdf_url:
-            resultado["pdf_url"] = pdf_url
+            datos["pdf_origen"] = "navegador"
+            datos["pdf_descubierto"] = datetime.now().isoformat()
         
         # Paso 7: Extraer componentes
+        perfil.paso("Paso 7")
         print("Paso 7: Extrayendo componentes de tarifa...", file=sys.stderr)
-        componentes = extraer_componentes(driver)
-        if componentes:
-            resultado["componentes"] = componentes
+        datos["componentes"] = extraer_componentes(driver, emisor)
+        
+        if not tarifas:
+            # Capturar screenshot para debug
+            try:
+                screenshot_path = os.path.join(os.path.dirname(__file__), '..', 'datos_tarifas', 'surtigas_debug.png')
+                driver.save_screenshot(screenshot_path)
+                datos["debug_screenshot"] = screenshot_path
+            except:
+                pass
+        
+        return datos
+        
+    except Exception:
+        # El vigilante cerró Chrome a mitad de un paso: quedarse con lo ya extraído
+        if 'navegador' not in presupuesto.excedidos:
+            raise
+        return datos
+        
+    finally:
+        if vigilante:
+            vigilante.cancel()
+        if 'navegador' in presupuesto.excedidos:
+            datos["parcial"] = True
+        if driver:
+            try:
+                driver.quit()
+            except:
+                pass
+
+
+def scrape_surtigas(checkpoint: Optional[CheckpointScrape] = None,
+                    perfil: Optional[PerfilScrape] = None,
+                    emisor: Optional[EmisorRegistros] = None,
+                    presupuesto: Optional[Presupuesto] = None,
+                    descargas: Optional[Descargas] = None) -> Dict[str, Any]:
+    """
+    Scraper autónomo para Surtigas Montería.
+    Extrae tarifas reales del PDF oficial si es accesible sin navegador y,
+    si no, de la página usando Selenium.
+    Con un checkpoint activo, las etapas del PDF o una extracción del
+    navegador ya completadas se cargan del disco y no se vuelve a abrir Chrome.
+    """
+    print("=== Iniciando scraper autónomo de Surtigas ===", file=sys.stderr)
+    checkpoint = checkpoint or CheckpointScrape()
+    perfil = perfil or PerfilScrape()
+    emisor = emisor or EmisorRegistros()
+    presupuesto = presupuesto or Presupuesto()
+    descargas = descargas or Descargas()
+    
+    resultado = {
+        "url": TARIFAS_URL,
+        "fechaExtraccion": datetime.now().isoformat(),
+        "proveedor": "Surtigas",
+        "servicio": "gas",
+        "region": "Montería",
+        "unidad": "m³",
+        "tarifas": [],
+        "subsidios": [],
+        "componentes": {}
+    }
+    
+    try:
+        if checkpoint.completada('extraccion_navegador'):
+            print("  Reanudando: extracción del navegador cargada del checkpoint", file=sys.stderr)
+            datos = checkpoint.cargar('extraccion_navegador')
+            emisor.extraccion(datos, 'navegador')
+        else:
+            datos = extraer_con_pdf(checkpoint, perfil, emisor, presupuesto, descargas) if USAR_PDF else None
+            if datos is None and not USAR_NAVEGADOR:
+                raise RuntimeError("La ruta del PDF no dio tarifas y el navegador está desactivado")
+            if datos is None:
+                if USAR_PDF:
+                    print("  La ruta del PDF no dio tarifas; se usa el navegador", file=sys.stderr)
+                datos = extraer_con_navegador(checkpoint, perfil, emisor, presupuesto, descargas)
+                # Solo se guarda una extracción útil y completa; si no, se reintenta al reanudar
+                if datos["tarifas"]:
+                    checkpoint.guardar('extraccion_navegador', datos)
+        
+        subsidios_extraidos = datos["subsidios_extraidos"]
+        tarifas = datos["tarifas"]
+        
+        if datos.get("pdf_url"):
+            resultado["pdf_url"] = datos["pdf_url"]
+            # Origen (pagina, navegador o conocido) y fecha en que se vio el enlace en la página,
+            # para saber hasta cuándo reutilizarlo sin abrir el navegador
+            resultado["pdf_origen"] = datos.get("pdf_origen")
+            resultado["pdf_descubierto"] = datos.get("pdf_descubierto")
+        
+        if datos.get("memoria"):
+            resultado["memoria_pdf"] = datos["memoria"]
+        
+        if datos.get("navegador"):
+            resultado["navegador"] = datos["navegador"]
+        
+        if datos.get("componentes"):
+            resultado["componentes"] = datos["componentes"]
         
         # Asignar tarifas al resultado
         resultado["tarifas"] = tarifas
@@ -413,28 +952,25 @@ def scrape_surtigas() -> Dict[str, Any]:
         for tarifa in tarifas:
             subsidio = tarifa.get("subsidio", 0)
             if subsidio != 0:
-                resultado["subsidios"].append({
-                    "estrato": tarifa["estrato"],
-                    "porcentaje": subsidio,
-                    "fuente": "extraído" if subsidios_extraidos and tarifa["estrato"] in subsidios_extraidos else "CREG"
-                })
+                resultado["subsidios"].append(a_dict(Subsidio(
+                    estrato=tarifa["estrato"],
+                    porcentaje=subsidio,
+                    fuente="extraído" if subsidios_extraidos and tarifa["estrato"] in subsidios_extraidos else "CREG"
+                )))
+                emisor.subsidio(resultado["subsidios"][-1], 'tarifas')
         
         # Agregar metadata de consumo de subsistencia
         resultado["consumo_subsistencia"] = CONSUMO_SUBSISTENCIA_GAS
         resultado["nota_subsidios"] = "Subsidios aplican solo al consumo de subsistencia (20 m³/mes)"
+        if presupuesto.excedidos:
+            resultado["plazos_excedidos"] = presupuesto.excedidos
         
         # Verificar que obtuvimos datos
         if not resultado["tarifas"]:
             resultado["error"] = "No se pudieron extraer tarifas de la página"
             resultado["sugerencia"] = "La estructura de la página pudo haber cambiado. Revisar manualmente: " + TARIFAS_URL
-            
-            # Capturar screenshot para debug
-            try:
-                screenshot_path = os.path.join(os.path.dirname(__file__), '..', 'datos_tarifas', 'surtigas_debug.png')
-                driver.save_screenshot(screenshot_path)
-                resultado["debug_screenshot"] = screenshot_path
-            except:
-                pass
+            if datos.get("debug_screenshot"):
+                resultado["debug_screenshot"] = datos["debug_screenshot"]
         else:
             print(f"\n=== Extracción completada: {len(resultado['tarifas'])} tarifas ===", file=sys.stderr)
         
@@ -447,16 +983,64 @@ def scrape_surtigas() -> Dict[str, Any]:
         
         resultado["error"] = str(e)
         resultado["sugerencia"] = "Verificar que Chrome está instalado y que la URL sea accesible: " + TARIFAS_URL
+        if presupuesto.excedidos:
+            resultado["plazos_excedidos"] = presupuesto.excedidos
         return resultado
-        
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
 
 
 if __name__ == "__main__":
-    resultado = scrape_surtigas()
-    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    parser = argparse.ArgumentParser(description="Scraper de tarifas de Surtigas")
+    agregar_argumentos(parser)
+    perfil_scrape.agregar_argumentos(parser)
+    salida_tarifas.agregar_argumentos(parser)
+    plazos_scrape.agregar_argumentos(parser)
+    archivo_artefactos.agregar_argumentos(parser)
+    peticiones_respaldo.agregar_argumentos(parser)
+    extraccion_tablas.agregar_argumentos(parser, EXTRACTOR_TABLAS)
+    paginas_pdf.agregar_argumentos(parser)
+    mapeo_columnas.agregar_argumentos(parser)
+    ejecucion_compartida.agregar_argumentos(parser)
+    resultado_vigente.agregar_argumentos(parser)
+    circuito_hosts.agregar_argumentos(parser)
+    parser.add_argument("--solo-navegador", action="store_true",
+                        help="No intenta la ruta del PDF; extrae directamente con Chrome")
+    parser.add_argument("--bloquear-recursos", action="store_true",
+                        help="Chrome con el perfil liviano: sin imágenes, fuentes, hojas de estilo "
+                             "ni rastreadores (experimental)")
+    args = parser.parse_args()
+    EXTRACTOR_TABLAS = args.extractor_tablas
+    RECORTAR_TABLAS = not args.sin_recorte_tablas
+    MEMORIA_MAXIMA_MB = args.memoria_maxima_mb
+    CACHE_COLUMNAS = columnas_desde_argumentos(args, "surtigas")
+    circuito = circuito_desde_argumentos(args)
+    USAR_PDF = not args.solo_navegador
+    BLOQUEAR_RECURSOS = args.bloquear_recursos
+    
+    compartida = compartida_desde_argumentos(args, "surtigas")
+    vigente = vigente_desde_argumentos(args, "surtigas", compartida)
+    resultado = vigente.servir() or compartida.resultado_en_curso()
+    if resultado is not None:
+        escribir_resultado(vigente.respaldo(resultado), args.format)
+        sys.exit(0)
+    
+    checkpoint = checkpoint_desde_argumentos(args, "surtigas")
+    perfil = perfil_desde_argumentos(args, "surtigas", checkpoint)
+    emisor = emisor_desde_argumentos(args, "surtigas")
+    presupuesto = presupuesto_desde_argumentos(args)
+    archivo = archivo_desde_argumentos(args, "surtigas")
+    respaldo = respaldo_desde_argumentos(args)
+    descargas = Descargas(archivo, respaldo, circuito)
+    resultado = scrape_surtigas(checkpoint, perfil, emisor, presupuesto, descargas)
+    perfil.finalizar()
+    checkpoint.finalizar(resultado)
+    archivo.finalizar(resultado)
+    if respaldo:
+        respaldo.finalizar()
+    if resultado.get("plazos_excedidos"):
+        # Resultado parcial: no reemplaza el último bueno ni se comparte
+        compartida.soltar()
+    else:
+        guardar_snapshot_resultado(resultado)
+        actualizar_tendencia_tarifas(resultado)
+        compartida.publicar(resultado)
+    escribir_resultado(vigente.respaldo(resultado), args.format)
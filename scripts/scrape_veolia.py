@@ -14,6 +14,8 @@ import json
 import re
 import os
 import tempfile
+import time
+import argparse
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from urllib.parse import urljoin
@@ -28,6 +30,36 @@ except ImportError as e:
     }), file=sys.stderr)
     sys.exit(1)
 
+from snapshot_tarifas import guardar_snapshot_resultado
+from resumenes_dashboard import actualizar_tendencia_tarifas
+from checkpoint_scrape import CheckpointScrape, agregar_argumentos, checkpoint_desde_argumentos
+import perfil_scrape
+from perfil_scrape import PerfilScrape, perfil_desde_argumentos
+import salida_tarifas
+from salida_tarifas import EmisorRegistros, emisor_desde_argumentos, escribir_resultado
+from modelo_tarifas import RegistrosPorEstrato, Subsidio, Tarifa, a_dict
+import sondeo_tarifas
+from sondeo_tarifas import calcular_huella, evaluar_sondeo, guardar_huella_resultado, TIMEOUT_SONDEO
+import extraccion_tablas
+from extraccion_tablas import extraer_tablas
+import paginas_pdf
+from paginas_pdf import iterar_paginas
+import plazos_scrape
+import archivo_artefactos
+from archivo_artefactos import archivo_desde_argumentos
+import peticiones_respaldo
+from peticiones_respaldo import respaldo_desde_argumentos
+import mapeo_columnas
+from mapeo_columnas import CacheColumnas, columnas_desde_argumentos
+import ejecucion_compartida
+from ejecucion_compartida import compartida_desde_argumentos
+import resultado_vigente
+from resultado_vigente import vigente_desde_argumentos
+import circuito_hosts
+from circuito_hosts import circuito_desde_argumentos
+from escaneo_texto import HUECO, VALOR, Escaner, Patron, palabras_clave
+from plazos_scrape import Descargas, Presupuesto, descargar, ejecutar_en_proceso, presupuesto_desde_argumentos
+
 
 # Configuración
 BASE_URL = "https://www.monteria.veolia.co"
@@ -37,6 +69,10 @@ HEADERS = {
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
     'Accept-Language': 'es-CO,es;q=0.9',
 }
+EXTRACTOR_TABLAS = 'pdfplumber'  # o 'rapido' (ver extraccion_tablas.py)
+RECORTAR_TABLAS = True  # buscar tablas solo en la región de las palabras ancla
+MEMORIA_MAXIMA_MB = None  # techo de RSS al leer el PDF (None = sin límite)
+CACHE_COLUMNAS = CacheColumnas()  # mapeos de columnas aprendidos (ver mapeo_columnas.py)
 
 # Subsidios oficiales CRA para Acueducto y Alcantarillado (fallback si no se extraen)
 # Según regulación CRA - Máximos permitidos por ley
@@ -71,6 +107,15 @@ def obtener_subsidio_cra(estrato: str, subsidios_extraidos: Optional[Dict] = Non
     return SUBSIDIOS_CRA_AGUA.get(estrato, 0)
 
 
+def obtener_pagina_tarifas(timeout: int = 30, presupuesto: Optional[Presupuesto] = None,
+                           descargas: Optional[Descargas] = None) -> bytes:
+    """
+    Descarga la página de tarifas y retorna su HTML sin decodificar.
+    Con presupuesto, la descarga completa respeta el plazo de la etapa 'pagina'.
+    """
+    return descargar(TARIFAS_URL, HEADERS, presupuesto, 'pagina', timeout, descargas)
+
+
 def encontrar_pdf_mas_reciente(soup: BeautifulSoup) -> Optional[Dict[str, str]]:
     """
     Busca el enlace al PDF de tarifas más reciente en la página.
@@ -138,21 +183,22 @@ def encontrar_pdf_mas_reciente(soup: BeautifulSoup) -> Optional[Dict[str, str]]:
     return None
 
 
-def descargar_pdf(url: str) -> Optional[str]:
+def descargar_pdf(url: str, presupuesto: Optional[Presupuesto] = None,
+                  descargas: Optional[Descargas] = None) -> Optional[str]:
     """
     Descarga un PDF y retorna la ruta del archivo temporal.
+    Con presupuesto, la descarga completa respeta el plazo de la etapa 'pdf'.
     """
     try:
         print(f"Descargando PDF desde: {url}", file=sys.stderr)
-        response = requests.get(url, headers=HEADERS, timeout=60)
-        response.raise_for_status()
+        contenido = descargar(url, HEADERS, presupuesto, 'pdf', 60, descargas)
         
         # Guardar en archivo temporal
         fd, path = tempfile.mkstemp(suffix='.pdf')
         with os.fdopen(fd, 'wb') as f:
-            f.write(response.content)
+            f.write(contenido)
         
-        print(f"PDF descargado: {len(response.content)} bytes", file=sys.stderr)
+        print(f"PDF descargado: {len(contenido)} bytes", file=sys.stderr)
         return path
         
     except Exception as e:
@@ -183,24 +229,44 @@ def extraer_numero(texto: str) -> float:
         return 0.0
 
 
-def extraer_tarifas_de_pdf(pdf_path: str) -> Dict[str, Any]:
+# Texto de cada página del PDF en una sola pasada (ver escaneo_texto.py)
+ESCANER_PDF = Escaner([
+    Patron('subsidio', ('estrato',), rf'estrato\s*(\d){HUECO}{VALOR}\s*%'),
+])
+ENCABEZADOS_TARIFA = palabras_clave(['estrato', 'uso', 'cargo', 'tarifa', 'm3', 'm³', 'consumo',
+                                     'acueducto', 'alcantarillado'])
+
+
+def extraer_tarifas_de_pdf(pdf_path: str, eliminar: bool = True,
+                           emisor: Optional[EmisorRegistros] = None,
+                           extractor: str = EXTRACTOR_TABLAS, recortar: bool = RECORTAR_TABLAS,
+                           memoria_maxima_mb: Optional[float] = MEMORIA_MAXIMA_MB,
+                           cache_columnas: Optional[CacheColumnas] = None) -> Dict[str, Any]:
     """
     Extrae las tarifas del PDF de Veolia.
     Busca:
     - Tarifas por estrato para acueducto y alcantarillado
     - Cargos fijos
     - Subsidios/contribuciones
+    Con eliminar=False el archivo se conserva (p. ej. si pertenece a un checkpoint).
+    Las páginas se leen de a una y se liberan al terminar (ver paginas_pdf.py).
+    Cada tarifa y subsidio se emite en cuanto se encuentra (--format jsonl).
     """
-    tarifas = []
-    subsidios = []
+    emisor = emisor or EmisorRegistros()
+    cache_columnas = cache_columnas or CacheColumnas()
+    tarifas = RegistrosPorEstrato()
+    subsidios = RegistrosPorEstrato()
     
     try:
+        memoria = {}
         with pdfplumber.open(pdf_path) as pdf:
             print(f"PDF tiene {len(pdf.pages)} páginas", file=sys.stderr)
             
-            for page_num, page in enumerate(pdf.pages):
+            for page_num, page in iterar_paginas(pdf, memoria_maxima_mb, memoria):
+                text = page.extract_text() or ""
+                
                 # Extraer tablas
-                tables = page.extract_tables()
+                tables = extraer_tablas(page, extractor, text, recortar)
                 
                 for table_idx, table in enumerate(tables):
                     if not table or len(table) < 2:
@@ -211,9 +277,12 @@ def extraer_tarifas_de_pdf(pdf_path: str) -> Dict[str, Any]:
                     header_text = ' '.join(headers)
                     
                     # Buscar tablas de tarifas
-                    if any(kw in header_text for kw in ['estrato', 'uso', 'cargo', 'tarifa', 'm3', 'm³', 'consumo', 'acueducto', 'alcantarillado']):
+                    if ENCABEZADOS_TARIFA.contiene(header_text):
                         print(f"Tabla de tarifas encontrada en página {page_num + 1}", file=sys.stderr)
                         
+                        # Disposición conocida: columnas directas; si no, la heurística aprende una
+                        columnas = cache_columnas.tabla(headers, page)
+                        
                         # Identificar índices de columnas relevantes
                         idx_cargo_fijo = next((i for i, h in enumerate(headers) if 'fijo' in h or 'cargo' in h), -1)
                         idx_consumo = next((i for i, h in enumerate(headers) if 'consumo' in h or 'm³' in h or 'm3' in h or 'variable' in h), -1)
@@ -253,64 +322,64 @@ def extraer_tarifas_de_pdf(pdf_path: str) -> Dict[str, Any]:
                                     valores.append({'index': i, 'value': val})
                             
                             if valores:
-                                # Intentar identificar cargo fijo vs tarifa por consumo
-                                cargo_fijo = 0
-                                tarifa = 0
-                                
-                                # Usar índices de columnas si se identificaron
-                                if idx_cargo_fijo > 0 and idx_cargo_fijo < len(row):
-                                    cargo_fijo = extraer_numero(str(row[idx_cargo_fijo]) if row[idx_cargo_fijo] else '')
-                                if idx_consumo > 0 and idx_consumo < len(row):
-                                    tarifa = extraer_numero(str(row[idx_consumo]) if row[idx_consumo] else '')
-                                
-                                # Si no se identificaron columnas, inferir por valores
-                                if not tarifa and not cargo_fijo:
-                                    for v in valores:
-                                        if 3000 < v['value'] < 100000:
-                                            cargo_fijo = v['value']
-                                        elif 500 < v['value'] < 10000:
-                                            tarifa = v['value']
-                                
-                                # Si solo hay un valor, asumirlo como tarifa
-                                if not tarifa and valores:
-                                    tarifa = valores[0]['value']
+                                mapeados = columnas.valores(row, extraer_numero)
+                                if mapeados:
+                                    tarifa, cargo_fijo = mapeados
+                                else:
+                                    # Intentar identificar cargo fijo vs tarifa por consumo
+                                    cargo_fijo = 0
+                                    tarifa = 0
+                                    
+                                    # Usar índices de columnas si se identificaron
+                                    if idx_cargo_fijo > 0 and idx_cargo_fijo < len(row):
+                                        cargo_fijo = extraer_numero(str(row[idx_cargo_fijo]) if row[idx_cargo_fijo] else '')
+                                    if idx_consumo > 0 and idx_consumo < len(row):
+                                        tarifa = extraer_numero(str(row[idx_consumo]) if row[idx_consumo] else '')
+                                    
+                                    # Si no se identificaron columnas, inferir por valores
+                                    if not tarifa and not cargo_fijo:
+                                        for v in valores:
+                                            if 3000 < v['value'] < 100000:
+                                                cargo_fijo = v['value']
+                                            elif 500 < v['value'] < 10000:
+                                                tarifa = v['value']
+                                    
+                                    # Si solo hay un valor, asumirlo como tarifa
+                                    if not tarifa and valores:
+                                        tarifa = valores[0]['value']
+                                    
+                                    columnas.observar(row, tarifa, cargo_fijo, extraer_numero)
                                 
                                 # Obtener subsidio usando función centralizada (extraído o CRA)
-                                subsidio = obtener_subsidio_cra(estrato, {s['estrato']: s['porcentaje'] for s in subsidios} if subsidios else None)
+                                subsidio = obtener_subsidio_cra(estrato, {s.estrato: s.porcentaje for s in subsidios} if subsidios else None)
                                 
                                 # Evitar duplicados
-                                if not any(t['estrato'] == estrato for t in tarifas):
-                                    tarifas.append({
-                                        "estrato": estrato,
-                                        "tarifa": tarifa,
-                                        "cargoFijo": cargo_fijo,
-                                        "subsidio": subsidio
-                                    })
+                                if tarifas.agregar(Tarifa(estrato, tarifa, cargo_fijo, subsidio)):
+                                    emisor.tarifa(tarifas.ultimo(), 'pdf')
                                     print(f"  Extraída: Estrato {estrato} = ${tarifa}/m³, cargo fijo: ${cargo_fijo}", file=sys.stderr)
+                        
+                        columnas.cerrar()
                 
                 # Buscar subsidios en texto
-                text = page.extract_text() or ""
-                
-                patron_subsidio = r'estrato\s*(\d)[^0-9]*([\d.,]+)\s*%'
-                matches = re.findall(patron_subsidio, text.lower())
-                for estrato_num, porcentaje in matches:
+                for match in ESCANER_PDF.buscar(text)['subsidio']:
+                    estrato_num, porcentaje = match.groups()
                     pct = extraer_numero(porcentaje)
-                    if pct > 0 and not any(s['estrato'] == estrato_num for s in subsidios):
-                        subsidios.append({
-                            "estrato": estrato_num,
-                            "porcentaje": -pct  # Negativo = descuento
-                        })
+                    # Negativo = descuento
+                    if pct > 0 and subsidios.agregar(Subsidio(estrato_num, -pct)):
+                        emisor.subsidio(subsidios.ultimo(), 'pdf')
                         print(f"  Subsidio: Estrato {estrato_num} = -{pct}%", file=sys.stderr)
         
         # Limpiar archivo temporal
-        try:
-            os.unlink(pdf_path)
-        except:
-            pass
+        if eliminar:
+            try:
+                os.unlink(pdf_path)
+            except:
+                pass
         
         return {
-            "tarifas": tarifas,
-            "subsidios": subsidios
+            "tarifas": tarifas.a_lista(),
+            "subsidios": subsidios.a_lista(),
+            "memoria": memoria
         }
         
     except Exception as e:
@@ -320,11 +389,12 @@ def extraer_tarifas_de_pdf(pdf_path: str) -> Dict[str, Any]:
         return {"tarifas": [], "subsidios": []}
 
 
-def extraer_tarifas_de_html(soup: BeautifulSoup) -> List[Dict]:
+def extraer_tarifas_de_html(soup: BeautifulSoup, emisor: Optional[EmisorRegistros] = None) -> List[Dict]:
     """
     Intenta extraer tarifas directamente del HTML si hay tablas visibles.
     """
-    tarifas = []
+    emisor = emisor or EmisorRegistros()
+    tarifas = RegistrosPorEstrato()
     
     try:
         # Buscar tablas en el HTML
@@ -361,28 +431,53 @@ def extraer_tarifas_de_html(soup: BeautifulSoup) -> List[Dict]:
                         # Obtener subsidio usando función centralizada
                         subsidio = obtener_subsidio_cra(estrato)
                         
-                        if not any(t['estrato'] == estrato for t in tarifas):
-                            tarifas.append({
-                                "estrato": estrato,
-                                "tarifa": tarifa,
-                                "cargoFijo": cargo_fijo,
-                                "subsidio": subsidio
-                            })
+                        if tarifas.agregar(Tarifa(estrato, tarifa, cargo_fijo, subsidio)):
+                            emisor.tarifa(tarifas.ultimo(), 'html')
                             print(f"  Tarifa HTML: Estrato {estrato} = ${tarifa}/m³", file=sys.stderr)
     
     except Exception as e:
         print(f"Error extrayendo de HTML: {str(e)}", file=sys.stderr)
     
-    return tarifas
+    return tarifas.a_lista()
+
+
+def huella_pagina(soup: BeautifulSoup, pdf_info: Optional[Dict[str, Any]],
+                  tarifas_html: Optional[List[Dict]] = None) -> str:
+    """
+    Huella del boletín seleccionado y de las tarifas publicadas en el HTML.
+    """
+    if tarifas_html is None:
+        tarifas_html = extraer_tarifas_de_html(soup)
+    return calcular_huella(pdf_info, {"tarifas_html": tarifas_html})
 
 
-def scrape_veolia() -> Dict[str, Any]:
+def sondear_veolia(descargas: Optional[Descargas] = None) -> Dict[str, Any]:
+    """
+    Sondeo rápido: solo la página de tarifas, sin descargar ni parsear el PDF.
+    """
+    inicio = time.perf_counter()
+    soup = BeautifulSoup(obtener_pagina_tarifas(TIMEOUT_SONDEO, descargas=descargas), 'lxml')
+    pdf_info = encontrar_pdf_mas_reciente(soup)
+    return evaluar_sondeo("veolia", huella_pagina(soup, pdf_info), pdf_info, inicio)
+
+
+def scrape_veolia(checkpoint: Optional[CheckpointScrape] = None,
+                  perfil: Optional[PerfilScrape] = None,
+                  emisor: Optional[EmisorRegistros] = None,
+                  presupuesto: Optional[Presupuesto] = None,
+                  descargas: Optional[Descargas] = None) -> Dict[str, Any]:
     """
     Scraper autónomo para Veolia Montería.
     Extrae tarifas reales desde la página oficial.
     SIN VALORES HARDCODEADOS.
+    Con un checkpoint activo, las etapas ya completadas se cargan del disco.
     """
     print("=== Iniciando scraper autónomo de Veolia ===", file=sys.stderr)
+    checkpoint = checkpoint or CheckpointScrape()
+    perfil = perfil or PerfilScrape()
+    emisor = emisor or EmisorRegistros()
+    presupuesto = presupuesto or Presupuesto()
+    descargas = descargas or Descargas()
     
     resultado = {
         "url": TARIFAS_URL,
@@ -398,19 +493,23 @@ def scrape_veolia() -> Dict[str, Any]:
     
     try:
         # Paso 1: Obtener página de tarifas
+        perfil.paso("Paso 1")
         print("Paso 1: Accediendo a página de tarifas...", file=sys.stderr)
-        response = requests.get(TARIFAS_URL, headers=HEADERS, timeout=30)
-        response.raise_for_status()
+        html = checkpoint.etapa('pagina', 'html', obtener_pagina_tarifas,
+                                presupuesto=presupuesto, descargas=descargas)
         
-        soup = BeautifulSoup(response.content, 'lxml')
+        soup = BeautifulSoup(html, 'lxml')
         
         # Paso 2: Intentar extraer tarifas del HTML
+        perfil.paso("Paso 2")
         print("Paso 2: Buscando tarifas en HTML...", file=sys.stderr)
-        tarifas_html = extraer_tarifas_de_html(soup)
+        tarifas_html = extraer_tarifas_de_html(soup, emisor)
         
         # Paso 3: Encontrar PDF más reciente
+        perfil.paso("Paso 3")
         print("Paso 3: Buscando PDF de tarifas...", file=sys.stderr)
-        pdf_info = encontrar_pdf_mas_reciente(soup)
+        pdf_info = checkpoint.etapa('pdf_info', 'json', encontrar_pdf_mas_reciente, soup)
+        resultado["huella_pagina"] = huella_pagina(soup, pdf_info, tarifas_html)
         
         tarifas_pdf = []
         subsidios_pdf = []
@@ -421,14 +520,33 @@ def scrape_veolia() -> Dict[str, Any]:
                 resultado["mes_tarifa"] = pdf_info['mes']
             
             # Paso 4: Descargar PDF
+            perfil.paso("Paso 4")
             print("Paso 4: Descargando PDF...", file=sys.stderr)
-            pdf_path = descargar_pdf(pdf_info['url'])
+            pdf_path = checkpoint.etapa('pdf', 'archivo', descargar_pdf, pdf_info['url'], presupuesto, descargas)
             
             if pdf_path:
                 # Paso 5: Extraer tarifas del PDF
+                perfil.paso("Paso 5")
                 print("Paso 5: Extrayendo tarifas del PDF...", file=sys.stderr)
-                datos_pdf = extraer_tarifas_de_pdf(pdf_path)
+                reanudada = checkpoint.completada('extraccion_pdf')
+                # En un proceso hijo que se mata si vence el plazo (queda lo parcial)
+                datos_pdf = checkpoint.etapa('extraccion_pdf', 'json', ejecutar_en_proceso,
+                                             'extraccion_pdf', presupuesto, emisor, extraer_tarifas_de_pdf,
+                                             pdf_path, eliminar=not checkpoint.activo,
+                                             # Explícitos: el hijo no hereda la configuración del módulo
+                                             extractor=EXTRACTOR_TABLAS, recortar=RECORTAR_TABLAS,
+                                             memoria_maxima_mb=MEMORIA_MAXIMA_MB, cache_columnas=CACHE_COLUMNAS)
+                if reanudada:
+                    emisor.extraccion(datos_pdf, 'pdf')
+                if datos_pdf.get("parcial") and not checkpoint.activo:
+                    # El hijo se detuvo antes de borrar el temporal
+                    try:
+                        os.unlink(pdf_path)
+                    except OSError:
+                        pass
                 tarifas_pdf = datos_pdf.get("tarifas", [])
+                if datos_pdf.get("memoria"):
+                    resultado["memoria_pdf"] = datos_pdf["memoria"]
                 subsidios_pdf = datos_pdf.get("subsidios", [])
         
         # Usar tarifas del PDF si las hay, sino del HTML
@@ -444,10 +562,11 @@ def scrape_veolia() -> Dict[str, Any]:
             # Generar subsidios basados en tarifas si se extrajeron
             for tarifa in resultado["tarifas"]:
                 if tarifa["estrato"] in ['1', '2', '3'] and tarifa.get("subsidio"):
-                    resultado["subsidios"].append({
-                        "estrato": tarifa["estrato"],
-                        "porcentaje": tarifa["subsidio"]
-                    })
+                    resultado["subsidios"].append(a_dict(Subsidio(tarifa["estrato"], tarifa["subsidio"])))
+                    emisor.subsidio(resultado["subsidios"][-1], 'tarifas')
+        
+        if presupuesto.excedidos:
+            resultado["plazos_excedidos"] = presupuesto.excedidos
         
         # Verificar que obtuvimos datos - NO USAR FALLBACK
         if not resultado["tarifas"]:
@@ -465,9 +584,62 @@ def scrape_veolia() -> Dict[str, Any]:
         
         resultado["error"] = str(e)
         resultado["sugerencia"] = "Verificar conectividad y que la URL sea accesible: " + TARIFAS_URL
+        if presupuesto.excedidos:
+            resultado["plazos_excedidos"] = presupuesto.excedidos
         return resultado
 
 
 if __name__ == "__main__":
-    resultado = scrape_veolia()
-    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    parser = argparse.ArgumentParser(description="Scraper de tarifas de Veolia")
+    agregar_argumentos(parser)
+    perfil_scrape.agregar_argumentos(parser)
+    salida_tarifas.agregar_argumentos(parser)
+    sondeo_tarifas.agregar_argumentos(parser)
+    extraccion_tablas.agregar_argumentos(parser, EXTRACTOR_TABLAS)
+    paginas_pdf.agregar_argumentos(parser)
+    plazos_scrape.agregar_argumentos(parser)
+    archivo_artefactos.agregar_argumentos(parser)
+    peticiones_respaldo.agregar_argumentos(parser)
+    mapeo_columnas.agregar_argumentos(parser)
+    ejecucion_compartida.agregar_argumentos(parser)
+    resultado_vigente.agregar_argumentos(parser)
+    circuito_hosts.agregar_argumentos(parser)
+    args = parser.parse_args()
+    EXTRACTOR_TABLAS = args.extractor_tablas
+    RECORTAR_TABLAS = not args.sin_recorte_tablas
+    MEMORIA_MAXIMA_MB = args.memoria_maxima_mb
+    CACHE_COLUMNAS = columnas_desde_argumentos(args, "veolia")
+    circuito = circuito_desde_argumentos(args)
+    
+    if args.sondeo:
+        sys.exit(sondeo_tarifas.ejecutar_sondeo("veolia", lambda: sondear_veolia(Descargas(circuito=circuito))))
+    
+    compartida = compartida_desde_argumentos(args, "veolia")
+    vigente = vigente_desde_argumentos(args, "veolia", compartida)
+    resultado = vigente.servir() or compartida.resultado_en_curso()
+    if resultado is not None:
+        escribir_resultado(vigente.respaldo(resultado), args.format)
+        sys.exit(0)
+    
+    checkpoint = checkpoint_desde_argumentos(args, "veolia")
+    perfil = perfil_desde_argumentos(args, "veolia", checkpoint)
+    emisor = emisor_desde_argumentos(args, "veolia")
+    presupuesto = presupuesto_desde_argumentos(args)
+    archivo = archivo_desde_argumentos(args, "veolia")
+    respaldo = respaldo_desde_argumentos(args)
+    descargas = Descargas(archivo, respaldo, circuito)
+    resultado = scrape_veolia(checkpoint, perfil, emisor, presupuesto, descargas)
+    perfil.finalizar()
+    checkpoint.finalizar(resultado)
+    archivo.finalizar(resultado)
+    if respaldo:
+        respaldo.finalizar()
+    if resultado.get("plazos_excedidos"):
+        # Resultado parcial: no reemplaza el último bueno ni se comparte
+        compartida.soltar()
+    else:
+        guardar_snapshot_resultado(resultado)
+        actualizar_tendencia_tarifas(resultado)
+        guardar_huella_resultado(resultado)
+        compartida.publicar(resultado)
+    escribir_resultado(vigente.respaldo(resultado), args.format)
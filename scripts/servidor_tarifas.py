@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor local de consulta de tarifas - OptiFactura Montería
+Este servidor:
+1. Carga los últimos resultados de scrape_afinia / scrape_veolia / scrape_surtigas
+2. Construye un índice en memoria por (proveedor, servicio, estrato, región)
+   con las respuestas ya serializadas
+3. Responde consultas por HTTP (TCP local o socket Unix) sin tocar MySQL
+4. Recarga el índice en caliente cuando un scrape termina (cambio en el archivo,
+   señal SIGHUP o POST /recargar) y lo reemplaza de forma atómica
+
+TarifasService lo consulta primero (lib/cliente-tarifas.js, variable
+TARIFAS_SERVIDOR) y, si no responde, usa su caché de la base de datos.
+
+Uso:
+    python scripts/servidor_tarifas.py --puerto 8765
+    python scripts/servidor_tarifas.py --socket /tmp/tarifas.sock
+
+Consultas:
+    GET  /tarifa?proveedor=afinia&estrato=1[&servicio=electricidad&region=Montería]
+    GET  /tarifas?proveedor=veolia
+    GET  /salud
+    POST /recargar
+"""
+
+import sys
+import json
+import os
+import signal
+import socketserver
+import threading
+import argparse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from tarifas_comun import DIR_DATOS, PROVEEDORES, ruta_resultado, normalizar_clave
+
+
+REGION_POR_DEFECTO = "Montería"
+INTERVALO_REVISION = 2.0  # segundos entre revisiones de los archivos de resultados
+
+Clave = Tuple[str, str, str, str]
+
+
+def clave_tarifa(proveedor: str, servicio: Optional[str], estrato: str, region: Optional[str] = None) -> Clave:
+    """Clave normalizada del índice: (proveedor, servicio, estrato, región)."""
+    proveedor_norm = normalizar_clave(proveedor)
+    servicio_norm = normalizar_clave(servicio) or PROVEEDORES.get(proveedor_norm, '')
+    return (
+        proveedor_norm,
+        servicio_norm,
+        normalizar_clave(estrato),
+        normalizar_clave(region or REGION_POR_DEFECTO),
+    )
+
+
+def _serializar(datos: Any) -> bytes:
+    return json.dumps(datos, ensure_ascii=False).encode('utf-8')
+
+
+class IndiceTarifas:
+    """
+    Instantánea inmutable de las tarifas de todos los proveedores.
+    Nunca se modifica después de construida: una recarga crea un índice nuevo
+    y el servicio cambia la referencia, así los lectores no necesitan bloqueo.
+    """
+
+    def __init__(self, resultados: Dict[str, Dict[str, Any]], version: int = 0):
+        self.version = version
+        self.cargado_en = datetime.now().isoformat()
+        self.resultados = resultados
+        self.registros: Dict[Clave, Dict[str, Any]] = {}
+        self.respuestas: Dict[Clave, bytes] = {}
+        self.listados: Dict[str, bytes] = {}
+
+        for proveedor, resultado in resultados.items():
+            filas = self._indexar_resultado(proveedor, resultado)
+            self.listados[proveedor] = _serializar(filas)
+
+        # Respuestas precalculadas: una consulta es un solo acceso al diccionario
+        for clave, registro in self.registros.items():
+            self.respuestas[clave] = _serializar(registro)
+
+    def _indexar_resultado(self, proveedor: str, resultado: Dict[str, Any]) -> List[Dict[str, Any]]:
+        servicio = resultado.get("servicio") or PROVEEDORES.get(proveedor, '')
+        region = resultado.get("region") or REGION_POR_DEFECTO
+        subsidios = {str(s.get("estrato")): s.get("porcentaje") for s in resultado.get("subsidios", [])}
+        filas = []
+
+        for tarifa in resultado.get("tarifas", []):
+            estrato = str(tarifa.get("estrato", ''))
+            if not estrato:
+                continue
+
+            subsidio = tarifa.get("subsidio")
+            if subsidio is None:
+                subsidio = subsidios.get(estrato)
+
+            # Mismo formato que TarifasService.obtenerTarifaReferencia()
+            registro = {
+                "proveedor": resultado.get("proveedor", proveedor.capitalize()),
+                "servicio": servicio,
+                "region": region,
+                "estrato": estrato,
+                "valor": tarifa.get("tarifa"),
+                "cargoFijo": tarifa.get("cargoFijo", 0),
+                "unidad": resultado.get("unidad"),
+                "moneda": "COP",
+                "fechaActualizacion": resultado.get("fechaExtraccion"),
+                "subsidio": subsidio,
+                "aproximado": False,
+            }
+
+            clave = clave_tarifa(proveedor, servicio, estrato, region)
+            if clave not in self.registros:
+                self.registros[clave] = registro
+                filas.append(registro)
+
+        return filas
+
+    def buscar(self, proveedor: str, estrato: str, servicio: Optional[str] = None,
+               region: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Busca una tarifa en el índice (uso en el mismo proceso)."""
+        return self.registros.get(clave_tarifa(proveedor, servicio, estrato, region))
+
+    def respuesta(self, proveedor: str, estrato: str, servicio: Optional[str] = None,
+                  region: Optional[str] = None) -> Optional[bytes]:
+        """Retorna la respuesta JSON ya serializada para una tarifa."""
+        return self.respuestas.get(clave_tarifa(proveedor, servicio, estrato, region))
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "cargadoEn": self.cargado_en,
+            "tarifas": len(self.registros),
+            "proveedores": {
+                proveedor: {
+                    "fechaExtraccion": resultado.get("fechaExtraccion"),
+                    "tarifas": len(resultado.get("tarifas", [])),
+                }
+                for proveedor, resultado in self.resultados.items()
+            },
+        }
+
+
+class ServicioTarifas:
+    """
+    Mantiene el índice vigente y lo recarga cuando cambian los resultados.
+    """
+
+    def __init__(self, directorio: str = DIR_DATOS, intervalo: float = INTERVALO_REVISION):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.indice = IndiceTarifas({})
+        self._marcas: Dict[str, int] = {}
+        self._lock_recarga = threading.Lock()
+        self._detener = threading.Event()
+
+    def _leer_resultado(self, proveedor: str) -> Optional[Dict[str, Any]]:
+        ruta = ruta_resultado(proveedor, self.directorio)
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                resultado = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            # Archivo a medio escribir o corrupto: se conserva la instantánea anterior
+            print(f"  No se pudo leer {ruta}: {str(e)}", file=sys.stderr)
+            return None
+
+        if not resultado.get("tarifas"):
+            print(f"  {ruta} no contiene tarifas, se conserva la instantánea anterior", file=sys.stderr)
+            return None
+        return resultado
+
+    def _marca_archivo(self, proveedor: str) -> int:
+        try:
+            return os.stat(ruta_resultado(proveedor, self.directorio)).st_mtime_ns
+        except OSError:
+            return 0
+
+    def recargar(self) -> IndiceTarifas:
+        """Construye un índice nuevo y lo publica con un solo cambio de referencia."""
+        with self._lock_recarga:
+            anterior = self.indice
+            resultados = {}
+
+            for proveedor in PROVEEDORES:
+                self._marcas[proveedor] = self._marca_archivo(proveedor)
+                resultado = self._leer_resultado(proveedor)
+                if resultado is not None:
+                    resultados[proveedor] = resultado
+                elif proveedor in anterior.resultados:
+                    resultados[proveedor] = anterior.resultados[proveedor]
+
+            self.indice = IndiceTarifas(resultados, version=anterior.version + 1)
+            print(f"Índice de tarifas v{self.indice.version}: {len(self.indice.registros)} tarifas", file=sys.stderr)
+            return self.indice
+
+    def hay_cambios(self) -> bool:
+        return any(self._marca_archivo(p) != self._marcas.get(p) for p in PROVEEDORES)
+
+    def vigilar(self) -> threading.Thread:
+        """Inicia un hilo que recarga el índice cuando cambia algún resultado."""
+        def _bucle():
+            while not self._detener.wait(self.intervalo):
+                if self.hay_cambios():
+                    try:
+                        self.recargar()
+                    except Exception as e:
+                        print(f"Error recargando tarifas: {str(e)}", file=sys.stderr)
+
+        hilo = threading.Thread(target=_bucle, name="vigilante-tarifas", daemon=True)
+        hilo.start()
+        return hilo
+
+    def detener(self):
+        self._detener.set()
+
+
+class ManejadorTarifas(BaseHTTPRequestHandler):
+    """Manejador HTTP; el servicio se inyecta en el servidor."""
+
+    protocol_version = "HTTP/1.1"
+    # Encabezados y cuerpo salen en una sola escritura (evita la espera de Nagle con keep-alive)
+    wbufsize = 64 * 1024
+
+    def address_string(self) -> str:
+        # En sockets Unix client_address es una cadena vacía
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args):
+        pass
+
+    def _responder(self, estado: int, cuerpo: bytes):
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _error(self, estado: int, mensaje: str):
+        self._responder(estado, _serializar({"error": mensaje}))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        indice = self.server.servicio.indice
+
+        if url.path == "/tarifa":
+            if not params.get("proveedor") or not params.get("estrato"):
+                self._error(400, "Parámetros requeridos: proveedor, estrato")
+                return
+            cuerpo = indice.respuesta(params["proveedor"], params["estrato"],
+                                      params.get("servicio"), params.get("region"))
+            if cuerpo is None:
+                self._error(404, "Tarifa no encontrada")
+            else:
+                self._responder(200, cuerpo)
+        elif url.path == "/tarifas":
+            cuerpo = indice.listados.get(normalizar_clave(params.get("proveedor")))
+            if cuerpo is None:
+                self._error(404, "Proveedor sin tarifas cargadas")
+            else:
+                self._responder(200, cuerpo)
+        elif url.path == "/salud":
+            self._responder(200, _serializar(indice.resumen()))
+        else:
+            self._error(404, "Ruta no encontrada")
+
+    def do_POST(self):
+        if urlparse(self.path).path == "/recargar":
+            indice = self.server.servicio.recargar()
+            self._responder(200, _serializar(indice.resumen()))
+        else:
+            self._error(404, "Ruta no encontrada")
+
+
+class ServidorHTTPTarifas(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, servicio: ServicioTarifas):
+        self.servicio = servicio
+        super().__init__(direccion, ManejadorTarifas)
+
+
+class ServidorUnixTarifas(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, ruta_socket: str, servicio: ServicioTarifas):
+        self.servicio = servicio
+        if os.path.exists(ruta_socket):
+            os.unlink(ruta_socket)
+        super().__init__(ruta_socket, ManejadorTarifas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local de consulta de tarifas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--socket", help="Ruta de socket Unix (en lugar de TCP)")
+    parser.add_argument("--dir-datos", default=DIR_DATOS, help="Directorio con <proveedor>_tarifas_actual.json")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_REVISION,
+                        help="Segundos entre revisiones de cambios en los resultados")
+    args = parser.parse_args()
+
+    servicio = ServicioTarifas(args.dir_datos, args.intervalo)
+    servicio.recargar()
+    servicio.vigilar()
+
+    # SIGHUP fuerza una recarga (p. ej. al terminar un scrape)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: threading.Thread(target=servicio.recargar, daemon=True).start())
+
+    if args.socket:
+        servidor = ServidorUnixTarifas(args.socket, servicio)
+        print(f"Servidor de tarifas escuchando en {args.socket}", file=sys.stderr)
+    else:
+        servidor = ServidorHTTPTarifas((args.host, args.puerto), servicio)
+        print(f"Servidor de tarifas escuchando en http://{args.host}:{args.puerto}", file=sys.stderr)
+
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servicio.detener()
+        servidor.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
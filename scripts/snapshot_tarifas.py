@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instantánea binaria compacta de tarifas - OptiFactura Montería
+Formato de diseño fijo (little-endian) pensado para abrirse con mmap:
+cualquier número de procesos comparte la misma copia física en memoria
+y no hay que parsear JSON al arrancar.
+
+Estructura del archivo:
+    Encabezado (64 bytes)
+        magic 'OFTS', versión, tamaño total, y (cantidad, offset) de cada sección
+    Tarifas      f64 tarifa[n] | f64 cargoFijo[n] | f64 subsidio[n] | u32 estrato[n] | u32 fuente_subsidio[n]
+    Subsidios    f64 porcentaje[n] | u32 estrato[n] | u32 fuente[n]
+    Componentes  f64 valor[n] | u32 nombre[n]
+    Cadenas      u32 offsets[n + 1] | bytes UTF-8
+Las columnas f64 empiezan alineadas a 8 bytes. Los valores ausentes se guardan
+como NaN (f64) o 0xFFFFFFFF (índice de cadena). El resto de campos del resultado
+(proveedor, url, fechaExtraccion, ...) va como JSON en la tabla de cadenas.
+
+Cada instantánea publicada se archiva además en
+datos_tarifas/historial/<proveedor>/<fechaExtraccion>.bin, así las tarifas
+vigentes en una fecha pasada se pueden consultar (ver conciliar_facturas.py).
+Si las tarifas, subsidios y componentes son los mismos que los de la última
+copia del mismo mes, no se archiva otra (el planificador repite scrapes
+sin cambios). Las copias de más de HISTORIAL_DIAS días se borran, salvo la
+más reciente de ellas, que sigue vigente al inicio del periodo conservado.
+
+Uso:
+    python scripts/snapshot_tarifas.py convertir datos_tarifas/afinia_tarifas_actual.json
+    python scripts/snapshot_tarifas.py mostrar datos_tarifas/afinia_tarifas.bin
+    python scripts/snapshot_tarifas.py limpiar --dias 365
+"""
+
+import sys
+import json
+import math
+import mmap
+import os
+import struct
+import re
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from tarifas_comun import PROVEEDORES, ruta_datos, escribir_atomico
+
+
+MAGIC = b'OFTS'
+VERSION_FORMATO = 1
+SIN_CADENA = 0xFFFFFFFF
+
+# magic, versión, reservado, tamaño total, n_cadenas, off_cadenas, meta,
+# n_tarifas, off_tarifas, n_subsidios, off_subsidios, n_componentes, off_componentes
+ENCABEZADO = struct.Struct('<4sHHIIIIIIIIII')
+TAMANO_ENCABEZADO = 64
+
+CAMPOS_LISTA = ("tarifas", "subsidios", "componentes")
+HISTORIAL_DIAS = 730  # días de historial que se conservan
+
+
+def ruta_snapshot(proveedor: str, directorio: Optional[str] = None) -> str:
+    """Ruta de la instantánea binaria vigente de un proveedor."""
+    return ruta_datos(f"{proveedor.lower()}_tarifas.bin", directorio=directorio)
+
+
+def ruta_historial(proveedor: str, directorio: Optional[str] = None) -> str:
+    """Directorio con las instantáneas archivadas de un proveedor."""
+    return ruta_datos('historial', proveedor.lower(), directorio=directorio)
+
+
+def historial_snapshots(proveedor: str, directorio: Optional[str] = None) -> List[str]:
+    """Instantáneas archivadas de un proveedor, de la más antigua a la más reciente."""
+    base = ruta_historial(proveedor, directorio)
+    try:
+        nombres = sorted(n for n in os.listdir(base) if n.endswith('.bin'))
+    except OSError:
+        return []
+    return [os.path.join(base, n) for n in nombres]
+
+
+def _a_float(valor: Any) -> float:
+    if valor is None:
+        return math.nan
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _alinear(n: int, a: int = 8) -> int:
+    return (n + a - 1) // a * a
+
+
+class _TablaCadenas:
+    def __init__(self):
+        self.cadenas: List[str] = []
+        self._indices: Dict[str, int] = {}
+
+    def indice(self, valor: Optional[str]) -> int:
+        if valor is None:
+            return SIN_CADENA
+        valor = str(valor)
+        if valor not in self._indices:
+            self._indices[valor] = len(self.cadenas)
+            self.cadenas.append(valor)
+        return self._indices[valor]
+
+    def empaquetar(self) -> bytes:
+        datos = [c.encode('utf-8') for c in self.cadenas]
+        offsets = [0]
+        for d in datos:
+            offsets.append(offsets[-1] + len(d))
+        return struct.pack(f'<{len(offsets)}I', *offsets) + b''.join(datos)
+
+
+def serializar_snapshot(resultado: Dict[str, Any]) -> bytes:
+    """Convierte un resultado de scraper al formato binario."""
+    cadenas = _TablaCadenas()
+    meta = {k: v for k, v in resultado.items() if k not in CAMPOS_LISTA}
+    idx_meta = cadenas.indice(json.dumps(meta, ensure_ascii=False))
+
+    tarifas = resultado.get("tarifas", [])
+    subsidios = resultado.get("subsidios", [])
+    componentes = list((resultado.get("componentes") or {}).items())
+
+    n = len(tarifas)
+    sec_tarifas = struct.pack(
+        f'<{n}d{n}d{n}d{n}I{n}I',
+        *[_a_float(t.get("tarifa")) for t in tarifas],
+        *[_a_float(t.get("cargoFijo")) for t in tarifas],
+        *[_a_float(t.get("subsidio")) for t in tarifas],
+        *[cadenas.indice(t.get("estrato")) for t in tarifas],
+        *[cadenas.indice(t.get("fuente_subsidio")) for t in tarifas],
+    )
+    m = len(subsidios)
+    sec_subsidios = struct.pack(
+        f'<{m}d{m}I{m}I',
+        *[_a_float(s.get("porcentaje")) for s in subsidios],
+        *[cadenas.indice(s.get("estrato")) for s in subsidios],
+        *[cadenas.indice(s.get("fuente")) for s in subsidios],
+    )
+    k = len(componentes)
+    sec_componentes = struct.pack(
+        f'<{k}d{k}I',
+        *[_a_float(valor) for _, valor in componentes],
+        *[cadenas.indice(nombre) for nombre, _ in componentes],
+    )
+    sec_cadenas = cadenas.empaquetar()
+
+    partes = []
+    offset = TAMANO_ENCABEZADO
+    offsets = []
+    for seccion in (sec_tarifas, sec_subsidios, sec_componentes, sec_cadenas):
+        offset = _alinear(offset)
+        offsets.append(offset)
+        partes.append((offset, seccion))
+        offset += len(seccion)
+
+    total = offset
+    buffer = bytearray(total)
+    ENCABEZADO.pack_into(
+        buffer, 0, MAGIC, VERSION_FORMATO, 0, total,
+        len(cadenas.cadenas), offsets[3], idx_meta,
+        n, offsets[0], m, offsets[1], k, offsets[2],
+    )
+    for inicio, seccion in partes:
+        buffer[inicio:inicio + len(seccion)] = seccion
+    return bytes(buffer)
+
+
+def escribir_snapshot(resultado: Dict[str, Any], ruta: str) -> str:
+    """Escribe la instantánea de forma atómica (los lectores con mmap siguen con la anterior)."""
+    return escribir_atomico(ruta, serializar_snapshot(resultado))
+
+
+def _contenido(resultado: Dict[str, Any]) -> bytes:
+    """Tarifas, subsidios y componentes en formato binario, sin los metadatos (fecha, url...)."""
+    return serializar_snapshot({k: resultado[k] for k in CAMPOS_LISTA if resultado.get(k)})
+
+
+def _repite_ultimo(proveedor: str, nombre: str, contenido: bytes, directorio: Optional[str] = None) -> bool:
+    """Indica si la última copia del historial es del mismo mes que 'nombre' y con el mismo contenido."""
+    historial = historial_snapshots(proveedor, directorio)
+    if not historial or os.path.basename(historial[-1])[:6] != nombre[:6]:
+        return False
+    try:
+        with SnapshotTarifas(historial[-1]) as anterior:
+            return _contenido(anterior.a_resultado()) == contenido
+    except (OSError, ValueError):
+        return False
+
+
+def limpiar_historial(proveedor: str, dias: float = HISTORIAL_DIAS, directorio: Optional[str] = None) -> int:
+    """
+    Borra las copias de más de 'dias' días salvo la más reciente de ellas
+    (la vigente al inicio del periodo conservado). Retorna cuántas borró.
+    """
+    limite = (datetime.now() - timedelta(days=dias)).strftime('%Y%m%dT%H%M%S')
+    viejas = [r for r in historial_snapshots(proveedor, directorio) if os.path.basename(r)[:-4] < limite]
+    for ruta in viejas[:-1]:
+        os.unlink(ruta)
+    return len(viejas[:-1])
+
+
+def guardar_snapshot_resultado(resultado: Dict[str, Any], directorio: Optional[str] = None) -> Optional[str]:
+    """
+    Publica la instantánea de un scrape exitoso. Un resultado con error o sin
+    tarifas no reemplaza la instantánea vigente.
+    """
+    if resultado.get("error") or not resultado.get("tarifas"):
+        return None
+    try:
+        proveedor = resultado.get("proveedor", "")
+        datos = serializar_snapshot(resultado)
+        ruta = escribir_atomico(ruta_snapshot(proveedor, directorio), datos)
+        print(f"Instantánea binaria guardada: {ruta}", file=sys.stderr)
+        # Copia fechada para consultas históricas (nombre ordenable por fecha)
+        fecha = resultado.get("fechaExtraccion") or datetime.now().isoformat()
+        nombre = re.sub(r'[^0-9T]', '', fecha)[:15] + '.bin'
+        if not _repite_ultimo(proveedor, nombre, _contenido(resultado), directorio):
+            escribir_atomico(os.path.join(ruta_historial(proveedor, directorio), nombre), datos)
+        borradas = limpiar_historial(proveedor, HISTORIAL_DIAS, directorio)
+        if borradas:
+            print(f"  Historial: {borradas} instantáneas de más de {HISTORIAL_DIAS} días borradas", file=sys.stderr)
+        return ruta
+    except Exception as e:
+        print(f"Error guardando instantánea binaria: {str(e)}", file=sys.stderr)
+        return None
+
+
+class SnapshotTarifas:
+    """
+    Lector de instantáneas con mmap. Las columnas numéricas se exponen como
+    memoryview sobre el archivo mapeado (sin copia); las cadenas se decodifican
+    solo cuando se piden.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with open(ruta, 'rb') as f:
+            self._stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._vista = memoryview(self._mmap)
+        self._cadenas: Dict[int, str] = {}
+        self._por_estrato: Optional[Dict[str, int]] = None
+
+        if len(self._vista) < TAMANO_ENCABEZADO:
+            self.cerrar()
+            raise ValueError(f"Instantánea truncada: {ruta}")
+
+        (magic, version, _, total, self.n_cadenas, self._off_cadenas, self._idx_meta,
+         self.n_tarifas, off_tarifas, self.n_subsidios, off_subsidios,
+         self.n_componentes, off_componentes) = ENCABEZADO.unpack_from(self._vista, 0)
+
+        if magic != MAGIC or version != VERSION_FORMATO or total != len(self._vista):
+            self.cerrar()
+            raise ValueError(f"Instantánea inválida o de otra versión: {ruta}")
+
+        n = self.n_tarifas
+        self.tarifa = self._f64(off_tarifas, n)
+        self.cargo_fijo = self._f64(off_tarifas + 8 * n, n)
+        self.subsidio = self._f64(off_tarifas + 16 * n, n)
+        self._estrato_tarifa = self._u32(off_tarifas + 24 * n, n)
+        self._fuente_tarifa = self._u32(off_tarifas + 28 * n, n)
+
+        m = self.n_subsidios
+        self.porcentaje_subsidio = self._f64(off_subsidios, m)
+        self._estrato_subsidio = self._u32(off_subsidios + 8 * m, m)
+        self._fuente_subsidio = self._u32(off_subsidios + 12 * m, m)
+
+        k = self.n_componentes
+        self.valor_componente = self._f64(off_componentes, k)
+        self._nombre_componente = self._u32(off_componentes + 8 * k, k)
+
+        self._offsets_cadenas = self._u32(self._off_cadenas, self.n_cadenas + 1)
+        self._inicio_cadenas = self._off_cadenas + 4 * (self.n_cadenas + 1)
+
+    def _f64(self, offset: int, n: int):
+        if sys.byteorder == 'little':
+            return self._vista[offset:offset + 8 * n].cast('d')
+        return struct.unpack_from(f'<{n}d', self._vista, offset)
+
+    def _u32(self, offset: int, n: int):
+        if sys.byteorder == 'little':
+            return self._vista[offset:offset + 4 * n].cast('I')
+        return struct.unpack_from(f'<{n}I', self._vista, offset)
+
+    def cadena(self, indice: int) -> Optional[str]:
+        if indice == SIN_CADENA:
+            return None
+        if indice not in self._cadenas:
+            inicio = self._inicio_cadenas + self._offsets_cadenas[indice]
+            fin = self._inicio_cadenas + self._offsets_cadenas[indice + 1]
+            self._cadenas[indice] = bytes(self._vista[inicio:fin]).decode('utf-8')
+        return self._cadenas[indice]
+
+    @property
+    def metadatos(self) -> Dict[str, Any]:
+        return json.loads(self.cadena(self._idx_meta))
+
+    def estrato(self, i: int) -> str:
+        return self.cadena(self._estrato_tarifa[i])
+
+    def buscar(self, estrato: str) -> Optional[Dict[str, Any]]:
+        """Tarifa de un estrato (el índice por estrato se arma en la primera consulta)."""
+        if self._por_estrato is None:
+            self._por_estrato = {}
+            for i in range(self.n_tarifas):
+                self._por_estrato.setdefault(self.estrato(i), i)
+        i = self._por_estrato.get(str(estrato))
+        return None if i is None else self._tarifa(i)
+
+    def _tarifa(self, i: int) -> Dict[str, Any]:
+        tarifa = {
+            "estrato": self.estrato(i),
+            "tarifa": self.tarifa[i],
+            "cargoFijo": self.cargo_fijo[i],
+        }
+        if not math.isnan(self.subsidio[i]):
+            tarifa["subsidio"] = self.subsidio[i]
+        fuente = self.cadena(self._fuente_tarifa[i])
+        if fuente is not None:
+            tarifa["fuente_subsidio"] = fuente
+        return tarifa
+
+    def tarifas(self) -> List[Dict[str, Any]]:
+        return [self._tarifa(i) for i in range(self.n_tarifas)]
+
+    def subsidios(self) -> List[Dict[str, Any]]:
+        subsidios = []
+        for i in range(self.n_subsidios):
+            subsidio = {
+                "estrato": self.cadena(self._estrato_subsidio[i]),
+                "porcentaje": self.porcentaje_subsidio[i],
+            }
+            fuente = self.cadena(self._fuente_subsidio[i])
+            if fuente is not None:
+                subsidio["fuente"] = fuente
+            subsidios.append(subsidio)
+        return subsidios
+
+    def componentes(self) -> Dict[str, float]:
+        return {self.cadena(self._nombre_componente[i]): self.valor_componente[i]
+                for i in range(self.n_componentes)}
+
+    def a_resultado(self) -> Dict[str, Any]:
+        """Reconstruye el resultado con la misma forma que el JSON del scraper."""
+        resultado = self.metadatos
+        resultado["tarifas"] = self.tarifas()
+        resultado["subsidios"] = self.subsidios()
+        resultado["componentes"] = self.componentes()
+        return resultado
+
+    def cambio_en_disco(self) -> bool:
+        """Indica si el archivo fue reemplazado por una instantánea más nueva."""
+        try:
+            actual = os.stat(self.ruta)
+        except OSError:
+            return False
+        return (actual.st_ino, actual.st_mtime_ns) != (self._stat.st_ino, self._stat.st_mtime_ns)
+
+    def cerrar(self):
+        for nombre in ("tarifa", "cargo_fijo", "subsidio", "_estrato_tarifa", "_fuente_tarifa",
+                       "porcentaje_subsidio", "_estrato_subsidio", "_fuente_subsidio",
+                       "valor_componente", "_nombre_componente", "_offsets_cadenas"):
+            columna = self.__dict__.pop(nombre, None)
+            if isinstance(columna, memoryview):
+                columna.release()
+        self._vista.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def abrir_snapshot(proveedor: str, directorio: Optional[str] = None) -> SnapshotTarifas:
+    """Abre la instantánea vigente de un proveedor."""
+    return SnapshotTarifas(ruta_snapshot(proveedor, directorio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instantáneas binarias de tarifas")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    convertir = sub.add_parser("convertir", help="Convierte un resultado JSON a instantánea binaria")
+    convertir.add_argument("json")
+    convertir.add_argument("salida", nargs="?", help="Por defecto datos_tarifas/<proveedor>_tarifas.bin")
+
+    mostrar = sub.add_parser("mostrar", help="Imprime una instantánea como JSON")
+    mostrar.add_argument("bin")
+
+    limpiar = sub.add_parser("limpiar", help="Borra las instantáneas viejas del historial")
+    limpiar.add_argument("--dias", type=float, default=HISTORIAL_DIAS,
+                         help=f"Días de historial que se conservan (por defecto {HISTORIAL_DIAS})")
+
+    args = parser.parse_args()
+
+    if args.comando == "convertir":
+        with open(args.json, 'r', encoding='utf-8') as f:
+            resultado = json.load(f)
+        salida = args.salida or ruta_snapshot(resultado.get("proveedor", "desconocido"))
+        escribir_snapshot(resultado, salida)
+        print(f"Instantánea escrita: {salida} ({os.path.getsize(salida)} bytes)", file=sys.stderr)
+    elif args.comando == "limpiar":
+        borradas = {proveedor: limpiar_historial(proveedor, args.dias) for proveedor in PROVEEDORES}
+        print(json.dumps(borradas, ensure_ascii=False, indent=2))
+    else:
+        with SnapshotTarifas(args.bin) as snapshot:
+            print(json.dumps(snapshot.a_resultado(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
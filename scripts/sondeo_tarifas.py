@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sondeo rápido de cambios en las páginas de tarifas.
+Un sondeo descarga solo la página del proveedor, calcula una huella del
+boletín seleccionado (url, año, mes) y del contenido relevante de la página
+(CU, subsidios, tablas) y la compara con la huella del último scrape completo
+exitoso. Si no cambió, no hace falta ejecutar el scrape completo.
+
+Códigos de salida del modo --sondeo:
+    0  sin cambios
+    3  cambio detectado (o no hay huella previa): ejecutar el scrape completo
+    2  error durante el sondeo
+"""
+
+import sys
+import json
+import hashlib
+import time
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from tarifas_comun import ruta_datos, escribir_atomico, candado_archivo
+
+
+TIMEOUT_SONDEO = 10  # segundos; el sondeo no debe competir con el scrape completo
+
+CODIGO_SIN_CAMBIOS = 0
+CODIGO_ERROR = 2
+CODIGO_CAMBIO = 3
+
+
+def ruta_huellas() -> str:
+    return ruta_datos('huellas_sondeo.json')
+
+
+def calcular_huella(pdf_info: Optional[Dict[str, Any]], contenido: Dict[str, Any]) -> str:
+    """Huella estable del boletín seleccionado y del contenido extraído de la página."""
+    pdf = {k: pdf_info.get(k) for k in ('url', 'year', 'mes')} if pdf_info else None
+    canonico = json.dumps({"pdf": pdf, "contenido": contenido}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+
+def _leer_huellas() -> Dict[str, Any]:
+    try:
+        with open(ruta_huellas(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_huella_resultado(resultado: Dict[str, Any]):
+    """
+    Registra la huella de un scrape completo exitoso. Solo así un sondeo
+    posterior puede responder "sin cambios".
+    """
+    huella = resultado.get("huella_pagina")
+    if not huella or resultado.get("error") or not resultado.get("tarifas"):
+        return
+    try:
+        # Los scrapers de los proveedores corren a la vez y comparten el archivo
+        with candado_archivo(ruta_huellas()):
+            huellas = _leer_huellas()
+            huellas[resultado["proveedor"].lower()] = {
+                "huella": huella,
+                "pdf_url": resultado.get("pdf_url"),
+                "mes_tarifa": resultado.get("mes_tarifa"),
+                "fecha": datetime.now().isoformat(),
+            }
+            escribir_atomico(ruta_huellas(), json.dumps(huellas, ensure_ascii=False, indent=2).encode('utf-8'))
+    except OSError as e:
+        print(f"Error guardando huella de sondeo: {str(e)}", file=sys.stderr)
+
+
+def evaluar_sondeo(proveedor: str, huella: str, pdf_info: Optional[Dict[str, Any]], inicio: float) -> Dict[str, Any]:
+    """Compara la huella actual con la del último scrape completo."""
+    anterior = _leer_huellas().get(proveedor)
+    if anterior is None:
+        estado = "sin_referencia"
+    elif anterior.get("huella") == huella:
+        estado = "sin_cambios"
+    else:
+        estado = "cambio"
+
+    return {
+        "proveedor": proveedor,
+        "estado": estado,
+        "huella": huella,
+        "huella_anterior": anterior.get("huella") if anterior else None,
+        "pdf_url": pdf_info.get("url") if pdf_info else None,
+        "mes_tarifa": pdf_info.get("mes") if pdf_info else None,
+        "fechaSondeo": datetime.now().isoformat(),
+        "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1),
+    }
+
+
+def ejecutar_sondeo(proveedor: str, funcion) -> int:
+    """Ejecuta un sondeo, imprime el resultado como JSON y retorna el código de salida."""
+    inicio = time.perf_counter()
+    try:
+        resultado = funcion()
+    except Exception as e:
+        print(f"Error en sondeo: {str(e)}", file=sys.stderr)
+        resultado = {
+            "proveedor": proveedor,
+            "estado": "error",
+            "error": str(e),
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        }
+
+    print(json.dumps(resultado, ensure_ascii=False))
+    if resultado["estado"] == "sin_cambios":
+        return CODIGO_SIN_CAMBIOS
+    if resultado["estado"] == "error":
+        return CODIGO_ERROR
+    return CODIGO_CAMBIO
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--sondeo", action="store_true",
+                        help="Solo descarga la página y compara el boletín con el último scrape (salida 0 = sin cambios)")
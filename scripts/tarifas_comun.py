@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Utilidades compartidas por los scrapers de tarifas y sus herramientas.
+Centraliza las rutas de datos y los nombres de archivo que también usa
+el lado Node (lib/tarifas-scraper.js escribe <proveedor>_tarifas_actual.json).
+"""
+
+import os
+import tempfile
+import unicodedata
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sin flock, candado_archivo no excluye a otros procesos
+    fcntl = None
+
+
+# Directorio de datos compartido con Node (./datos_tarifas en la raíz del proyecto)
+DIR_DATOS = os.environ.get(
+    'DATOS_TARIFAS_DIR',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'datos_tarifas'))
+)
+
+# Proveedor -> servicio (mismo mapeo que services/tarifas-service.js)
+PROVEEDORES = {
+    'afinia': 'electricidad',
+    'veolia': 'agua',
+    'surtigas': 'gas',
+}
+
+
+def ruta_datos(*partes: str, directorio: Optional[str] = None) -> str:
+    """Construye una ruta dentro del directorio de datos."""
+    return os.path.join(directorio or DIR_DATOS, *partes)
+
+
+def ruta_resultado(proveedor: str, directorio: Optional[str] = None) -> str:
+    """Ruta del último resultado JSON de un proveedor (el que guarda Node)."""
+    return ruta_datos(f"{proveedor.lower()}_tarifas_actual.json", directorio=directorio)
+
+
+def normalizar_clave(texto: Optional[str]) -> str:
+    """Normaliza un texto para usarlo como clave: minúsculas y sin tildes."""
+    if texto is None:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', str(texto).strip().lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def escribir_atomico(ruta: str, datos: bytes) -> str:
+    """
+    Escribe un archivo de forma atómica: temporal en el mismo directorio + os.replace.
+    Los lectores ven el archivo anterior completo o el nuevo completo, nunca uno a medias.
+    """
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(directorio, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=directorio, prefix='.tmp-', suffix=os.path.basename(ruta))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(datos)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.unlink(temporal)
+        except OSError:
+            pass
+        raise
+    return ruta
+
+
+@contextmanager
+def candado_archivo(ruta: str):
+    """
+    Candado exclusivo (flock sobre <ruta>.lock) para leer, modificar y
+    reescribir un archivo que comparten procesos concurrentes, como los
+    scrapers de los tres proveedores lanzados a la vez por cron.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    fd = os.open(ruta + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
@@ -0,0 +1,105 @@
+const assert = require("assert")
+const path = require("path")
+const { spawnSync } = require("child_process")
+const { FORMATOS, parsearSalida } = require("../lib/salida-python")
+
+// Codifica el resultado con escribir_resultado() en el formato pedido y, en
+// msgpack, verifica que leer_tramas() de Python lo decodifica igual
+const CODIFICAR_PYTHON = `
+import io, json, sys
+from salida_tarifas import escribir_resultado, leer_tramas
+
+resultado = json.load(sys.stdin)
+formato = sys.argv[1]
+if formato == 'msgpack':
+    flujo = io.BytesIO()
+    escribir_resultado(resultado, formato, flujo)
+    decodificado = list(leer_tramas(io.BytesIO(flujo.getvalue())))[-1]
+    if decodificado.pop("tipo") != "resumen" or decodificado != resultado:
+        sys.exit("leer_tramas no decodifica el mismo resultado")
+    sys.stdout.buffer.write(flujo.getvalue())
+else:
+    escribir_resultado(resultado, formato)
+`
+
+// Cubre los tipos que produce msgpack.packb: enteros de cada ancho, negativos,
+// flotantes, textos cortos y largos (str8/str16), claves con tildes, arreglos
+// y mapas de más de 15 elementos (array16/map16), null y booleanos
+function resultadoDePrueba() {
+  const tarifas = []
+  for (let i = 0; i < 20; i++) {
+    tarifas.push({
+      estrato: String((i % 6) + 1),
+      tarifa: 850.25 + i * 37.5,
+      unidad: "kWh",
+      subsidio: i < 3 ? -60 + i * 10 : null,
+      aproximada: i % 2 === 0,
+    })
+  }
+  const componentes = {}
+  for (let i = 0; i < 17; i++) componentes[`componente_${i}`] = i * 1.125
+  return {
+    proveedor: "Afinia",
+    servicio: "electricidad",
+    año: 2026,
+    mes_tarifa: "Septiembre",
+    fechaExtraccion: "2026-09-15T06:00:00.123456",
+    pdf_url: `https://www.afinia.com.co/${"boletin-tarifario-".repeat(3)}2026-09.pdf`,
+    notas: "Tarifas con subsidio aplicado según la Resolución CREG 119 de 2007. ".repeat(6),
+    tarifas,
+    subsidios: [
+      { estrato: "1", porcentaje: -60 },
+      { estrato: "2", porcentaje: -50 },
+    ],
+    componentes,
+    consumo_subsistencia: 173,
+    bytes_pdf: 2 ** 40,
+    desfase: -129,
+    minimo: -40000,
+    errores_lectura: [],
+    error: null,
+    parcial: false,
+  }
+}
+
+function codificar(resultado, formato) {
+  const proceso = spawnSync("python", ["-c", CODIFICAR_PYTHON, formato], {
+    cwd: __dirname,
+    input: JSON.stringify(resultado),
+    maxBuffer: 64 * 1024 * 1024,
+  })
+  if (proceso.error) throw proceso.error
+  if (proceso.status !== 0) {
+    throw new Error(`Python terminó con código ${proceso.status}: ${proceso.stderr.toString().trim()}`)
+  }
+  return proceso.stdout
+}
+
+function probarSalidaPython() {
+  console.log("🧪 Verificando la salida de los scrapers en cada formato...")
+  const resultado = resultadoDePrueba()
+  let fallos = 0
+
+  for (const formato of FORMATOS) {
+    try {
+      const salida = codificar(resultado, formato)
+      assert.deepStrictEqual(parsearSalida(salida, formato), resultado)
+      // Segunda lectura: las claves salen de la caché del decodificador
+      assert.deepStrictEqual(parsearSalida(salida, formato), resultado)
+      console.log(`✅ ${formato}: ${salida.length} bytes, mismo resultado en Python y Node`)
+    } catch (error) {
+      fallos++
+      console.error(`❌ ${formato}: ${error.message}`)
+    }
+  }
+
+  console.log(fallos ? `🔚 ${fallos} formato(s) con diferencias` : "🔚 Los tres formatos coinciden")
+  return fallos === 0
+}
+
+// Ejecutar si es llamado directamente
+if (require.main === module) {
+  process.exitCode = probarSalidaPython() ? 0 : 1
+}
+
+module.exports = probarSalidaPython
@@ -1,9 +1,59 @@
+const { cargarResumenUsuario, cargarTendenciaTarifas } = require("../lib/resumenes-dashboard")
+
 class DashboardService {
   constructor(options = {}) {
     this.prisma = options.prisma
+    this.dirTarifas = options.dirTarifas || "./datos_tarifas"
     this.inicializado = false
   }
 
+  /**
+   * Resumen precalculado del usuario (scripts/resumenes_dashboard.py).
+   * Con resumen, las consultas solo recorren las facturas creadas después del corte.
+   * @param {string} userId ID del usuario
+   * @returns {Promise<Object>} { resumen, posteriores } con el filtro de Prisma para las facturas nuevas
+   */
+  async cargarResumen(userId) {
+    const resumen = await cargarResumenUsuario(userId, this.dirTarifas)
+    return {
+      resumen,
+      posteriores: resumen ? { createdAt: { gt: resumen.corte } } : {},
+    }
+  }
+
+  /**
+   * Meses completos del resumen posteriores al de fechaInicio (YYYY-MM), en orden.
+   * El mes de fechaInicio empieza a mitad de mes: lo cubre filtroEnVivo()
+   * @param {Object|null} resumen Resumen del usuario
+   * @param {Date} fechaInicio Fecha inicial
+   * @returns {Array} Pares [mes, { proveedor: celda }]
+   */
+  mesesDelResumen(resumen, fechaInicio) {
+    if (!resumen) return []
+    const mesInicio = fechaInicio.toISOString().substring(0, 7)
+    return Object.keys(resumen.meses)
+      .filter((mes) => mes > mesInicio)
+      .sort()
+      .map((mes) => [mes, resumen.meses[mes]])
+  }
+
+  /**
+   * Filtro de Prisma de las facturas que se suman en vivo desde fechaInicio:
+   * las creadas después del corte y todas las del mes de fechaInicio, que el
+   * resumen no puede aportar porque solo agrega meses completos
+   * @param {Date} fechaInicio Fecha inicial
+   * @param {Object|null} resumen Resumen del usuario
+   * @param {Object} posteriores Filtro de las facturas posteriores al corte
+   * @returns {Object} Condiciones para el where
+   */
+  filtroEnVivo(fechaInicio, resumen, posteriores) {
+    const desde = { fechaFactura: { gte: fechaInicio } }
+    if (!resumen) return desde
+    // Mismo mes que toISOString().substring(0, 7), en UTC
+    const primerMesCompleto = new Date(Date.UTC(fechaInicio.getUTCFullYear(), fechaInicio.getUTCMonth() + 1, 1))
+    return { ...desde, OR: [posteriores, { fechaFactura: { lt: primerMesCompleto } }] }
+  }
+
   /**
    * Inicializa el servicio de dashboard
    */
@@ -27,9 +77,10 @@ class DashboardService {
    */
   async obtenerEstadisticasGenerales(userId) {
     try {
-      const [totalFacturas, facturasMesActual, ahorroTotal, anomaliasDetectadas] = await Promise.all([
+      const { resumen, posteriores } = await this.cargarResumen(userId)
+      const [totalFacturasNuevas, facturasMesActual, ahorroNuevo, anomaliasNuevas] = await Promise.all([
         this.prisma.analisisFactura.count({
-          where: { userId },
+          where: { userId, ...posteriores },
         }),
 
         this.prisma.analisisFactura.count({
@@ -45,6 +96,7 @@ class DashboardService {
           where: {
             userId,
             diferenciaTarifa: { gt: 0 },
+            ...posteriores,
           },
           _sum: {
             diferenciaTarifa: true,
@@ -57,14 +109,20 @@ class DashboardService {
             anomalias: {
               not: "[]",
             },
+            ...posteriores,
           },
         }),
       ])
 
+      // Totales precalculados hasta el corte + facturas creadas después
+      const totales = resumen ? resumen.totales : {}
+      const totalFacturas = totalFacturasNuevas + (totales.facturas || 0)
+      const anomaliasDetectadas = anomaliasNuevas + (totales.anomalias || 0)
+
       return {
         totalFacturas,
         facturasMesActual,
-        ahorroTotal: ahorroTotal._sum.diferenciaTarifa || 0,
+        ahorroTotal: (ahorroNuevo._sum.diferenciaTarifa || 0) + (totales.ahorro || 0),
         anomaliasDetectadas,
         porcentajeAnomalias: totalFacturas > 0 ? ((anomaliasDetectadas / totalFacturas) * 100).toFixed(1) : 0,
       }
@@ -91,13 +149,12 @@ class DashboardService {
     try {
       const fechaInicio = new Date()
       fechaInicio.setMonth(fechaInicio.getMonth() - meses)
+      const { resumen, posteriores } = await this.cargarResumen(userId)
 
       const facturas = await this.prisma.analisisFactura.findMany({
         where: {
           userId,
-          fechaFactura: {
-            gte: fechaInicio,
-          },
+          ...this.filtroEnVivo(fechaInicio, resumen, posteriores),
         },
         orderBy: {
           fechaFactura: "asc",
@@ -111,9 +168,21 @@ class DashboardService {
         },
       })
 
-      // Agrupar por mes y proveedor
+      // Agrupar por mes y proveedor (el resumen trae los meses completos hasta el corte)
       const consumoPorMes = {}
 
+      this.mesesDelResumen(resumen, fechaInicio).forEach(([mes, proveedores]) => {
+        consumoPorMes[mes] = {}
+        Object.entries(proveedores).forEach(([nombre, celda]) => {
+          const proveedor = nombre.toLowerCase()
+          const datos = consumoPorMes[mes][proveedor] || { consumo: 0, valor: 0, unidad: celda.unidad, facturas: 0 }
+          datos.consumo += celda.consumo
+          datos.valor += celda.gasto
+          datos.facturas += celda.facturas
+          consumoPorMes[mes][proveedor] = datos
+        })
+      })
+
       facturas.forEach((factura) => {
         const mes = factura.fechaFactura.toISOString().substring(0, 7) // YYYY-MM
         const proveedor = factura.proveedor.toLowerCase()
@@ -136,7 +205,14 @@ class DashboardService {
         consumoPorMes[mes][proveedor].facturas += 1
       })
 
-      return consumoPorMes
+      if (!resumen) return consumoPorMes
+
+      // Facturas nuevas de meses anteriores al último del resumen: mantener el orden cronológico
+      return Object.fromEntries(
+        Object.keys(consumoPorMes)
+          .sort()
+          .map((mes) => [mes, consumoPorMes[mes]]),
+      )
     } catch (error) {
       console.error("Error al obtener consumo mensual:", error.message)
       return {}
@@ -153,14 +229,13 @@ class DashboardService {
     try {
       const fechaInicio = new Date()
       fechaInicio.setMonth(fechaInicio.getMonth() - meses)
+      const { resumen, posteriores } = await this.cargarResumen(userId)
 
-      const gastosPorProveedor = await this.prisma.analisisFactura.groupBy({
+      const gastosNuevos = await this.prisma.analisisFactura.groupBy({
         by: ["proveedor"],
         where: {
           userId,
-          fechaFactura: {
-            gte: fechaInicio,
-          },
+          ...this.filtroEnVivo(fechaInicio, resumen, posteriores),
         },
         _sum: {
           valorTotal: true,
@@ -170,6 +245,24 @@ class DashboardService {
         },
       })
 
+      // Sumar los meses precalculados a los grupos de las facturas nuevas
+      const porProveedor = new Map(
+        gastosNuevos.map((item) => [item.proveedor, { valor: item._sum.valorTotal || 0, facturas: item._count.id }]),
+      )
+      this.mesesDelResumen(resumen, fechaInicio).forEach(([, proveedores]) => {
+        Object.entries(proveedores).forEach(([proveedor, celda]) => {
+          const datos = porProveedor.get(proveedor) || { valor: 0, facturas: 0 }
+          datos.valor += celda.gasto
+          datos.facturas += celda.facturas
+          porProveedor.set(proveedor, datos)
+        })
+      })
+      const gastosPorProveedor = [...porProveedor].map(([proveedor, datos]) => ({
+        proveedor,
+        _sum: { valorTotal: datos.valor },
+        _count: { id: datos.facturas },
+      }))
+
       const total = gastosPorProveedor.reduce((sum, item) => sum + (item._sum.valorTotal || 0), 0)
 
       return gastosPorProveedor.map((item) => ({
@@ -304,6 +397,24 @@ class DashboardService {
     }
   }
 
+  /**
+   * Obtiene la tendencia mensual de tarifas por proveedor y estrato
+   * (datos_tarifas/resumenes/tendencia_tarifas.json, la actualiza cada scrape)
+   * @param {string} proveedor Proveedor (opcional; sin él, todos)
+   * @returns {Promise<Object>} { proveedor: { estrato: [{ mes, tarifa, variacion }] } }
+   */
+  async obtenerTendenciaTarifas(proveedor = null) {
+    try {
+      const tendencia = (await cargarTendenciaTarifas(this.dirTarifas)) || {}
+      if (!proveedor) return tendencia
+      const clave = proveedor.toLowerCase()
+      return tendencia[clave] ? { [clave]: tendencia[clave] } : {}
+    } catch (error) {
+      console.error("Error al obtener tendencia de tarifas:", error.message)
+      return {}
+    }
+  }
+
   /**
    * Obtiene recomendaciones personalizadas
    * @param {string} userId ID del usuario
@@ -1,4 +1,5 @@
 const TarifasScraper = require("../lib/tarifas-scraper")
+const { ClienteTarifas } = require("../lib/cliente-tarifas")
 const cron = require("node-cron")
 const path = require("path")
 const fs = require("fs").promises
@@ -93,8 +94,12 @@ class TarifasService {
       headless: true,
       outputDir: this.options.dirTarifas,
       logLevel: options.logLevel || "info",
+      formatoSalida: options.formatoSalida,
     })
 
+    // scripts/servidor_tarifas.py (URL o socket Unix); sin él, solo la caché de la DB
+    this.clienteTarifas = this.options.servidorTarifas ? new ClienteTarifas(this.options.servidorTarifas) : null
+
     this.tarifasCacheadas = {
       afinia: null,
       veolia: null,
@@ -494,6 +499,16 @@ class TarifasService {
       throw new Error(`Proveedor no soportado: ${proveedor}`)
     }
 
+    // El servidor tiene el último scrape; si no responde o no tiene el estrato, se usa la caché
+    if (this.clienteTarifas) {
+      try {
+        const tarifa = await this.clienteTarifas.tarifa(proveedor, estrato)
+        if (tarifa) return tarifa
+      } catch (error) {
+        console.warn(`Servidor de tarifas no disponible: ${error.message}`)
+      }
+    }
+
     const datosTarifas = this.tarifasCacheadas[proveedor]
 
     if (!datosTarifas || !datosTarifas.tarifas || datosTarifas.tarifas.length === 0) {